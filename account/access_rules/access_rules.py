@@ -1,4 +1,8 @@
-from account.models import Order, Platform
+from dataclasses import asdict, dataclass
+
+from django.db.models import Q
+
+from account.models import Order
 
 ROLE_CUSTOMER = 1
 ROLE_CURATOR = 2
@@ -10,73 +14,156 @@ ROLE_NAMES = {
     ROLE_EXECUTOR: 'Исполнитель',
 }
 
+S = Order.OrderStatus
+
+# Единая таблица workflow заказа: кто может действовать в статусе и куда ведут действия.
+# Действия: next — дальше по процессу, prev — возврат на предыдущий этап,
+# not_ready — договор ещё не готов к подписанию.
+ORDER_WORKFLOW = {
+    S.NFW: {'roles': ['Заказчик'], 'edges': {'next': S.OVK}},
+    S.OVK: {'roles': ['Куратор'], 'edges': {'next': S.OVC, 'prev': S.NFW}},
+    S.OVC: {'roles': ['Исполнитель'], 'edges': {'next': S.OA, 'prev': S.OVK}},
+    S.OA: {'roles': ['Заказчик'], 'edges': {'next': S.CSA, 'not_ready': S.SA}},
+    S.SA: {'roles': ['Заказчик'], 'edges': {'next': S.CSA, 'not_ready': S.SA}},
+    S.CSA: {'roles': ['Куратор'], 'edges': {'next': S.ESA, 'prev': S.SA}},
+    S.ESA: {'roles': ['Исполнитель'], 'edges': {'next': S.OGDS, 'prev': S.CSA}},
+    S.OGDS: {'roles': ['Заказчик'], 'edges': {'next': S.CGDS}},
+    S.CGDS: {'roles': ['Куратор'], 'edges': {'next': S.EGDS, 'prev': S.OGDS}},
+    S.EGDS: {'roles': ['Исполнитель'], 'edges': {'next': S.PO, 'prev': S.CGDS}},
+    S.PO: {'roles': ['Заказчик'], 'edges': {'next': S.POK}},
+    S.POK: {'roles': ['Куратор'], 'edges': {'next': S.POC, 'prev': S.PO}},
+    S.POC: {'roles': ['Исполнитель'], 'edges': {'next': S.MPO, 'prev': S.POK}},
+    S.MPO: {'roles': ['Исполнитель'], 'edges': {'next': S.MTP, 'prev': S.POK}},
+    S.MTP: {'roles': ['Исполнитель'], 'edges': {'next': S.MTPF, 'prev': S.MPO}},
+    S.MTPF: {'roles': ['Исполнитель'], 'edges': {'next': S.MPT, 'prev': S.MTP}},
+    S.MPT: {'roles': ['Исполнитель'], 'edges': {'next': S.MTPB, 'prev': S.MTPF}},
+    S.MTPB: {'roles': ['Исполнитель'], 'edges': {'next': S.MFT, 'prev': S.MPT}},
+    S.MFT: {'roles': ['Исполнитель'], 'edges': {'next': S.MCS, 'prev': S.MTPB}},
+    S.MCS: {'roles': ['Исполнитель'], 'edges': {'next': S.MCP, 'prev': S.MFT}},
+    S.MCP: {'roles': ['Исполнитель'], 'edges': {'next': S.MPOP, 'prev': S.MCS}},
+    S.MPOP: {'roles': ['Исполнитель'], 'edges': {'next': S.SO, 'prev': S.MCP}},
+    S.SO: {'roles': ['Исполнитель'], 'edges': {'next': S.PS, 'prev': S.MPOP}},
+    S.PS: {'roles': ['Куратор'], 'edges': {'next': S.CR, 'prev': S.SO}},
+    S.CR: {'roles': ['Заказчик'], 'edges': {'next': S.EO, 'prev': S.PS}},
+    S.EO: {'roles': [], 'edges': {}},
+}
+
 ACCESS_RULES = {
-    Order.OrderStatus.NFW: ['Заказчик'],
-    Order.OrderStatus.OVK: ['Куратор'],
-    Order.OrderStatus.OVC: ['Исполнитель'],
-    Order.OrderStatus.OA: ['Заказчик'],
-    Order.OrderStatus.SA: ['Заказчик'],
-    Order.OrderStatus.CSA: ['Куратор'],
-    Order.OrderStatus.ESA: ['Исполнитель'],
-    Order.OrderStatus.OGDS: ['Заказчик'],
-    Order.OrderStatus.CGDS: ['Куратор'],
-    Order.OrderStatus.EGDS: ['Исполнитель'],
-    Order.OrderStatus.PO: ['Заказчик'],
-    Order.OrderStatus.POK: ['Куратор'],
-    Order.OrderStatus.POC: ['Исполнитель'],
-    Order.OrderStatus.MPO: ['Исполнитель'],
-    Order.OrderStatus.MTP: ['Исполнитель'],
-    Order.OrderStatus.MTPF: ['Исполнитель'],
-    Order.OrderStatus.MPT: ['Исполнитель'],
-    Order.OrderStatus.MTPB: ['Исполнитель'],
-    Order.OrderStatus.MFT: ['Исполнитель'],
-    Order.OrderStatus.MCS: ['Исполнитель'],
-    Order.OrderStatus.MCP: ['Исполнитель'],
-    Order.OrderStatus.MPOP: ['Исполнитель'],
-    Order.OrderStatus.SO: ['Исполнитель'],
-    Order.OrderStatus.PS: ['Куратор'],
-    Order.OrderStatus.CR: ['Заказчик'],
+    status: spec['roles'] for status, spec in ORDER_WORKFLOW.items() if spec['roles']
+}
+
+ROLE_CODES = {name: code for code, name in ROLE_NAMES.items()}
+
+# Таблица прав, собранная при импорте: для роли — битовая маска статусов, в которых
+# она действует. Проверки ниже идут по целым числам и не обращаются к базе.
+STATUS_BITS = {status: 1 << index for index, status in enumerate(S.values)}
+ROLE_STATUS_MASKS = {
+    code: sum(STATUS_BITS[status] for status, roles in ACCESS_RULES.items() if name in roles)
+    for code, name in ROLE_NAMES.items()
 }
 
+
+@dataclass(frozen=True)
+class ProfileScope:
+    """
+    Данные профиля, от которых зависят права: роль, компания, платформа исполнителя,
+    срок действия учётной записи (timestamp). Хранится в сессии (utils.profile_scope),
+    поэтому содержит только простые значения.
+    """
+    user_id: int
+    profile_id: int
+    role: int
+    role_name: str
+    company_id: int | None = None
+    platform_id: int | None = None
+    expires_at: float | None = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def profile_scope(user_profile):
+    """ProfileScope для профиля; готовый ProfileScope возвращается как есть"""
+    if isinstance(user_profile, ProfileScope):
+        return user_profile
+    role_name = user_profile.role.name
+    return ProfileScope(
+        user_id=user_profile.user_id,
+        profile_id=user_profile.pk,
+        role=ROLE_CODES.get(role_name, 0),
+        role_name=role_name,
+        company_id=user_profile.company_id,
+        platform_id=user_profile.platform_id,
+        expires_at=user_profile.expiration_date.timestamp() if user_profile.expiration_date else None,
+    )
+
+
+def role_can_act(user_profile, status):
+    """Роль пользователя действует в статусе по таблице ORDER_WORKFLOW"""
+    return bool(ROLE_STATUS_MASKS.get(profile_scope(user_profile).role, 0) & STATUS_BITS.get(status, 0))
+
+
 def check_view_permission(user_profile, order):
-    user_role = user_profile.role.name
-    user_company = user_profile.company_name
+    scope = profile_scope(user_profile)
     
-    if order.creator.user.id == user_profile.user.id:
+    if order.creator.user_id == scope.user_id:
         return True
     
-    if user_company == order.creator.company_name:
+    if scope.company_id is not None and scope.company_id == order.creator.company_id:
         return True
     
-    if user_role == 'Куратор':
+    if scope.role == ROLE_CURATOR:
         return True
     
-    if user_role == 'Исполнитель':
-        try:
-            user_platform = Platform.objects.get(platform_code=user_company)
-            if user_platform.id == order.platform_code_id:
-                return True
-        except Platform.DoesNotExist:
-            return False
+    if scope.role == ROLE_EXECUTOR:
+        return scope.platform_id is not None and scope.platform_id == order.platform_code_id
     
     return False
 
 def check_edit_permission(user_profile, order):
     """Проверка прав на редактирование заказа"""
-    user_role = user_profile.role.name
+    scope = profile_scope(user_profile)
     
-    if order.creator.user.id == user_profile.user.id:
+    if order.creator.user_id == scope.user_id:
         return True
     
-    if user_role == 'Куратор':
+    if scope.role == ROLE_CURATOR:
         return True
     
-    if user_role == 'Исполнитель':
-        try:
-            user_platform = Platform.objects.get(platform_code=user_profile.company_name)
-            if user_platform.id == order.platform_code_id:
-                return True
-        except Platform.DoesNotExist:
-            return False
+    if scope.role == ROLE_EXECUTOR:
+        return scope.platform_id is not None and scope.platform_id == order.platform_code_id
     
-    return False
\ No newline at end of file
+    return False
+
+def can_act(user_profile, order):
+    """Пользователь может выполнить действие текущего этапа заказа (кнопки дашбордов, restrict_by_status)"""
+    return role_can_act(user_profile, order.order_status) and check_edit_permission(user_profile, order)
+
+def view_permission_q(user_profile):
+    """Условие check_view_permission в виде фильтра queryset (выгрузки, списки)"""
+    scope = profile_scope(user_profile)
+    condition = Q(creator__user_id=scope.user_id)
+
+    if scope.role == ROLE_CURATOR:
+        return Q()
+
+    if scope.company_id is not None:
+        condition |= Q(creator__company_id=scope.company_id)
+
+    if scope.role == ROLE_EXECUTOR and scope.platform_id is not None:
+        condition |= Q(platform_code_id=scope.platform_id)
+
+    return condition
+
+def edit_permission_q(user_profile):
+    """Условие check_edit_permission в виде фильтра queryset для массовых операций"""
+    scope = profile_scope(user_profile)
+    condition = Q(creator__user_id=scope.user_id)
+
+    if scope.role == ROLE_CURATOR:
+        return Q()
+
+    if scope.role == ROLE_EXECUTOR and scope.platform_id is not None:
+        condition |= Q(platform_code_id=scope.platform_id)
+
+    return condition
\ No newline at end of file
@@ -1,5 +1,24 @@
+from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
 
+# Связи, загружаемые вместе с пользователем сессии: request.user.profile.role
+# дальше не обращается к базе ни в middleware, ни в контекст-процессорах, ни во view
+USER_RELATED_FIELDS = ('profile__role',)
+
+
+def load_user(user_id):
+    """Пользователь с профилем и ролью одним запросом; None, если пользователя нет"""
+    return User.objects.select_related(*USER_RELATED_FIELDS).filter(pk=user_id).first()
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    Вход по логину, как ModelBackend; пользователь сессии загружается вместе с профилем.
+    """
+    def get_user(self, user_id):
+        user = load_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
 
 class EmailAuthBackend:
     """
@@ -15,7 +34,4 @@ class EmailAuthBackend:
             return None
 
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return load_user(user_id)
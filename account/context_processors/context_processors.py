@@ -1,12 +1,13 @@
-from ..models import Topic, UserTopic, Message
-from ..utils.email_recipients import send_email_about_unread_message
+from ..models import UnreadCounter
+from ..utils.profile_scope import get_profile_scope
 
 
 def user_role(request):
-    if request.user.is_authenticated:
-        role = request.user.profile.role.name
-        return {'user_role': role}
-    return {'user_role': None}
+    scope = get_profile_scope(request)
+    return {
+        'user_role': scope.role_name if scope else None,
+        'profile_scope': scope,
+    }
 
 
 def unread_messages(request):
@@ -16,33 +17,16 @@ def unread_messages(request):
         return {'has_unread_messages_by_order_id': {}}
 
     profile = request.user.profile
-    unread_by_order = {}
-
-    private_topics = Topic.objects.filter(
-        is_private=True,
-        usertopic__user=profile
-    ).select_related('related_order')
-
-    for topic in private_topics:
-        order_id = topic.related_order_id
-        if not order_id:
-            continue
-
-        user_topic = UserTopic.objects.filter(user=profile, topic=topic).first()
-        last_message = Message.objects.filter(topic=topic).order_by('-id').first()
-
-        if not last_message:
-            continue
-
-        if user_topic and user_topic.last_read_message:
-            has_unread = last_message.id > user_topic.last_read_message.id
-        else:
-            has_unread = True
 
-        if has_unread:
-            unread_by_order[order_id] = True
+    # Один индексированный запрос по денормализованным счётчикам (UnreadCounter)
+    order_ids = UnreadCounter.objects.filter(
+        profile=profile,
+        unread_count__gt=0,
+        topic__is_private=True,
+        topic__related_order__isnull=False,
+    ).values_list('topic__related_order_id', flat=True)
 
-    return {'has_unread_messages_by_order_id': unread_by_order}
+    return {'has_unread_messages_by_order_id': dict.fromkeys(order_ids, True)}
 
 
 def theme(request):
@@ -1,15 +1,18 @@
 from functools import wraps
 from django.shortcuts import render
-from account.models import Order, Profile
-from ..access_rules.access_rules import ACCESS_RULES, check_view_permission, check_edit_permission
+from account.models import Order
+from ..access_rules.access_rules import check_view_permission, check_edit_permission, role_can_act
+from ..utils.order_loader import load_order
+from ..utils.profile_scope import get_profile_scope
+from ..utils.order_workflow import TransitionError
 
 def restrict_by_status(order_kwarg='order_id'):
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
-            try:
-                user_profile = Profile.objects.select_related('role').get(user=request.user)
-            except Profile.DoesNotExist:
+            # Роль, компания и платформа берутся из сессии: проверка прав не читает профиль из базы
+            user_profile = get_profile_scope(request)
+            if user_profile is None:
                 return render(request, 'account/forbidden.html', {
                     'reason': 'У вашего пользователя отсутствует профиль или роль.'
                 }, status=403)
@@ -21,7 +24,7 @@ def restrict_by_status(order_kwarg='order_id'):
                 }, status=403)
 
             try:
-                order = Order.objects.select_related('creator').get(id=order_id)
+                order = load_order(request, order_id)
             except Order.DoesNotExist:
                 return render(request, 'account/forbidden.html', {
                     'reason': f'Заказ с номером {order_id} не найден.'
@@ -40,12 +43,17 @@ def restrict_by_status(order_kwarg='order_id'):
                     'reason': 'Вы не можете редактировать этот заказ.'
                 }, status=403)
 
-            allowed_roles = ACCESS_RULES.get(order.order_status, [])
-            if user_profile.role.name not in allowed_roles:
+            if not role_can_act(user_profile, order.order_status):
                 return render(request, 'account/forbidden.html', {
                     'reason': 'Вы не имеете доступ к этой странице.'
                 }, status=403)
 
-            return view_func(request, *args, **kwargs)
+            try:
+                return view_func(request, *args, **kwargs)
+            except TransitionError:
+                # Статус поменяли в параллельном запросе — переход по устаревшей странице не выполняется
+                return render(request, 'account/forbidden.html', {
+                    'reason': 'Статус заказа уже изменён другим пользователем. Обновите страницу.'
+                }, status=409)
         return _wrapped_view
     return decorator
@@ -1,33 +1,38 @@
+import tempfile
+
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Border, Side, Alignment
+from openpyxl.utils import get_column_letter
+from django.utils.timezone import localtime
 from ..models import *
 
+# Связи, которые читает get_order_rows: выгрузка идёт без запросов на каждый заказ
+ORDER_EXPORT_RELATED = (
+    'creator',
+    'technical_process',
+    'platform_code',
+    'selected_thickness',
+    'selected_diameter',
+)
+EXPORT_CHUNK_SIZE = 1000
+# Лист на заказ в write-only режиме держит открытым временный файл до сохранения книги
+PER_ORDER_SHEETS_LIMIT = 500
 
-def generate_excel_file(request, order_id):
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return None
 
-    def get_display_value(value):
-        if isinstance(value, bool):
-            return 'да' if value else 'нет'
-        if value is None:
-            return 'нет'
-        if isinstance(value, str) and not value.strip():
-            return 'нет'
-        return value
+def get_display_value(value):
+    if isinstance(value, bool):
+        return 'да' if value else 'нет'
+    if value is None:
+        return 'нет'
+    if isinstance(value, str) and not value.strip():
+        return 'нет'
+    return value
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = 'Order Data'
 
-    header_cell = ws.cell(row=1, column=1, value='Информация по заказу')
-    header_cell.font = Font(bold=True)
-    header_cell.border = Border(right=Side(style='thick'), bottom=Side(style='thick'))
-    header_cell.alignment = Alignment(wrap_text=True)
-
-    order_data = [
+def get_order_rows(order, filled_by):
+    """Пары (заголовок, значение) с данными заказа, общие для всех видов выгрузки"""
+    return [
         ('Номер заказа', order.order_number),
         ('Наименование предприятия заказчика', order.creator.company_name if hasattr(order.creator, 'company_name') else ''),
         ('Код заказчика', str(order.creator.id)),
@@ -53,9 +58,27 @@ def generate_excel_file(request, order_id):
         ('Ускоренный запуск производства фотошаблонов', get_display_value(order.delivery_premium_template)),
         ('Ускоренный запуск производства пластин', get_display_value(order.delivery_premium_plate)),
         ('Примечания', order.special_note if order.special_note else 'нет'),
-        ('Форму заполнил', request.user.email),
+        ('Форму заполнил', filled_by),
     ]
 
+
+def generate_excel_file(request, order_id):
+    try:
+        order = Order.objects.get(id=order_id)
+    except Order.DoesNotExist:
+        return None
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Order Data'
+
+    header_cell = ws.cell(row=1, column=1, value='Информация по заказу')
+    header_cell.font = Font(bold=True)
+    header_cell.border = Border(right=Side(style='thick'), bottom=Side(style='thick'))
+    header_cell.alignment = Alignment(wrap_text=True)
+
+    order_data = get_order_rows(order, request.user.email)
+
     for row_num, (header, value) in enumerate(order_data, start=3):
         ws.cell(row=row_num, column=1, value=header).alignment = Alignment(wrap_text=True, horizontal='left')
         ws.cell(row=row_num, column=2, value=value).alignment = Alignment(wrap_text=True, horizontal='left')
@@ -64,3 +87,86 @@ def generate_excel_file(request, order_id):
     ws.column_dimensions['B'].width = 35
 
     return wb
+
+
+def _bold_cell(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = Font(bold=True)
+    return cell
+
+
+def _write_summary_sheet(wb, orders, filled_by):
+    ws = wb.create_sheet('Заказы')
+    ws.freeze_panes = 'A2'
+    header_written = False
+
+    for order in orders:
+        rows = get_order_rows(order, filled_by)
+        if not header_written:
+            for column in range(1, len(rows) + 3):
+                ws.column_dimensions[get_column_letter(column)].width = 25
+            ws.append(
+                [_bold_cell(ws, header) for header, _ in rows]
+                + [_bold_cell(ws, 'Статус заказа'), _bold_cell(ws, 'Дата создания')]
+            )
+            header_written = True
+        # localtime(None) вернул бы текущее время: у заказа без даты создания ячейка пустая
+        created_at = localtime(order.created_at).replace(tzinfo=None) if order.created_at else None
+        ws.append([value for _, value in rows] + [order.get_order_status_display(), created_at])
+
+    if not header_written:
+        ws.append([_bold_cell(ws, 'Нет заказов по заданным условиям')])
+
+
+def _write_order_sheets(wb, orders, filled_by):
+    used_titles = set()
+    for index, order in enumerate(orders):
+        if index >= PER_ORDER_SHEETS_LIMIT:
+            raise ValueError(f'Не больше {PER_ORDER_SHEETS_LIMIT} заказов при выгрузке по листам')
+
+        title = order.order_number[:31]
+        if title in used_titles:
+            title = f'{order.order_number[:24]}_{order.id}'[:31]
+        used_titles.add(title)
+
+        ws = wb.create_sheet(title)
+        ws.column_dimensions['A'].width = 35
+        ws.column_dimensions['B'].width = 35
+        ws.append([_bold_cell(ws, 'Информация по заказу')])
+        ws.append([])
+        for header, value in get_order_rows(order, filled_by):
+            ws.append([header, value])
+
+    if not used_titles:
+        ws = wb.create_sheet('Заказы')
+        ws.append([_bold_cell(ws, 'Нет заказов по заданным условиям')])
+
+
+def write_orders_workbook(queryset, filled_by, output, per_order_sheets=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Выгрузка группы заказов в xlsx в write-only режиме openpyxl: строки сразу уходят
+    во временные файлы листов, заказы читаются из БД пачками через iterator().
+    По умолчанию — одна строка на заказ; per_order_sheets=True — прежний вид, лист на заказ.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    orders = queryset.select_related(*ORDER_EXPORT_RELATED).iterator(chunk_size=chunk_size)
+
+    if per_order_sheets:
+        _write_order_sheets(wb, orders, filled_by)
+    else:
+        _write_summary_sheet(wb, orders, filled_by)
+
+    wb.save(output)
+    return output
+
+
+def export_orders_to_tempfile(queryset, filled_by, per_order_sheets=False):
+    """Книга пишется во временный файл на диске; файл удаляется при закрытии"""
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        write_orders_workbook(queryset, filled_by, output, per_order_sheets=per_order_sheets)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
@@ -1,11 +1,11 @@
 from django import forms
 from django.utils.html import strip_tags
-from django.db.models import Min
 from django.contrib.auth.models import User
 from ..models import Profile, Order, Platform, TechnicalProcess, Substrate, \
 Thickness, Diameter, Message, Topic, File, RegistrationRequest
 from captcha.fields import CaptchaField
 from ..utils.sanitizer import sanitizer
+from ..utils.reference_catalog import CONTAINER_RULES, get_catalog
 
 
 class LoginForm(forms.Form):
@@ -158,7 +158,19 @@ class OrderEditForm(forms.ModelForm):
 
         self.fields['selected_thickness'].initial = 2
         # 2 - значение диаметра 100, которое подставляется первым(подгружается из фикстуры)
-        
+
+        # Варианты списков берутся из справочника: отрисовка формы не обращается к базе,
+        # запрос выполняется только при проверке выбранного значения
+        self.catalog = get_catalog()
+        self._set_catalog_choices('platform_code', [
+            (platform['id'], platform['name']) for platform in self.catalog.platforms()
+        ])
+        self._set_catalog_choices('selected_thickness', [
+            (thickness['id'], thickness['value']) for thickness in self.catalog.thicknesses()
+        ])
+        self._set_catalog_choices('technical_process', [])
+        self._set_catalog_choices('selected_diameter', [])
+
         if self.data:
             self.handle_ajax_requests()
         elif self.instance.pk:
@@ -166,43 +178,43 @@ class OrderEditForm(forms.ModelForm):
 
         self.update_container_choices()
 
+    def _set_catalog_choices(self, name, choices):
+        field = self.fields[name]
+        empty = [('', field.empty_label)] if field.empty_label is not None else []
+        field.choices = empty + choices
+
+    def _load_platform_choices(self, platform_id):
+        # Только уникальные техпроцессы для выбранной платформы
+        technical_processes = self.catalog.technical_processes(platform_id)
+        diameters = self.catalog.diameters(platform_id)
+        self.fields['technical_process'].queryset = TechnicalProcess.objects.filter(
+            id__in=[process['id'] for process in technical_processes]
+        )
+        self._set_catalog_choices('technical_process', [
+            (process['id'], process['name_process']) for process in technical_processes
+        ])
+        self.fields['selected_diameter'].queryset = Diameter.objects.filter(platform_id=platform_id)
+        self._set_catalog_choices('selected_diameter', [
+            (diameter['id'], f"{diameter['value']} мм") for diameter in diameters
+        ])
+        return diameters
+
     def handle_ajax_requests(self):
         try:
             if 'platform_code' in self.data:
                 platform_id = int(self.data.get('platform_code'))
-                
-                # Получение только уникальные техпроцессы для выбранной платформе
-                unique_ids = (
-                    TechnicalProcess.objects
-                    .filter(platform_id=platform_id)
-                    .values('name_process')
-                    .annotate(min_id=Min('id'))
-                    .values_list('min_id', flat=True)
-                )
-                self.fields['technical_process'].queryset = TechnicalProcess.objects.filter(id__in=unique_ids)
-
-                self.fields['selected_diameter'].queryset = Diameter.objects.filter(platform_id=platform_id)
+                diameters = self._load_platform_choices(platform_id)
+
                 selected_diameter_val = self.data.get('selected_diameter')
-                if selected_diameter_val and self.fields['selected_diameter'].queryset.filter(pk=selected_diameter_val).exists():
+                if selected_diameter_val and any(str(d['id']) == selected_diameter_val for d in diameters):
                     self.initial['selected_diameter'] = selected_diameter_val
         except (ValueError, TypeError):
             pass
 
     def load_instance_data(self):
-        # Загрузка данных для существующего заказа, обновление queryset полей формы
-        if self.instance.platform_code:
-            self.fields['selected_diameter'].queryset = Diameter.objects.filter(
-                platform=self.instance.platform_code
-            )
-            # Загружаем уникальные техпроцессы для текущей платформы
-            unique_ids = (
-                TechnicalProcess.objects
-                .filter(platform_id=self.instance.platform_code.id)
-                .values('name_process')
-                .annotate(min_id=Min('id'))
-                .values_list('min_id', flat=True)
-            )
-            self.fields['technical_process'].queryset = TechnicalProcess.objects.filter(id__in=unique_ids)
+        # Загрузка данных для существующего заказа, обновление вариантов полей формы
+        if self.instance.platform_code_id:
+            self._load_platform_choices(self.instance.platform_code_id)
 
         if hasattr(self.instance, 'wafer_deliver_format'):
             self._update_container_for_crystals_choices(self.instance.wafer_deliver_format)
@@ -218,19 +230,7 @@ class OrderEditForm(forms.ModelForm):
         return cleaned_data
 
     def _update_container_for_crystals_choices(self, wafer_deliver_format):
-        choices = {
-            Order.WaferDeliverFormat.NotCut: [
-                (Order.ContainerForCrystals.СontainerForCrystalls, 'Тара для пластин'),
-            ],
-            Order.WaferDeliverFormat.Cut: [
-                (Order.ContainerForCrystals.EmFrame, 'Пяльцы'),
-            ],
-            Order.WaferDeliverFormat.Container: [
-                (Order.ContainerForCrystals.PlasticCells, 'Пластмассовые ячейки'),
-                (Order.ContainerForCrystals.GelPack, 'Gel-Pak'),
-            ]
-        }
-        self.fields['container_for_crystals'].choices = choices.get(wafer_deliver_format, [])
+        self.fields['container_for_crystals'].choices = CONTAINER_RULES.get(wafer_deliver_format, [])
             
             
             
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from account.utils.gds_analysis import analyze_pending_gds
+
+
+class Command(BaseCommand):
+    help = 'Extract GDSII metadata (cells, layers, bounding box) from uploaded order GDS files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5)
+        parser.add_argument('--loop', action='store_true',
+                            help='Run as a long-lived worker instead of a single cron pass')
+        parser.add_argument('--interval', type=float, default=10,
+                            help='Seconds to sleep when there is nothing to analyze (with --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            total_done = total_failed = 0
+            while True:
+                done, failed = analyze_pending_gds(options['batch_size'])
+                total_done += done
+                total_failed += failed
+                if not done and not failed:
+                    break
+
+            if total_done or total_failed or not options['loop']:
+                self.stdout.write(f'Analyzed {total_done} GDS files, failed {total_failed}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from account.utils.chunked_upload import cleanup_stale_uploads, UPLOAD_SESSION_TTL
+
+
+class Command(BaseCommand):
+    help = 'Remove abandoned chunked uploads and their staging files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=UPLOAD_SESSION_TTL.total_seconds() / 3600,
+                            help='Remove unfinished uploads idle for longer than this')
+
+    def handle(self, *args, **options):
+        removed = cleanup_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(f'Removed {removed} stale uploads')
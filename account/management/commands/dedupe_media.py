@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from account.models import MediaBlob
+from account.utils.media_store import media_store_models, adopt_file, recount_media_refs, collect_garbage, \
+    compress_blob, is_compressible, BLOB_GC_GRACE
+
+
+class Command(BaseCommand):
+    help = 'Move existing order/chat/PDK files into the content-addressed store, compress, recount references, collect garbage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gc', action='store_true',
+                            help='Delete blobs that are no longer referenced by any row')
+        parser.add_argument('--grace-hours', type=float, default=BLOB_GC_GRACE.total_seconds() / 3600)
+        parser.add_argument('--compress', action='store_true',
+                            help='Compress stored blobs of compressible files (GDS, text) that are kept raw')
+
+    def handle(self, *args, **options):
+        adopted = 0
+        for model, fields in media_store_models():
+            for field in fields:
+                storage = model._meta.get_field(field).storage
+                names = model._base_manager.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}) \
+                    .values_list(field, flat=True).distinct()
+                adopted += sum(adopt_file(name, storage) for name in names.iterator())
+
+        blobs = recount_media_refs()
+        self.stdout.write(f'Adopted {adopted} files, {len(blobs)} referenced blobs')
+
+        if options['compress']:
+            compressed = 0
+            for blob in MediaBlob.objects.filter(encoding='').prefetch_related('paths').iterator(chunk_size=500):
+                if any(is_compressible(digest.path) for digest in blob.paths.all()):
+                    compressed += compress_blob(blob)
+            self.stdout.write(f'Compressed {compressed} blobs')
+
+        if options['gc']:
+            removed = collect_garbage(timedelta(hours=options['grace_hours']))
+            self.stdout.write(f'Removed {removed} unreferenced blobs')
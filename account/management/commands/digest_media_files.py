@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from account.utils.file_digest import digest_pending_files
+
+
+class Command(BaseCommand):
+    help = 'Compute SHA-256 digests (download ETag) of media files queued by downloads of old or changed files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true',
+                            help='Run as a long-lived worker instead of a single cron pass')
+        parser.add_argument('--interval', type=float, default=10,
+                            help='Seconds to sleep when there is nothing to digest (with --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                done = digest_pending_files(options['batch_size'])
+                total += done
+                if not done:
+                    break
+
+            if total or not options['loop']:
+                self.stdout.write(f'Digested {total} media files')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
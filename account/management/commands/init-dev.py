@@ -4,9 +4,9 @@ from django.core.management.base import BaseCommand
 fixtures = [
     'account.role.json',
     'auth.user.json',
-    'account.profile.json',
-
+    'account.company.json',
     'account.platform.json',
+    'account.profile.json',
 
     'account.technicalprocess.json',
     'account.diameter.json',
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from account.utils.order_search import rebuild_order_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the order search index (FTS5 or token table fallback)'
+
+    def handle(self, *args, **options):
+        total = rebuild_order_search_index()
+        self.stdout.write(f'Indexed {total} orders')
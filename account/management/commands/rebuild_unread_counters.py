@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from account.utils.unread_counters import rebuild_unread_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized unread message counters from Message/UserTopic'
+
+    def handle(self, *args, **options):
+        total = rebuild_unread_counters()
+        self.stdout.write(f'Rebuilt {total} unread counters')
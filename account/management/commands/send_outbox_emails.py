@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from account.utils.email_outbox import deliver_outbox
+from account.utils.mail_transport import close_pooled_connection
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from EmailOutbox over a pooled, rate-limited SMTP session'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true',
+                            help='Run as a long-lived worker instead of a single cron pass')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep when the outbox is empty (with --loop)')
+
+    def handle(self, *args, **options):
+        try:
+            self._run(options)
+        finally:
+            close_pooled_connection()
+
+    def _run(self, options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = deliver_outbox(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if not sent and not failed:
+                    break
+
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(f'Sent {total_sent} emails, failed {total_failed}')
+            if not options['loop']:
+                return
+            if not total_sent and not total_failed:
+                # Очередь пуста — не держим сессию открытой, пока ждём новых писем
+                close_pooled_connection()
+            time.sleep(options['interval'])
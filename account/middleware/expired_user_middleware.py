@@ -1,15 +1,44 @@
+import time
+from functools import lru_cache
+
+from django.conf import settings
 from django.shortcuts import redirect
-from django.urls import reverse
-from django.utils.timezone import now
+from django.urls import get_script_prefix, reverse
+
+from ..utils.profile_scope import session_expiry
+from ..utils.signed_downloads import signed_download_prefix
+
+
+@lru_cache(maxsize=None)
+def expiry_exempt_prefixes():
+    """
+    Пути, для которых срок действия учётной записи не проверяется: статика, медиа, капча,
+    подписанные ссылки и префиксы из настройки EXPIRY_EXEMPT_PREFIXES (относительно префикса приложения).
+    Срок подписанной ссылки не превышает срока учётной записи (signed_download_url).
+    """
+    script_prefix = get_script_prefix()
+    extra = getattr(settings, 'EXPIRY_EXEMPT_PREFIXES', ('captcha/',))
+    prefixes = [settings.STATIC_URL, settings.MEDIA_URL, signed_download_prefix()]
+    prefixes += [script_prefix + prefix.lstrip('/') for prefix in extra]
+    return tuple(prefix for prefix in prefixes if prefix and prefix != '/')
+
+
+@lru_cache(maxsize=None)
+def account_expired_path():
+    return reverse('account_expired')
+
 
 def expired_user_middleware(get_response):
     def middleware(request):
-        if request.user.is_authenticated:
-            profile = getattr(request.user, 'profile', None)
-            if profile and profile.expiration_date and now() >= profile.expiration_date:
-                if request.path != reverse('account_expired'):
-                    return redirect('account_expired')
-
-        response = get_response(request)
-        return response
-    return middleware
\ No newline at end of file
+        # Подписанные ссылки и статика проверяются без сессии: request.user не загружается
+        if request.path.startswith(expiry_exempt_prefixes()):
+            return get_response(request)
+        # Срок берётся из scope в сессии, сверенного с профилем пользователя запроса;
+        # тот же пользователь и scope дальше используются во view без новых запросов
+        expires_at = session_expiry(request)
+        if expires_at is not None and time.time() >= expires_at:
+            expired_path = account_expired_path()
+            if request.path != expired_path:
+                return redirect(expired_path)
+        return get_response(request)
+    return middleware
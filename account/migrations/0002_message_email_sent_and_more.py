@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='email_sent',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='registrationrequest',
+            name='browser_language',
+            field=models.CharField(blank=True, max_length=10, null=True, verbose_name='Язык браузера'),
+        ),
+        migrations.AddField(
+            model_name='registrationrequest',
+            name='country',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Страна'),
+        ),
+        migrations.AddField(
+            model_name='registrationrequest',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата и время заявки'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='registrationrequest',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, null=True, verbose_name='IP адрес'),
+        ),
+        migrations.AddField(
+            model_name='technicalprocess',
+            name='created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='technicalprocess',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='order_status',
+            field=models.CharField(choices=[('NFW', 'Требуется уточнение'), ('OVK', 'На проверке у куратора'), ('OVC', 'На проверке у исполнителя'), ('OA', 'Принят'), ('SA', 'Подписание договора'), ('CSA', 'Подписание договора куратором'), ('ESA', 'Подписание договора исполнителем'), ('OGDS', 'Загрузка GDS'), ('CGDS', 'Проверка GDS куратором'), ('EGDS', 'Проверка GDS исполнителем'), ('PO', 'Оплата'), ('POK', 'Подтверждение оплаты куратором'), ('POC', 'Подтверждение оплаты исполнителем'), ('MPO', 'Запуск в производство'), ('MTP', 'Изготовление шаблонов'), ('MTPF', 'Производство: формирование лицевой стороны'), ('MPT', 'Предварительный тест ПМ'), ('MTPB', 'Производство: формирование обратной стороны'), ('MFT', 'Финальный тест ПМ'), ('MCS', 'Разбраковка кристаллов'), ('MCP', 'Резка пластин'), ('MPOP', 'Упаковка пластин'), ('SO', 'Отгрузка'), ('PS', 'Пластины отправлены'), ('CR', 'Подтверждение получения пластин'), ('EO', 'Завершен')], default='OVK', max_length=200, verbose_name='Статус заказа'),
+        ),
+        migrations.CreateModel(
+            name='OrderStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.CharField(blank=True, choices=[('NFW', 'Требуется уточнение'), ('OVK', 'На проверке у куратора'), ('OVC', 'На проверке у исполнителя'), ('OA', 'Принят'), ('SA', 'Подписание договора'), ('CSA', 'Подписание договора куратором'), ('ESA', 'Подписание договора исполнителем'), ('OGDS', 'Загрузка GDS'), ('CGDS', 'Проверка GDS куратором'), ('EGDS', 'Проверка GDS исполнителем'), ('PO', 'Оплата'), ('POK', 'Подтверждение оплаты куратором'), ('POC', 'Подтверждение оплаты исполнителем'), ('MPO', 'Запуск в производство'), ('MTP', 'Изготовление шаблонов'), ('MTPF', 'Производство: формирование лицевой стороны'), ('MPT', 'Предварительный тест ПМ'), ('MTPB', 'Производство: формирование обратной стороны'), ('MFT', 'Финальный тест ПМ'), ('MCS', 'Разбраковка кристаллов'), ('MCP', 'Резка пластин'), ('MPOP', 'Упаковка пластин'), ('SO', 'Отгрузка'), ('PS', 'Пластины отправлены'), ('CR', 'Подтверждение получения пластин'), ('EO', 'Завершен')], default='NFW', max_length=200, null=True, verbose_name='Предыдущий статус')),
+                ('new_status', models.CharField(choices=[('NFW', 'Требуется уточнение'), ('OVK', 'На проверке у куратора'), ('OVC', 'На проверке у исполнителя'), ('OA', 'Принят'), ('SA', 'Подписание договора'), ('CSA', 'Подписание договора куратором'), ('ESA', 'Подписание договора исполнителем'), ('OGDS', 'Загрузка GDS'), ('CGDS', 'Проверка GDS куратором'), ('EGDS', 'Проверка GDS исполнителем'), ('PO', 'Оплата'), ('POK', 'Подтверждение оплаты куратором'), ('POC', 'Подтверждение оплаты исполнителем'), ('MPO', 'Запуск в производство'), ('MTP', 'Изготовление шаблонов'), ('MTPF', 'Производство: формирование лицевой стороны'), ('MPT', 'Предварительный тест ПМ'), ('MTPB', 'Производство: формирование обратной стороны'), ('MFT', 'Финальный тест ПМ'), ('MCS', 'Разбраковка кристаллов'), ('MCP', 'Резка пластин'), ('MPOP', 'Упаковка пластин'), ('SO', 'Отгрузка'), ('PS', 'Пластины отправлены'), ('CR', 'Подтверждение получения пластин'), ('EO', 'Завершен')], max_length=200, verbose_name='Новый статус')),
+                ('comment', models.TextField(blank=True, help_text='Комментарий к изменению статуса (опционально)', null=True, verbose_name='Комментарий')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='account.profile', verbose_name='Кто изменил')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='account.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'История статуса заказа',
+                'verbose_name_plural': 'История статусов заказов',
+                'ordering': ['-changed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Q, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_unread_counters(apps, schema_editor):
+    UserTopic = apps.get_model('account', 'UserTopic')
+    UnreadCounter = apps.get_model('account', 'UnreadCounter')
+
+    user_topics = UserTopic.objects.annotate(
+        unread=Count(
+            'topic__messages',
+            filter=Q(topic__messages__id__gt=Coalesce(F('last_read_message_id'), Value(0)))
+            & ~Q(topic__messages__user_id=F('user_id')),
+        ),
+        last_id=Max('topic__messages__id'),
+    ).values_list('user_id', 'topic_id', 'unread', 'last_id')
+
+    UnreadCounter.objects.bulk_create(
+        [
+            UnreadCounter(profile_id=profile_id, topic_id=topic_id,
+                          unread_count=unread, last_message_id=last_id)
+            for profile_id, topic_id, unread, last_id in user_topics.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_message_email_sent_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0, verbose_name='Непрочитанных сообщений')),
+                ('last_message_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID последнего сообщения')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='account.profile')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='account.topic')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'unread_count'], name='unread_profile_count_idx')],
+                'unique_together': {('profile', 'topic')},
+            },
+        ),
+        migrations.RunPython(fill_unread_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:25
+
+import os
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction, OperationalError
+from django.utils.timezone import localtime
+
+FTS_TABLE = 'account_order_search_fts'
+
+# Замороженная копия account.utils.order_search на момент миграции:
+# последующие изменения токенизатора не меняют эту миграцию
+TOKEN_RE = re.compile(r'[^\W_]+')
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+MAX_TOKEN_LENGTH = 100
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def order_search_tokens(Order, order):
+    tokens = set()
+
+    for identifier in (order.order_number, str(order.id), order.platform_code.platform_code):
+        for token in tokenize(identifier):
+            tokens.update(token[i:] for i in range(len(token)))
+
+    for name in ('order_status', 'order_type'):
+        value = getattr(order, name)
+        tokens.update(tokenize(dict(Order._meta.get_field(name).flatchoices).get(value, value)))
+
+    for value in (order.order_date, order.deadline_date):
+        if value:
+            value = localtime(value)
+            for fmt in DATE_FORMATS:
+                tokens.update(tokenize(value.strftime(fmt)))
+
+    for name in ('contract_file', 'invoice_file', 'GDS_file'):
+        file_field = getattr(order, name)
+        if file_field and file_field.name:
+            tokens.update(tokenize(os.path.basename(file_field.name)))
+
+    return {token[:MAX_TOKEN_LENGTH] for token in tokens}
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    fts = False
+    if connection.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                    f'content, tokenize="unicode61 remove_diacritics 0", prefix="2 3")'
+                )
+            fts = True
+        except OperationalError:
+            # SQLite собран без FTS5 — остаётся таблица токенов OrderSearchToken
+            fts = False
+
+    Order = apps.get_model('account', 'Order')
+    OrderSearchToken = apps.get_model('account', 'OrderSearchToken')
+
+    for order in Order.objects.select_related('platform_code').iterator(chunk_size=1000):
+        tokens = order_search_tokens(Order, order)
+        if fts:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, content) VALUES (%s, %s)',
+                    [order.id, ' '.join(sorted(tokens))],
+                )
+        else:
+            OrderSearchToken.objects.bulk_create(
+                [OrderSearchToken(order_id=order.id, token=token) for token in tokens]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='account.order')),
+            ],
+            options={
+                'unique_together': {('token', 'order')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
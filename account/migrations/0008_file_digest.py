@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_job_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True, verbose_name='Путь от MEDIA_ROOT')),
+                ('size', models.BigIntegerField(verbose_name='Размер, байт')),
+                ('mtime', models.FloatField(verbose_name='Время изменения файла')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:48
+
+import account.models
+import account.utils.media_store
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='Размер, байт')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='Ссылок')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Обновлён')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='file_path',
+            field=models.FileField(storage=account.utils.media_store.ContentAddressedStorage(), upload_to=account.models.document_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(storage=account.utils.media_store.ContentAddressedStorage(), upload_to='topic_files/'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='GDS_file',
+            field=models.FileField(blank=True, default='', storage=account.utils.media_store.ContentAddressedStorage(), upload_to='uploads/GDS/%Y/%m/%d/', verbose_name='Файл GDS'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='contract_file',
+            field=models.FileField(blank=True, default='', storage=account.utils.media_store.ContentAddressedStorage(), upload_to='uploads/contracts/%Y/%m/%d/', verbose_name='Файл договора'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='invoice_file',
+            field=models.FileField(blank=True, default='', storage=account.utils.media_store.ContentAddressedStorage(), upload_to='uploads/invoices/%Y/%m/%d/', verbose_name='Файл счета'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='multiplan_dicing_plan_file',
+            field=models.FileField(blank=True, default='', null=True, storage=account.utils.media_store.ContentAddressedStorage(), upload_to='uploads/dicing_plan/%Y/%m/%d/', verbose_name='Файл '),
+        ),
+        migrations.AlterField(
+            model_name='pdkhelpfilemodel',
+            name='file',
+            field=models.FileField(storage=account.utils.media_store.ContentAddressedStorage(), upload_to='uploads/pdk/pdk_help_files/'),
+        ),
+        migrations.AlterField(
+            model_name='technicalprocess',
+            name='PDK_file',
+            field=models.FileField(blank=True, default='', storage=account.utils.media_store.ContentAddressedStorage(), upload_to='uploads/PDK/%Y/%m/%d/', verbose_name='Файл КИП'),
+        ),
+        migrations.AddField(
+            model_name='filedigest',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='paths', to='account.mediablob', verbose_name='Блоб в media_store'),
+        ),
+    ]
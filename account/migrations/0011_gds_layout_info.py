@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0010_media_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GDSLayoutInfo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=500, verbose_name='Файл')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает анализа'), ('processing', 'Анализируется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало анализа')),
+                ('analyzed_at', models.DateTimeField(blank=True, null=True, verbose_name='Проанализирован')),
+                ('file_size', models.BigIntegerField(blank=True, null=True, verbose_name='Размер, байт')),
+                ('library_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Библиотека')),
+                ('user_unit', models.FloatField(blank=True, null=True, verbose_name='Пользовательская единица')),
+                ('db_unit_m', models.FloatField(blank=True, null=True, verbose_name='Единица БД, м')),
+                ('top_cells', models.JSONField(blank=True, default=list, verbose_name='Верхние ячейки')),
+                ('cell_count', models.PositiveIntegerField(default=0, verbose_name='Ячеек')),
+                ('polygon_count', models.PositiveBigIntegerField(default=0, verbose_name='Полигонов')),
+                ('path_count', models.PositiveBigIntegerField(default=0, verbose_name='Путей')),
+                ('text_count', models.PositiveBigIntegerField(default=0, verbose_name='Текстов')),
+                ('reference_count', models.PositiveBigIntegerField(default=0, verbose_name='Ссылок на ячейки')),
+                ('layers', models.JSONField(blank=True, default=list, verbose_name='Слои и типы данных')),
+                ('bbox', models.JSONField(blank=True, null=True, verbose_name='Габариты в единицах БД')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gds_info', to='account.order')),
+            ],
+            options={
+                'verbose_name': 'Сводка GDS',
+                'verbose_name_plural': 'Сводки GDS',
+                'indexes': [models.Index(fields=['status'], name='gds_info_status_idx')],
+            },
+        ),
+    ]
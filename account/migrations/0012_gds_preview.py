@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_gds_layout_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gdslayoutinfo',
+            name='preview_error',
+            field=models.TextField(blank=True, default='', verbose_name='Ошибка превью'),
+        ),
+        migrations.AddField(
+            model_name='gdslayoutinfo',
+            name='preview_key',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 файла: одинаковые файлы используют одни плитки', max_length=64, verbose_name='Ключ превью'),
+        ),
+        migrations.AddField(
+            model_name='gdslayoutinfo',
+            name='preview_levels',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Уровней превью'),
+        ),
+    ]
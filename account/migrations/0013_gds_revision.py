@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:56
+
+import account.utils.media_store
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0012_gds_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GDSRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер ревизии')),
+                ('file', models.FileField(max_length=500, storage=account.utils.media_store.ContentAddressedStorage(), upload_to='uploads/GDS/%Y/%m/%d/', verbose_name='Файл GDS')),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True, verbose_name='Загружена')),
+                ('cells', models.JSONField(blank=True, null=True, verbose_name='Отпечатки ячеек')),
+                ('diff', models.JSONField(blank=True, null=True, verbose_name='Отличия от предыдущей ревизии')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gds_revisions', to='account.order')),
+            ],
+            options={
+                'verbose_name': 'Ревизия GDS',
+                'verbose_name_plural': 'Ревизии GDS',
+                'ordering': ['order', 'number'],
+                'unique_together': {('order', 'number')},
+            },
+        ),
+    ]
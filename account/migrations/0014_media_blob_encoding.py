@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0013_gds_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='encoding',
+            field=models.CharField(blank=True, default='', max_length=10, verbose_name='Сжатие'),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='stored_size',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Размер на диске, байт'),
+        ),
+    ]
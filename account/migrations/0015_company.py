@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_companies(apps, schema_editor):
+    Company = apps.get_model('account', 'Company')
+    Platform = apps.get_model('account', 'Platform')
+    Profile = apps.get_model('account', 'Profile')
+
+    for name in Profile.objects.values_list('company_name', flat=True).distinct():
+        company, _ = Company.objects.get_or_create(name=name)
+        Profile.objects.filter(company_name=name).update(company=company)
+
+    for platform in Platform.objects.order_by('id'):
+        Profile.objects.filter(role__name='Исполнитель', company_name=platform.platform_code, platform__isnull=True) \
+            .update(platform=platform)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0014_media_blob_encoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='Наименование')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='platform',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='executors', to='account.platform', verbose_name='Платформа исполнителя'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='account.company', verbose_name='Компания'),
+        ),
+        migrations.RunPython(link_companies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0016_referencecatalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='scope_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версия прав'),
+        ),
+    ]
@@ -7,6 +7,9 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 from datetime import timedelta
 import json
+import uuid
+
+from account.utils.media_store import media_store
 
 
 class Role(models.Model):
@@ -19,14 +22,32 @@ class Role(models.Model):
         return f'Роль {self.name}'
 
 
+class Company(models.Model):
+    name = models.CharField('Наименование', unique=True, max_length=200)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Profile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     patronymic = models.CharField('Отчество', max_length=150, blank=True)
     role = models.ForeignKey(Role, on_delete=models.CASCADE)
     photo = models.ImageField(upload_to='users/%Y/%m/%d/', blank=True)
     company_name = models.CharField('Наименование компании заказчика', blank=False, null=False, max_length=200)
+    # Заполняются по company_name при сохранении (utils.companies): права и выборки
+    # по компании и платформе исполнителя идут по целочисленным ключам
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, null=True, blank=True,
+                                related_name='profiles', verbose_name='Компания')
+    platform = models.ForeignKey('Platform', on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='executors', verbose_name='Платформа исполнителя')
     is_nda_signed = models.BooleanField('NDA подписано?', blank=False, null=False, default=False)
     expiration_date = models.DateTimeField(null=True, blank=True)
+    # Растёт при изменении данных, от которых зависят права (utils.profile_scope):
+    # scope в сессиях с прежним номером собирается заново во всех воркерах
+    scope_version = models.PositiveIntegerField('Версия прав', default=0)
 
     created_at = models.DateTimeField(blank=True, null=True, auto_now_add=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
@@ -124,7 +145,7 @@ class Document(models.Model):
     ]
     
     document_type = models.CharField(max_length=50, choices=DOCUMENT_TYPES)
-    file_path = models.FileField(upload_to=document_upload_path)
+    file_path = models.FileField(upload_to=document_upload_path, storage=media_store)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
@@ -147,7 +168,8 @@ class Platform(models.Model):
 
 class TechnicalProcess(models.Model):
     name_process = models.CharField('Название технического процесса', blank=False, null=False, max_length=50)
-    PDK_file = models.FileField('Файл КИП', upload_to='uploads/PDK/%Y/%m/%d/', blank=True, null=False, default='')
+    PDK_file = models.FileField('Файл КИП', upload_to='uploads/PDK/%Y/%m/%d/', storage=media_store, blank=True, null=False,
+                                default='')
     platform = models.ForeignKey(Platform, on_delete=models.CASCADE, null=False, )
     created_at = models.DateTimeField(blank=True, null=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
@@ -333,7 +355,7 @@ class Order(models.Model):
                                                 null=False, help_text='Потребитель сам определяет схему разделения \
                                                 пластины на структуры и предоставляет на фабрику')
     multiplan_dicing_plan_file = models.FileField('Файл ', upload_to='uploads/dicing_plan/%Y/%m/%d/', blank=True,
-                                                  null=True,
+                                                  storage=media_store, null=True,
                                                   default='')
     package_servce = models.BooleanField('Корпусирование силами фабрики', blank=False, null=False, 
                                         help_text='Заказ сборки и корпусирования микросхем силами производителя')
@@ -349,24 +371,49 @@ class Order(models.Model):
     order_status = models.CharField('Статус заказа', choices=OrderStatus.choices, default=OrderStatus.OVK,
                                     blank=False, null=False, max_length=200)
     invoice_file = models.FileField('Файл счета', upload_to='uploads/invoices/%Y/%m/%d/', blank=True, null=False,
-                                    default='')
+                                    storage=media_store, default='')
     contract_file = models.FileField('Файл договора', upload_to='uploads/contracts/%Y/%m/%d/', blank=True, null=False,
-                                     default='')
-    GDS_file = models.FileField('Файл GDS', upload_to='uploads/GDS/%Y/%m/%d/', blank=True, null=False, default='')
+                                     storage=media_store, default='')
+    GDS_file = models.FileField('Файл GDS', upload_to='uploads/GDS/%Y/%m/%d/', blank=True, null=False, default='',
+                                storage=media_store)
     # Форму заполнил(закинуть почту профиля)
 
     created_at = models.DateTimeField(blank=True, null=True, auto_now_add=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        # Индексы под keyset-пагинацию дашбордов (см. utils/pagination.py)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['-order_number', '-id'], name='order_number_idx'),
+            models.Index(fields=['creator', '-created_at', '-id'], name='order_creator_created_idx'),
+            models.Index(fields=['platform_code', '-created_at', '-id'], name='order_platform_created_idx'),
+        ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Статус, сохранённый в БД: позволяет save() и apply_transition
+        # не перечитывать строку заказа
+        instance._persisted_status = instance.__dict__.get('order_status')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._persisted_status = self.__dict__.get('order_status')
+
     def save(self, *args, **kwargs):
-        if self.pk:
+        if not self.pk:
+            old_status = None
+        elif getattr(self, '_persisted_status', None) is not None:
+            old_status = self._persisted_status
+        else:
             old_status = Order.objects.filter(pk=self.pk)\
                 .values_list('order_status', flat=True)\
                 .first()
-        else:
-            old_status = None
 
         super().save(*args, **kwargs)
+        self._persisted_status = self.order_status
 
         if old_status != self.order_status:
             OrderStatusHistory.objects.create(
@@ -374,6 +421,18 @@ class Order(models.Model):
                 old_status=old_status,
                 new_status=self.order_status
             )
+
+        from ..utils.order_search import index_order
+        index_order(self)
+
+
+class OrderSearchToken(models.Model):
+    """Поисковый токен заказа — резервный индекс, если в SQLite нет FTS5"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('token', 'order')
     
 
 class OrderStatusHistory(models.Model):
@@ -414,7 +473,7 @@ class TopicFileModel(models.Model):
     
 class PDKHelpFileModel(models.Model):
     name = models.CharField(max_length=255)
-    file = models.FileField(upload_to='uploads/pdk/pdk_help_files/')
+    file = models.FileField(upload_to='uploads/pdk/pdk_help_files/', storage=media_store)
     description = models.TextField(blank=True, null=True, help_text='Описание файла')
 
     def __str__(self):
@@ -434,7 +493,7 @@ class Message(models.Model):
 
 class File(models.Model):
     message = models.ForeignKey(Message, related_name='files', on_delete=models.CASCADE)
-    file = models.FileField(upload_to='topic_files/')
+    file = models.FileField(upload_to='topic_files/', storage=media_store)
 
     def __str__(self):
         return f'File attached to {self.message.id}'
@@ -452,8 +511,25 @@ class UserTopic(models.Model):
 
     def __str__(self):
         return f'{self.user.username} in topic {self.topic.name}'
-    
-    
+
+
+class UnreadCounter(models.Model):
+    """Денормализованный счётчик непрочитанных сообщений пользователя в теме"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='unread_counters')
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='unread_counters')
+    unread_count = models.PositiveIntegerField('Непрочитанных сообщений', default=0)
+    last_message_id = models.BigIntegerField('ID последнего сообщения', null=True, blank=True)
+
+    class Meta:
+        unique_together = ('profile', 'topic')
+        indexes = [
+            models.Index(fields=['profile', 'unread_count'], name='unread_profile_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.profile} in topic {self.topic_id}: {self.unread_count}'
+
+
 class RegistrationRequest(models.Model):
     name = models.CharField('ФИО', blank=False, null=False, max_length=100)
     mail = models.CharField('Email', blank=False, null=False, max_length=50)
@@ -479,3 +555,200 @@ class LoginLog(models.Model):
 
     def __str__(self):
         return f'{self.user.username} (роль: {self.user.profile.role.name} вошёл в {self.login_time}'
+
+
+class EmailOutbox(models.Model):
+    """Очередь исходящих писем: view только ставят письмо в очередь, отправляет воркер"""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает отправки'
+        SENDING = 'sending', 'Отправляется'
+        SENT = 'sent', 'Отправлено'
+        FAILED = 'failed', 'Ошибка отправки'
+
+    to_email = models.EmailField('Получатель')
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст письма')
+    is_html = models.BooleanField('HTML', default=False)
+    attachments = models.JSONField('Вложения', default=list, blank=True,
+                                   help_text='Пути к файлам вложений')
+    status = models.CharField('Статус', max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField('Попыток отправки', default=0)
+    next_attempt_at = models.DateTimeField('Следующая попытка', default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True, default='')
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.to_email}: {self.subject} ({self.status})'
+
+
+class JobWatermark(models.Model):
+    """Отметка, до которой фоновая задача уже обработала записи (например, id последнего сообщения)"""
+    name = models.CharField('Задача', max_length=100, unique=True)
+    last_id = models.BigIntegerField('Последний обработанный id', default=0)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+
+class MediaBlob(models.Model):
+    """Уникальное содержимое в хранилище media_store и число ссылок на него из файловых полей"""
+    sha256 = models.CharField('SHA-256', max_length=64, unique=True)
+    size = models.BigIntegerField('Размер, байт')
+    # Сжатие на диске: size и sha256 относятся к исходному содержимому, stored_size — к файлу блоба
+    encoding = models.CharField('Сжатие', max_length=10, blank=True, default='')
+    stored_size = models.BigIntegerField('Размер на диске, байт', null=True, blank=True)
+    ref_count = models.IntegerField('Ссылок', default=0)
+    created_at = models.DateTimeField('Создан', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлён', default=timezone.now)
+
+    def __str__(self):
+        return f'{self.sha256}: {self.ref_count}'
+
+
+class FileDigest(models.Model):
+    """SHA-256 файла из MEDIA_ROOT; пересчитывается, только если изменились размер или mtime"""
+    path = models.CharField('Путь от MEDIA_ROOT', max_length=500, unique=True)
+    size = models.BigIntegerField('Размер, байт')
+    mtime = models.FloatField('Время изменения файла')
+    sha256 = models.CharField('SHA-256', max_length=64)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, null=True, blank=True, related_name='paths',
+                             verbose_name='Блоб в media_store')
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    def __str__(self):
+        return f'{self.path}: {self.sha256}'
+
+
+class UploadSession(models.Model):
+    """Возобновляемая загрузка файла заказа частями; байты копятся во временном файле"""
+    class Status(models.TextChoices):
+        OPEN = 'open', 'Загружается'
+        COMPLETE = 'complete', 'Завершена'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='upload_sessions')
+    profile = models.ForeignKey('Profile', on_delete=models.CASCADE, related_name='upload_sessions')
+    field_name = models.CharField('Поле заказа', max_length=50)
+    filename = models.CharField('Имя файла', max_length=255)
+    size = models.BigIntegerField('Размер, байт')
+    offset = models.BigIntegerField('Получено, байт', default=0)
+    expected_sha256 = models.CharField('Ожидаемый SHA-256', max_length=64, blank=True, default='')
+    sha256 = models.CharField('SHA-256', max_length=64, blank=True, default='')
+    status = models.CharField('Статус', max_length=10, choices=Status.choices, default=Status.OPEN)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлена', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Загрузка файла'
+        verbose_name_plural = 'Загрузки файлов'
+
+    def __str__(self):
+        return f'{self.filename}: {self.offset}/{self.size}'
+
+
+class GDSLayoutInfo(models.Model):
+    """Сводка по загруженному GDS_file заказа; заполняет фоновая команда analyze_gds_files"""
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает анализа'
+        PROCESSING = 'processing', 'Анализируется'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    order = models.OneToOneField('Order', on_delete=models.CASCADE, related_name='gds_info')
+    file_name = models.CharField('Файл', max_length=500)
+    status = models.CharField('Статус', max_length=10, choices=Status.choices, default=Status.PENDING)
+    error = models.TextField('Ошибка', blank=True, default='')
+    started_at = models.DateTimeField('Начало анализа', null=True, blank=True)
+    analyzed_at = models.DateTimeField('Проанализирован', null=True, blank=True)
+    file_size = models.BigIntegerField('Размер, байт', null=True, blank=True)
+    library_name = models.CharField('Библиотека', max_length=255, blank=True, default='')
+    user_unit = models.FloatField('Пользовательская единица', null=True, blank=True)
+    db_unit_m = models.FloatField('Единица БД, м', null=True, blank=True)
+    top_cells = models.JSONField('Верхние ячейки', default=list, blank=True)
+    cell_count = models.PositiveIntegerField('Ячеек', default=0)
+    polygon_count = models.PositiveBigIntegerField('Полигонов', default=0)
+    path_count = models.PositiveBigIntegerField('Путей', default=0)
+    text_count = models.PositiveBigIntegerField('Текстов', default=0)
+    reference_count = models.PositiveBigIntegerField('Ссылок на ячейки', default=0)
+    layers = models.JSONField('Слои и типы данных', default=list, blank=True)
+    bbox = models.JSONField('Габариты в единицах БД', null=True, blank=True)
+    preview_key = models.CharField('Ключ превью', max_length=64, blank=True, default='',
+                                   help_text='SHA-256 файла: одинаковые файлы используют одни плитки')
+    preview_levels = models.PositiveSmallIntegerField('Уровней превью', default=0)
+    preview_error = models.TextField('Ошибка превью', blank=True, default='')
+
+    class Meta:
+        verbose_name = 'Сводка GDS'
+        verbose_name_plural = 'Сводки GDS'
+        indexes = [
+            models.Index(fields=['status'], name='gds_info_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.file_name} ({self.status})'
+
+    @property
+    def bbox_um(self):
+        """Габариты в микрометрах: ширина, высота и углы"""
+        if not self.bbox or not self.db_unit_m:
+            return None
+        xmin, ymin, xmax, ymax = (value * self.db_unit_m * 1e6 for value in self.bbox)
+        return {'width': xmax - xmin, 'height': ymax - ymin, 'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax}
+
+    @property
+    def preview_grid(self):
+        """Плитки превью по уровням: [(уровень, [[(x, y), ...], ...строки]), ...]"""
+        return [
+            (level, [[(x, y) for x in range(2 ** level)] for y in range(2 ** level)])
+            for level in range(self.preview_levels)
+        ]
+
+
+class GDSRevision(models.Model):
+    """
+    Загруженная версия GDS_file заказа. Файл ревизии учитывается в хранилище как ссылка на блоб,
+    поэтому прежние версии не удаляются сборщиком мусора после повторной загрузки.
+    """
+    order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='gds_revisions')
+    number = models.PositiveIntegerField('Номер ревизии')
+    file = models.FileField('Файл GDS', upload_to='uploads/GDS/%Y/%m/%d/', max_length=500, storage=media_store)
+    uploaded_at = models.DateTimeField('Загружена', auto_now_add=True)
+    # {ячейка: [хэш записей ячейки, {"слой/тип данных": фигур}]}; заполняет analyze_gds_files
+    cells = models.JSONField('Отпечатки ячеек', null=True, blank=True)
+    # Отличия от предыдущей разобранной ревизии (см. utils.gds_revisions.diff_cells)
+    diff = models.JSONField('Отличия от предыдущей ревизии', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Ревизия GDS'
+        verbose_name_plural = 'Ревизии GDS'
+        unique_together = ('order', 'number')
+        ordering = ['order', 'number']
+
+    def __str__(self):
+        return f'{self.order_id} r{self.number}: {self.file.name}'
+
+
+class ReferenceCatalogVersion(models.Model):
+    """
+    Номер версии справочника формы заказа (utils.reference_catalog), одна строка.
+    Хранится в базе, а не в кеше процесса: запись справочника в одном воркере
+    сразу меняет версию для всех остальных.
+    """
+    version = models.PositiveBigIntegerField('Версия', default=1)
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочника'
+
+    def __str__(self):
+        return str(self.version)
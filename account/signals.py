@@ -1,7 +1,120 @@
 from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import LoginLog
+from .models import LoginLog, Message, UserTopic, Order, Profile, Platform, Role
+from .utils.companies import link_profile, link_platform_executors
+from .utils.profile_scope import invalidate_profile_scopes, refresh_profile_scope
+from .utils.unread_counters import register_message, unregister_message, init_counter
+from .utils.order_search import unindex_order
+from .utils.gds_analysis import schedule_gds_analysis
+from .utils.media_store import media_store_models, media_names, update_media_refs
+from .utils.reference_catalog import CATALOG_MODELS, catalog_changed
 
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
-    LoginLog.objects.create(user=user)
\ No newline at end of file
+    LoginLog.objects.create(user=user)
+
+
+@receiver(user_logged_in)
+def store_profile_scope(sender, request, user, **kwargs):
+    # Scope со сроком действия учётной записи кладётся в сессию сразу при входе
+    if request is not None:
+        refresh_profile_scope(request, user)
+
+
+@receiver(post_save, sender=Message)
+def update_unread_on_message_create(sender, instance, created, **kwargs):
+    if created:
+        register_message(instance)
+
+
+@receiver(pre_delete, sender=Message)
+def update_unread_on_message_delete(sender, instance, **kwargs):
+    unregister_message(instance)
+
+
+@receiver(post_save, sender=UserTopic)
+def init_unread_on_user_topic_create(sender, instance, created, **kwargs):
+    if created:
+        init_counter(instance)
+
+
+@receiver(post_save, sender=Order)
+def schedule_gds_analysis_on_upload(sender, instance, created, raw, update_fields=None, **kwargs):
+    if raw or (created and not instance.GDS_file):
+        return
+    if update_fields is None or 'GDS_file' in update_fields:
+        schedule_gds_analysis(instance)
+
+
+@receiver(pre_save, sender=Profile)
+def link_profile_company(sender, instance, raw, **kwargs):
+    if not raw:
+        link_profile(instance)
+
+
+@receiver(post_save, sender=Profile)
+def reset_profile_scope(sender, instance, created, raw, **kwargs):
+    if created or raw:
+        return
+    invalidate_profile_scopes([instance.user_id])
+    # Экземпляр в памяти (request.user.profile) видит новую версию в том же запросе
+    instance.scope_version = Profile.objects.filter(pk=instance.pk).values_list('scope_version', flat=True).get()
+
+
+@receiver(post_save, sender=Role)
+def reset_role_scopes(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        invalidate_profile_scopes(instance.profile_set.values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender=Platform)
+def reset_platform_scopes(sender, instance, **kwargs):
+    invalidate_profile_scopes(instance.executors.values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Platform)
+def link_executors_to_platform(sender, instance, raw, **kwargs):
+    if not raw:
+        link_platform_executors(instance)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_search_index(sender, instance, **kwargs):
+    unindex_order(instance.id)
+
+
+
+def remember_media_names(sender, instance, **kwargs):
+    instance._media_names = media_names(instance)
+
+
+def update_media_refs_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    old = {} if created else getattr(instance, '_media_names', {})
+    new = media_names(instance)
+    update_media_refs(
+        added=[name for field, name in new.items() if old.get(field) != name],
+        removed=[name for field, name in old.items() if new.get(field) != name],
+    )
+    instance._media_names = new
+
+
+def release_media_refs_on_delete(sender, instance, **kwargs):
+    update_media_refs(removed=media_names(instance).values())
+
+
+for model, fields in media_store_models():
+    post_init.connect(remember_media_names, sender=model)
+    post_save.connect(update_media_refs_on_save, sender=model)
+    post_delete.connect(release_media_refs_on_delete, sender=model)
+
+
+def reset_reference_catalog(sender, **kwargs):
+    catalog_changed()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(reset_reference_catalog, sender=model)
+    post_delete.connect(reset_reference_catalog, sender=model)
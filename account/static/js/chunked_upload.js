@@ -0,0 +1,88 @@
+// Загрузка файла заказа частями с возобновлением после обрыва.
+// Форма с data-upload-url и data-order-id; кнопки из data-upload-on отправляют
+// выбранный файл через API /account/uploads/, а саму форму — уже без файла.
+class ChunkedUploader {
+    constructor(form) {
+        this.form = form;
+        this.uploadUrl = form.dataset.uploadUrl;
+        this.orderId = form.dataset.orderId;
+        this.actions = (form.dataset.uploadOn || '').split(' ');
+        this.csrfToken = form.querySelector('[name=csrfmiddlewaretoken]').value;
+        this.status = document.createElement('p');
+        this.form.prepend(this.status);
+
+        form.addEventListener('submit', event => this.onSubmit(event));
+    }
+
+    fileInput() {
+        return this.form.querySelector('input[type=file]');
+    }
+
+    async onSubmit(event) {
+        const submitter = event.submitter;
+        const input = this.fileInput();
+        if (!input || !input.files.length || !submitter || !this.actions.includes(submitter.name)) {
+            return;
+        }
+        event.preventDefault();
+
+        try {
+            await this.upload(input.name, input.files[0]);
+        } catch (error) {
+            this.status.textContent = `Ошибка загрузки: ${error.message}`;
+            return;
+        }
+        // Файл уже записан в заказ — форма отправляется без него
+        input.value = '';
+        this.form.requestSubmit(submitter);
+    }
+
+    async request(url, options) {
+        const response = await fetch(url, {
+            credentials: 'same-origin',
+            ...options,
+            headers: {'X-CSRFToken': this.csrfToken, ...(options.headers || {})},
+        });
+        const data = await response.json();
+        if (!response.ok && response.status !== 409) {
+            throw new Error(data.error || response.statusText);
+        }
+        return data;
+    }
+
+    async upload(field, file) {
+        const body = new FormData();
+        body.append('order_id', this.orderId);
+        body.append('field', field);
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        let state = await this.request(this.uploadUrl, {method: 'POST', body});
+        const chunkUrl = `${this.uploadUrl}${state.upload_id}/`;
+
+        let failures = 0;
+        while (state.offset < file.size) {
+            this.status.textContent = `Загружено ${Math.floor(state.offset * 100 / file.size)}%`;
+            const chunk = file.slice(state.offset, state.offset + state.chunk_size);
+            try {
+                state = await this.request(chunkUrl, {
+                    method: 'PUT',
+                    body: chunk,
+                    headers: {'Upload-Offset': state.offset, 'Content-Type': 'application/octet-stream'},
+                });
+                failures = 0;
+            } catch (error) {
+                if (++failures > 5) {
+                    throw error;
+                }
+                // Обрыв связи: пауза и продолжение с того места, которое принял сервер
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** failures));
+                state = await this.request(chunkUrl, {method: 'GET'});
+            }
+        }
+
+        this.status.textContent = 'Проверка файла...';
+        return this.request(`${chunkUrl}finish/`, {method: 'POST'});
+    }
+}
+
+document.querySelectorAll('form[data-upload-url]').forEach(form => new ChunkedUploader(form));
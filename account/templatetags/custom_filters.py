@@ -1,6 +1,11 @@
 import os
 import re
 from django import template
+from django.urls import reverse
+
+from ..access_rules.access_rules import can_act as scope_can_act
+from ..utils.reference_catalog import get_catalog
+from ..utils.signed_downloads import signed_download_url
 
 register = template.Library()
 
@@ -49,4 +54,22 @@ def endswith(value, arg):
     Проверяет, заканчивается ли строка на arg
     Используется для проверки расширений файлов
     """
-    return str(value).lower().endswith(str(arg).lower())
\ No newline at end of file
+    return str(value).lower().endswith(str(arg).lower())
+
+
+@register.simple_tag(takes_context=True)
+def download_url(context, file_path):
+    """Подписанная ссылка на файл для текущего пользователя (см. utils.signed_downloads)"""
+    return signed_download_url(context['request'], file_path)
+
+
+@register.simple_tag
+def reference_catalog_url():
+    """Адрес текущей версии справочника формы заказа (см. utils.reference_catalog)"""
+    return reverse('reference_catalog', args=[get_catalog().version])
+
+
+@register.filter
+def can_act(scope, order):
+    """Показывать ли кнопку действия текущего этапа заказа: {% if profile_scope|can_act:order %}"""
+    return scope is not None and scope_can_act(scope, order)
@@ -0,0 +1,58 @@
+import pytest
+from django.core.management import call_command
+
+from account.models import Profile, Order, Topic, UserTopic
+
+
+@pytest.fixture
+def prepare_database(db):
+    call_command('loaddata', 'test_order_data.json')
+
+
+@pytest.fixture
+def curator(prepare_database):
+    return Profile.objects.get(pk=1)
+
+
+@pytest.fixture
+def executor(prepare_database):
+    return Profile.objects.get(pk=2)
+
+
+@pytest.fixture
+def customer(prepare_database):
+    return Profile.objects.get(pk=4)
+
+
+@pytest.fixture
+def order(prepare_database):
+    return Order.objects.get(pk=1)
+
+
+@pytest.fixture
+def private_topic(order, curator, executor):
+    topic = Topic.objects.create(name='Чат', is_private=True, related_order=order)
+    UserTopic.objects.create(user=curator, topic=topic)
+    UserTopic.objects.create(user=executor, topic=topic)
+    return topic
+
+
+@pytest.fixture
+def smtp_server(settings):
+    from .smtp_stub import SMTPStub
+
+    from account.utils.mail_transport import close_pooled_connection
+
+    server = SMTPStub().start()
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_OUTBOX_BACKEND = 'account.utils.mail_transport.PooledSMTPBackend'
+    settings.EMAIL_SEND_RATE = 0
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = server.port
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_USE_SSL = False
+    settings.EMAIL_HOST_USER = ''
+    settings.EMAIL_HOST_PASSWORD = ''
+    yield server
+    close_pooled_connection()
+    server.stop()
@@ -0,0 +1,121 @@
+import math
+import struct
+
+from account.utils import gdsii
+
+
+def real8(value):
+    """Кодирование вещественного числа в 8-байтный формат GDSII"""
+    if value == 0:
+        return b'\0' * 8
+    sign = 0x80 if value < 0 else 0
+    value = abs(value)
+    exponent = 64 + math.ceil(math.log(value, 16))
+    mantissa = value / 16.0 ** (exponent - 64)
+    if mantissa >= 1:
+        mantissa /= 16
+        exponent += 1
+    return bytes([sign | exponent]) + int(mantissa * (1 << 56)).to_bytes(7, 'big')
+
+
+def record(rtype, datatype, payload=b''):
+    return struct.pack('>HBB', len(payload) + 4, rtype, datatype) + payload
+
+
+def string(rtype, text):
+    data = text.encode('ascii')
+    if len(data) % 2:
+        data += b'\0'
+    return record(rtype, 6, data)
+
+
+def int16(rtype, *values):
+    return record(rtype, 2, struct.pack(f'>{len(values)}h', *values))
+
+
+def int32(rtype, *values):
+    return record(rtype, 3, struct.pack(f'>{len(values)}i', *values))
+
+
+class GDSBuilder:
+    """Сборка небольших GDSII-файлов для тестов"""
+
+    def __init__(self, library='TESTLIB', user_unit=0.001, db_unit=1e-9):
+        self.data = [
+            int16(gdsii.HEADER, 600),
+            int16(gdsii.BGNLIB, *[0] * 12),
+            string(gdsii.LIBNAME, library),
+            record(gdsii.UNITS, 5, real8(user_unit) + real8(db_unit)),
+        ]
+
+    def cell(self, name):
+        self.data += [int16(gdsii.BGNSTR, *[0] * 12), string(gdsii.STRNAME, name)]
+        return self
+
+    def end_cell(self):
+        self.data.append(record(gdsii.ENDSTR, 0))
+        return self
+
+    def rect(self, layer, x0, y0, x1, y1, datatype=0):
+        return self.polygon(layer, [(x0, y0), (x1, y0), (x1, y1), (x0, y1)], datatype)
+
+    def polygon(self, layer, points, datatype=0):
+        points = list(points) + [points[0]]
+        self.data += [
+            record(gdsii.BOUNDARY, 0),
+            int16(gdsii.LAYER, layer),
+            int16(gdsii.DATATYPE, datatype),
+            int32(gdsii.XY, *[c for point in points for c in point]),
+            record(gdsii.ENDEL, 0),
+        ]
+        return self
+
+    def path(self, layer, points, width, datatype=0):
+        self.data += [
+            record(gdsii.PATH, 0),
+            int16(gdsii.LAYER, layer),
+            int16(gdsii.DATATYPE, datatype),
+            int32(gdsii.WIDTH, width),
+            int32(gdsii.XY, *[c for point in points for c in point]),
+            record(gdsii.ENDEL, 0),
+        ]
+        return self
+
+    def text(self, layer, x, y, value):
+        self.data += [
+            record(gdsii.TEXT, 0),
+            int16(gdsii.LAYER, layer),
+            int16(gdsii.TEXTTYPE, 0),
+            int32(gdsii.XY, x, y),
+            string(0x19, value),
+            record(gdsii.ENDEL, 0),
+        ]
+        return self
+
+    def sref(self, name, x, y, angle=0, reflect=False, mag=1):
+        self.data += [record(gdsii.SREF, 0), string(gdsii.SNAME, name)]
+        if angle or reflect or mag != 1:
+            self.data.append(record(gdsii.STRANS, 1, bytes([0x80 if reflect else 0, 0])))
+            if mag != 1:
+                self.data.append(record(gdsii.MAG, 5, real8(mag)))
+            if angle:
+                self.data.append(record(gdsii.ANGLE, 5, real8(angle)))
+        self.data += [int32(gdsii.XY, x, y), record(gdsii.ENDEL, 0)]
+        return self
+
+    def aref(self, name, cols, rows, origin, col_point, row_point):
+        self.data += [
+            record(gdsii.AREF, 0),
+            string(gdsii.SNAME, name),
+            int16(gdsii.COLROW, cols, rows),
+            int32(gdsii.XY, *origin, *col_point, *row_point),
+            record(gdsii.ENDEL, 0),
+        ]
+        return self
+
+    def build(self):
+        return b''.join(self.data) + record(gdsii.ENDLIB, 0)
+
+    def save(self, path):
+        path.write_bytes(self.build())
+        return path
@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.authentication import EmailAuthBackend, ProfileModelBackend
+
+
+def test_backends_load_profile_with_user(curator, django_assert_num_queries):
+    for backend in (ProfileModelBackend(), EmailAuthBackend()):
+        with django_assert_num_queries(1):
+            user = backend.get_user(curator.user_id)
+            assert user.profile.role.name == 'Куратор'
+
+
+def test_request_identity_costs_one_query(client, executor, order):
+    client.force_login(executor.user)
+    url = reverse('edit_order', args=[order.pk])
+    client.get(url)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(url).status_code == 403
+
+    identity = [
+        query['sql'] for query in queries
+        if query['sql'].startswith(('SELECT "auth_user"', 'SELECT "account_profile"', 'SELECT "account_role"'))
+    ]
+    assert len(identity) == 1
+    assert '"account_profile"' in identity[0] and '"account_role"' in identity[0]
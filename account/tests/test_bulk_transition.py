@@ -0,0 +1,96 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from account.models import Order, OrderStatusHistory, Message, Topic, UserTopic, UnreadCounter
+from account.utils.order_workflow import apply_bulk_transition, TransitionError
+
+
+def _make_orders(order, count, status):
+    orders = []
+    for i in range(count):
+        order.pk = None
+        order.id = None
+        order.order_number = f'F2025060300{i:03d}'
+        order.save()
+        orders.append(Order.objects.get(pk=order.pk))
+    Order.objects.filter(pk__in=[o.pk for o in orders]).update(order_status=status)
+    return orders
+
+
+def test_bulk_transition_moves_orders(order, executor, curator):
+    orders = _make_orders(order, 3, Order.OrderStatus.MTPF)
+    topic = Topic.objects.create(name='Чат', is_private=True, related_order=orders[0])
+    UserTopic.objects.create(user=curator, topic=topic)
+
+    moved = apply_bulk_transition(
+        [o.id for o in orders], Order.OrderStatus.MTPF, 'next', executor, comment='Партия 7'
+    )
+
+    assert len(moved) == 3
+    assert set(Order.objects.filter(pk__in=[o.pk for o in orders])
+               .values_list('order_status', flat=True)) == {Order.OrderStatus.MPT}
+    history = OrderStatusHistory.objects.filter(order__in=orders, new_status=Order.OrderStatus.MPT)
+    assert history.count() == 3
+    assert all(h.changed_by == executor and h.comment == 'Партия 7' for h in history)
+    assert Message.objects.filter(topic__related_order__in=orders).count() == 3
+    assert UnreadCounter.objects.get(profile=curator, topic=topic).unread_count == 1
+
+
+def test_bulk_transition_query_count_does_not_grow(order, executor):
+    small = _make_orders(order, 2, Order.OrderStatus.MTPF)
+    large = _make_orders(order, 10, Order.OrderStatus.MTP)
+    executor.role  # роль кешируется на профиле после первого обращения
+
+    with CaptureQueriesContext(connection) as small_ctx:
+        apply_bulk_transition([o.id for o in small], Order.OrderStatus.MTPF, 'next', executor)
+    with CaptureQueriesContext(connection) as large_ctx:
+        apply_bulk_transition([o.id for o in large], Order.OrderStatus.MTP, 'next', executor)
+
+    assert len(large_ctx.captured_queries) == len(small_ctx.captured_queries)
+
+
+def test_bulk_transition_skips_other_statuses(order, executor):
+    orders = _make_orders(order, 2, Order.OrderStatus.MTPF)
+    Order.objects.filter(pk=orders[1].pk).update(order_status=Order.OrderStatus.MCS)
+
+    moved = apply_bulk_transition([o.id for o in orders], Order.OrderStatus.MTPF, 'next', executor)
+
+    assert [o.id for o in moved] == [orders[0].id]
+    assert Order.objects.get(pk=orders[1].pk).order_status == Order.OrderStatus.MCS
+
+
+def test_bulk_transition_checks_role(order, curator):
+    orders = _make_orders(order, 1, Order.OrderStatus.MTPF)
+
+    with pytest.raises(TransitionError):
+        apply_bulk_transition([orders[0].id], Order.OrderStatus.MTPF, 'next', curator)
+
+
+def test_bulk_transition_view(client, order, executor):
+    orders = _make_orders(order, 2, Order.OrderStatus.MCS)
+    client.force_login(executor.user)
+
+    response = client.post('/account/orders/bulk_transition/', {
+        'transition': 'MCS:next',
+        'order_ids': [o.id for o in orders],
+    })
+
+    assert response.status_code == 200
+    assert Order.objects.filter(order_status=Order.OrderStatus.MCP).count() == 2
+
+
+def test_bulk_transition_view_escapes_comment(client, order, executor):
+    orders = _make_orders(order, 2, Order.OrderStatus.MCS)
+    client.force_login(executor.user)
+
+    client.post('/account/orders/bulk_transition/', {
+        'transition': 'MCS:next',
+        'order_ids': [o.id for o in orders],
+        'comment': '<script>alert(1)</script>',
+    })
+
+    texts = Message.objects.filter(topic__related_order__in=orders).values_list('text', flat=True)
+    assert len(texts) == 2
+    assert all('Комментарий: &lt;script&gt;alert(1)&lt;/script&gt;' in text for text in texts)
+    assert not any('<script>' in text for text in texts)
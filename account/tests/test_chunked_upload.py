@@ -0,0 +1,177 @@
+import hashlib
+import io
+import os
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from account.models import FileDigest, Message, Order, Topic, UploadSession
+from account.utils import chunked_upload
+
+CONTENT = b'HEADER' + os.urandom(3000) + b'FOOTER'
+
+
+@pytest.fixture
+def upload_dirs(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.UPLOAD_STAGING_DIR = str(tmp_path / 'staging')
+    return tmp_path
+
+
+@pytest.fixture
+def contract_order(order):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.CSA)
+    order.refresh_from_db()
+    return order
+
+
+def start(client, order, field='contract_file', size=len(CONTENT), **extra):
+    return client.post(reverse('upload_start'), {
+        'order_id': order.pk, 'field': field, 'filename': 'Договор.pdf', 'size': size, **extra,
+    })
+
+
+def put_chunk(client, upload_id, offset, data):
+    return client.put(reverse('upload_chunk', args=[upload_id]), data,
+                      content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+
+def test_upload_in_chunks_attaches_file_to_order(client, curator, contract_order, upload_dirs):
+    client.force_login(curator.user)
+
+    response = start(client, contract_order, sha256=hashlib.sha256(CONTENT).hexdigest())
+    assert response.status_code == 201
+    upload_id = response.json()['upload_id']
+
+    assert put_chunk(client, upload_id, 0, CONTENT[:1000]).json()['offset'] == 1000
+    assert put_chunk(client, upload_id, 1000, CONTENT[1000:]).json()['offset'] == len(CONTENT)
+
+    response = client.post(reverse('upload_finish', args=[upload_id]))
+    assert response.status_code == 200
+    data = response.json()
+    assert data['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+
+    contract_order.refresh_from_db()
+    assert contract_order.contract_file.name == data['file']
+    assert contract_order.contract_file.name.startswith('uploads/contracts/')
+    with contract_order.contract_file.open('rb') as f:
+        assert f.read() == CONTENT
+    assert FileDigest.objects.get(path=data['file']).sha256 == data['sha256']
+    assert os.listdir(upload_dirs / 'staging') == []
+
+
+def test_resume_after_dropped_chunk(client, curator, contract_order, upload_dirs):
+    client.force_login(curator.user)
+    upload_id = start(client, contract_order).json()['upload_id']
+    put_chunk(client, upload_id, 0, CONTENT[:500])
+
+    # Повтор уже принятой части — сервер сообщает, откуда продолжать
+    response = put_chunk(client, upload_id, 0, CONTENT[:500])
+    assert response.status_code == 409
+    assert response.json()['offset'] == 500
+    assert client.get(reverse('upload_chunk', args=[upload_id])).json()['offset'] == 500
+
+    # Другой воркер: состояния хэша в памяти нет, принятый префикс перечитывается
+    chunked_upload._hashers.clear()
+    put_chunk(client, upload_id, 500, CONTENT[500:])
+    response = client.post(reverse('upload_finish', args=[upload_id]))
+
+    assert response.json()['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_losing_duplicate_chunk_leaves_accepted_bytes(client, curator, contract_order, upload_dirs):
+    client.force_login(curator.user)
+    upload_id = start(client, contract_order).json()['upload_id']
+    stale = UploadSession.objects.get(pk=upload_id)
+    put_chunk(client, upload_id, 0, CONTENT[:500])
+
+    # Повтор клиента с тем же смещением, начатый до фиксации первой части
+    with pytest.raises(chunked_upload.UploadOffsetMismatch):
+        chunked_upload.write_chunk(stale, 0, io.BytesIO(b'X' * 500), 500)
+
+    put_chunk(client, upload_id, 500, CONTENT[500:])
+    data = client.post(reverse('upload_finish', args=[upload_id])).json()
+
+    assert data['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+    contract_order.refresh_from_db()
+    with contract_order.contract_file.open('rb') as f:
+        assert f.read() == CONTENT
+    assert os.listdir(upload_dirs / 'staging') == []
+
+
+def test_incomplete_upload_cannot_be_finished(client, curator, contract_order, upload_dirs):
+    client.force_login(curator.user)
+    upload_id = start(client, contract_order).json()['upload_id']
+    put_chunk(client, upload_id, 0, CONTENT[:10])
+
+    response = client.post(reverse('upload_finish', args=[upload_id]))
+
+    assert response.status_code == 409
+    contract_order.refresh_from_db()
+    assert not contract_order.contract_file
+
+
+def test_checksum_mismatch_is_rejected(client, curator, contract_order, upload_dirs):
+    client.force_login(curator.user)
+    upload_id = start(client, contract_order, sha256='0' * 64).json()['upload_id']
+    put_chunk(client, upload_id, 0, CONTENT)
+
+    response = client.post(reverse('upload_finish', args=[upload_id]))
+
+    assert response.status_code == 400
+    contract_order.refresh_from_db()
+    assert not contract_order.contract_file
+
+
+def test_chunk_beyond_declared_size_is_rejected(client, curator, contract_order, upload_dirs):
+    client.force_login(curator.user)
+    upload_id = start(client, contract_order, size=10).json()['upload_id']
+
+    assert put_chunk(client, upload_id, 0, CONTENT[:20]).status_code == 413
+
+
+def test_upload_respects_workflow_permissions(client, executor, curator, contract_order, upload_dirs):
+    client.force_login(executor.user)
+    assert start(client, contract_order).status_code == 403
+
+    client.force_login(curator.user)
+    assert start(client, contract_order, field='GDS_file').status_code == 403
+    assert start(client, contract_order, field='order_status').status_code == 400
+
+
+def test_upload_belongs_to_its_author(client, curator, executor, contract_order, upload_dirs):
+    client.force_login(curator.user)
+    upload_id = start(client, contract_order).json()['upload_id']
+
+    client.force_login(executor.user)
+    assert put_chunk(client, upload_id, 0, CONTENT).status_code == 404
+
+
+def test_cleanup_removes_stale_uploads(client, curator, contract_order, upload_dirs):
+    client.force_login(curator.user)
+    upload_id = start(client, contract_order).json()['upload_id']
+    UploadSession.objects.filter(pk=upload_id).update(updated_at=timezone.now() - timedelta(days=3))
+
+    assert chunked_upload.cleanup_stale_uploads() == 1
+    assert not UploadSession.objects.exists()
+    assert os.listdir(upload_dirs / 'staging') == []
+
+
+def test_gds_form_after_chunked_upload(client, customer, order, upload_dirs):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.OGDS, creator=customer)
+    topic = Topic.objects.create(name='Чат', related_order=order)
+    client.force_login(customer.user)
+
+    response = start(client, order, field='GDS_file')
+    upload_id = response.json()['upload_id']
+    put_chunk(client, upload_id, 0, CONTENT)
+    client.post(reverse('upload_finish', args=[upload_id]))
+
+    response = client.post(reverse('add_gds', args=[order.pk]), {'save': 'Сохранить'})
+
+    assert response.status_code == 200
+    order.refresh_from_db()
+    assert order.order_status == Order.OrderStatus.CGDS
+    assert Message.objects.filter(topic=topic, text__startswith='📎').count() == 1
@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+
+from account.access_rules.access_rules import check_view_permission, view_permission_q
+from account.models import Company, Order, Platform, Profile
+
+
+def test_profile_save_links_company_and_platform(executor, customer):
+    assert executor.company == customer.company
+    assert executor.platform.platform_code == executor.company_name
+    assert customer.platform is None
+
+    customer.company_name = 'Новая компания'
+    customer.save()
+
+    assert customer.company == Company.objects.get(name='Новая компания')
+
+
+def test_new_platform_links_waiting_executors(executor):
+    waiting = Profile.objects.create(user=User.objects.create(username='waiting'), role=executor.role,
+                                     company_name='NEW')
+    assert waiting.platform is None
+
+    platform = Platform.objects.create(platform_name='Новая', platform_code='NEW')
+
+    waiting.refresh_from_db()
+    assert waiting.platform == platform
+
+
+def test_scoping_uses_integer_keys(executor, order, django_assert_num_queries):
+    executor = Profile.objects.select_related('role').get(pk=executor.pk)
+    order = Order.objects.select_related('creator').get(pk=order.pk)
+
+    with django_assert_num_queries(0):
+        assert check_view_permission(executor, order)
+
+    query = str(Order.objects.filter(view_permission_q(executor)).query)
+    assert '"company_id"' in query
+    assert 'company_name' not in query and '"account_platform"' not in query
@@ -0,0 +1,111 @@
+import gzip
+import io
+import time
+import zipfile
+
+import pytest
+from django.core.files.base import ContentFile
+from django.urls import reverse
+
+from account.models import Document, Order
+from account.utils import zip_stream
+from account.utils.zip_stream import ZipEntry, stream_zip
+
+GDS = b''.join(b'cell %05d\n' % i for i in range(5000))
+PDF = b'%PDF-1.4 ' + bytes(range(256)) * 8
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    return tmp_path
+
+
+def read_zip(response):
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    assert archive.testzip() is None
+    return archive
+
+
+def sample_entries(tmp_path):
+    (tmp_path / 'a.gds').write_bytes(GDS)
+    (tmp_path / 'b.pdf').write_bytes(PDF)
+    with gzip.open(tmp_path / 'c.gds.gz', 'wb') as f:
+        f.write(GDS)
+    now = time.time()
+    return [
+        ZipEntry('GDS/a.gds', str(tmp_path / 'a.gds'), len(GDS), now, compress=True),
+        ZipEntry('Договоры/b.pdf', str(tmp_path / 'b.pdf'), len(PDF), now),
+        ZipEntry('GDS/c.gds', str(tmp_path / 'c.gds.gz'), len(GDS), now, compress=True,
+                 gzip_path=str(tmp_path / 'c.gds.gz')),
+    ]
+
+
+@pytest.mark.parametrize('zip64', [False, True])
+def test_stream_zip_is_readable(tmp_path, monkeypatch, zip64):
+    if zip64:
+        monkeypatch.setattr(zip_stream, 'ZIP64_ENTRY_THRESHOLD', 0)
+
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(sample_entries(tmp_path)))))
+
+    assert archive.testzip() is None
+    info = {item.filename: item for item in archive.infolist()}
+    assert info['GDS/a.gds'].compress_type == zipfile.ZIP_DEFLATED
+    assert info['Договоры/b.pdf'].compress_type == zipfile.ZIP_STORED
+    # deflate-поток gzip-файла перенесён как есть
+    assert info['GDS/c.gds'].compress_size < len(GDS) // 5
+    assert archive.read('GDS/c.gds') == GDS
+    assert archive.read('Договоры/b.pdf') == PDF
+
+
+def test_stream_starts_before_files_are_read(tmp_path):
+    def entries():
+        yield from sample_entries(tmp_path)[:1]
+        raise AssertionError('второй файл не должен читаться до отдачи первого')
+
+    chunks = stream_zip(entries())
+
+    assert next(chunks).startswith(b'PK\x03\x04')
+
+
+def test_user_archive(media_root, client, customer, order):
+    Document.objects.create(document_type='consumer_form', owner=customer.user,
+                            file_path=ContentFile(PDF, name='form.pdf'))
+    Order.objects.filter(pk=order.pk).update(creator=customer)
+    order.refresh_from_db()
+    order.contract_file.save('contract.pdf', ContentFile(PDF))
+    order.GDS_file.save('chip.gds', ContentFile(GDS))
+
+    client.force_login(customer.user)
+    response = client.get(reverse('my_documents_zip', args=[customer.user.id]))
+
+    assert response['Content-Type'] == 'application/zip'
+    assert 'attachment' in response['Content-Disposition']
+    archive = read_zip(response)
+    assert sorted(archive.namelist()) == sorted([
+        'Анкеты/form.pdf',
+        f'Договоры/{order.order_number}_contract.pdf',
+        f'GDS/{order.order_number}_chip.gds',
+    ])
+    assert archive.read(f'GDS/{order.order_number}_chip.gds') == GDS
+
+
+def test_company_and_order_archives(media_root, client, curator, customer, executor, order):
+    Document.objects.create(document_type='consumer_request', owner=customer.user,
+                            file_path=ContentFile(PDF, name='request.pdf'))
+    order.invoice_file.save('invoice.pdf', ContentFile(PDF))
+
+    client.force_login(curator.user)
+    archive = read_zip(client.get(reverse('company_documents_zip', args=[customer.company_name])))
+    assert archive.namelist() == [f'{customer.user.username}/Запросы на доступ/request.pdf']
+
+    archive = read_zip(client.get(reverse('order_documents_zip', args=[order.pk])))
+    assert archive.namelist() == [f'Счета/{order.order_number}_invoice.pdf']
+
+
+def test_archives_check_access(media_root, client, curator, customer, order):
+    client.force_login(customer.user)
+
+    assert client.get(reverse('my_documents_zip', args=[curator.user.id])).status_code == 403
+    assert client.get(reverse('company_documents_zip', args=['ICV'])).status_code == 403
+    assert client.get(reverse('order_documents_zip', args=[order.pk])).status_code == 403
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from account.models import EmailOutbox
+from account.utils.email_outbox import enqueue_email, deliver_outbox, OUTBOX_MAX_ATTEMPTS
+
+
+def test_worker_delivers_batch_over_one_connection(db, smtp_server):
+    for i in range(3):
+        enqueue_email(f'user{i}@example.com', 'Тема', f'<p>Письмо {i}</p>', html=True)
+
+    sent, failed = deliver_outbox()
+
+    assert (sent, failed) == (3, 0)
+    assert smtp_server.connections == 1
+    assert sorted(rcpt[0] for rcpt, _ in smtp_server.messages) == [
+        'user0@example.com', 'user1@example.com', 'user2@example.com',
+    ]
+    assert smtp_server.messages[0][1].get_content_type() == 'text/html'
+    assert EmailOutbox.objects.filter(status=EmailOutbox.Status.SENT).count() == 3
+
+
+def test_failed_email_is_retried_with_backoff(db, smtp_server):
+    item = enqueue_email('user@example.com', 'Тема', 'Текст')
+    smtp_server.fail_next = 1
+
+    assert deliver_outbox() == (0, 1)
+    item.refresh_from_db()
+    assert item.status == EmailOutbox.Status.PENDING
+    assert item.attempts == 1
+    assert item.next_attempt_at > timezone.now()
+    assert '451' in item.last_error
+
+    # До истечения паузы письмо не берётся повторно
+    assert deliver_outbox() == (0, 0)
+
+    EmailOutbox.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+    assert deliver_outbox() == (1, 0)
+    item.refresh_from_db()
+    assert item.status == EmailOutbox.Status.SENT
+    assert item.attempts == 2
+
+
+def test_email_fails_after_max_attempts(db, smtp_server):
+    item = enqueue_email('user@example.com', 'Тема', 'Текст')
+    EmailOutbox.objects.filter(pk=item.pk).update(attempts=OUTBOX_MAX_ATTEMPTS - 1)
+    smtp_server.fail_next = 1
+
+    deliver_outbox()
+
+    item.refresh_from_db()
+    assert item.status == EmailOutbox.Status.FAILED
+
+
+def test_unreachable_server_keeps_emails_queued(db, settings):
+    settings.EMAIL_BACKEND = 'account.utils.mail_transport.PooledSMTPBackend'
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = 1
+    settings.EMAIL_USE_TLS = False
+    item = enqueue_email('user@example.com', 'Тема', 'Текст')
+
+    assert deliver_outbox() == (0, 1)
+    item.refresh_from_db()
+    assert item.status == EmailOutbox.Status.PENDING
+
+
+def test_send_outbox_emails_command(db, smtp_server, capsys):
+    enqueue_email('user@example.com', 'Тема', 'Текст')
+
+    call_command('send_outbox_emails', batch_size=1)
+
+    assert 'Sent 1 emails' in capsys.readouterr().out
+    assert len(smtp_server.messages) == 1
+
+
+def test_registration_only_enqueues(client, db, settings, smtp_server):
+    settings.CAPTCHA_TEST_MODE = True
+
+    response = client.post('/account/registration/', {
+        'name': 'Иванов Иван',
+        'mail': 'ivanov@example.com',
+        'number': '89990000000',
+        'company': 'ООО Тест',
+        'processing_data': 'on',
+        'captcha_0': 'x',
+        'captcha_1': 'PASSED',
+    })
+
+    assert response.status_code == 200
+    assert smtp_server.messages == []
+    assert EmailOutbox.objects.filter(to_email='ivanov@example.com', is_html=True).exists()
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.timezone import now
+
+from account.authentication import load_user
+from account.middleware.expired_user_middleware import expired_user_middleware
+from account.models import Profile
+from account.utils.profile_scope import SCOPE_SESSION_KEY, invalidate_profile_scopes
+
+
+def expire(profile, delta):
+    profile.expiration_date = now() + delta
+    profile.save()
+
+
+def test_expiry_is_stored_at_login(client, customer):
+    expire(customer, timedelta(days=-1))
+    client.force_login(customer.user)
+
+    response = client.get(reverse('dashboard'))
+    assert response.status_code == 302 and response.url == reverse('account_expired')
+    assert client.get(reverse('account_expired')).status_code == 200
+
+
+def test_hot_path_reuses_loaded_profile(client, customer, django_assert_num_queries):
+    expire(customer, timedelta(days=-1))
+    client.force_login(customer.user)
+    session = client.session
+    assert SCOPE_SESSION_KEY in session
+
+    user = load_user(customer.user_id)
+    middleware = expired_user_middleware(lambda request: HttpResponse('ok'))
+
+    def get(path):
+        request = RequestFactory().get(path)
+        request.session = session
+        request.user = user
+        return middleware(request)
+
+    # Пользователь загружен вместе с профилем: сверка scope_version обходится без запросов
+    with django_assert_num_queries(0):
+        assert get(reverse('dashboard')).status_code == 302
+        assert get('/static/css/light_theme.css').content == b'ok'
+        assert get('/captcha/image/x/').content == b'ok'
+
+
+def test_expiry_follows_profile_change(client, curator):
+    client.force_login(curator.user)
+    dashboard = reverse('dashboard')
+    assert client.get(dashboard).status_code == 200
+
+    expire(curator, timedelta(days=-1))
+    assert client.get(dashboard).url == reverse('account_expired')
+
+    expire(curator, timedelta(days=1))
+    assert client.get(dashboard).status_code == 200
+
+
+def test_lockout_reaches_json_download_and_zip_endpoints(client, customer):
+    client.force_login(customer.user)
+    assert client.get(reverse('load_data')).status_code != 302
+
+    # Срок меняется в другом процессе: в сессии остаётся scope с прежним сроком
+    Profile.objects.filter(pk=customer.pk).update(expiration_date=now() - timedelta(days=1))
+    invalidate_profile_scopes([customer.user_id])
+
+    expired_path = reverse('account_expired')
+    for url in (reverse('load_data'), reverse('protected_download', args=['contract.pdf']),
+                reverse('my_documents_zip', args=[customer.pk])):
+        response = client.get(url)
+        assert response.status_code == 302 and response.url == expired_path, url
@@ -0,0 +1,73 @@
+import io
+
+import openpyxl
+import pytest
+
+from account.export_excel import write_orders_workbook
+from account.models import Order
+
+
+def _clone(order, count):
+    for i in range(count):
+        order.pk = None
+        order.id = None
+        order.order_number = f'F2025060300{i:03d}'
+        order.save()
+
+
+def test_summary_sheet_has_row_per_order(order, curator):
+    _clone(order, 4)
+
+    output = write_orders_workbook(Order.objects.order_by('id'), 'tester@example.com', io.BytesIO())
+
+    ws = openpyxl.load_workbook(output, read_only=True)['Заказы']
+    rows = list(ws.values)
+    assert rows[0][0] == 'Номер заказа'
+    assert len(rows) == 1 + Order.objects.count()
+    assert rows[1][0] == Order.objects.order_by('id').first().order_number
+
+
+def test_order_without_created_at_has_empty_date(order):
+    Order.objects.filter(pk=order.pk).update(created_at=None)
+
+    output = write_orders_workbook(Order.objects.filter(pk=order.pk), 'tester@example.com', io.BytesIO())
+
+    rows = list(openpyxl.load_workbook(output, read_only=True)['Заказы'].values)
+    date_column = rows[0].index('Дата создания')
+    assert rows[1][date_column - 1] == order.get_order_status_display()
+    assert rows[1][date_column:] in ((), (None,))
+
+
+def test_per_order_sheets_layout(order):
+    _clone(order, 2)
+
+    output = write_orders_workbook(Order.objects.all(), 'tester@example.com', io.BytesIO(),
+                                   per_order_sheets=True)
+
+    wb = openpyxl.load_workbook(output, read_only=True)
+    assert len(wb.sheetnames) == Order.objects.count()
+    ws = wb[order.order_number]
+    values = list(ws.values)
+    assert values[0][0] == 'Информация по заказу'
+    assert values[2] == ('Номер заказа', order.order_number)
+
+
+def test_export_query_count_does_not_depend_on_orders(order, django_assert_max_num_queries):
+    _clone(order, 20)
+
+    with django_assert_max_num_queries(2):
+        write_orders_workbook(Order.objects.all(), 'tester@example.com', io.BytesIO(), chunk_size=1000)
+
+
+def test_export_view_filters_by_status(client, order, curator):
+    _clone(order, 2)
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.MTP)
+    client.force_login(curator.user)
+
+    response = client.get('/account/orders/export/', {'status': 'MTP'})
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('application/vnd.openxmlformats')
+    content = b''.join(response.streaming_content)
+    rows = list(openpyxl.load_workbook(io.BytesIO(content), read_only=True)['Заказы'].values)
+    assert [row[0] for row in rows[1:]] == [order.order_number]
@@ -0,0 +1,253 @@
+import gzip
+import os
+from email import message_from_bytes
+from urllib.parse import unquote
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from account.models import FileDigest
+from account.utils import file_delivery, file_digest
+from account.utils.media_store import media_store
+
+COMPRESSIBLE = b''.join(b'cell %05d\n' % i for i in range(2000))
+
+
+@pytest.fixture
+def media_file(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    os.makedirs(tmp_path / 'uploads' / 'gds')
+    path = tmp_path / 'uploads' / 'gds' / 'Топология 1.gds'
+    path.write_bytes(b'GDSII' * 100)
+    return 'uploads/gds/Топология 1.gds'
+
+
+@pytest.fixture(autouse=True)
+def reset_backend_cache():
+    file_delivery._load_backend.cache_clear()
+    yield
+    file_delivery._load_backend.cache_clear()
+
+
+def test_django_backend_streams_file(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]))
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == b'GDSII' * 100
+    assert 'attachment' in response['Content-Disposition']
+
+
+@override_settings(DOWNLOAD_BACKEND='account.utils.file_delivery.NginxAccelBackend',
+                   DOWNLOAD_ACCEL_PREFIX='/protected-media/')
+def test_nginx_backend_delegates_transfer(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]))
+
+    assert response.status_code == 200
+    assert response.content == b''
+    assert response['X-Accel-Redirect'] == '/protected-media/uploads/gds/%D0%A2%D0%BE%D0%BF%D0%BE%D0%BB%D0%BE%D0%B3%D0%B8%D1%8F%201.gds'
+    assert "filename*=utf-8''" in response['Content-Disposition']
+
+
+@override_settings(DOWNLOAD_BACKEND='account.utils.file_delivery.ApacheSendfileBackend')
+def test_apache_backend_sends_absolute_path(client, curator, media_file, settings):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]))
+
+    assert unquote(response['X-Sendfile']) == os.path.join(os.path.realpath(settings.MEDIA_ROOT), media_file)
+    assert response.content == b''
+
+
+def test_path_outside_media_root_is_rejected(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=['uploads/../../etc/passwd']))
+
+    assert response.status_code == 404
+
+
+def test_anonymous_user_is_redirected(client, media_file, db):
+    response = client.get(reverse('protected_download', args=[media_file]))
+
+    assert response.status_code == 302
+
+
+def test_etag_from_stored_digest_and_not_modified(client, curator, media_file):
+    client.force_login(curator.user)
+    url = reverse('protected_download', args=[media_file])
+    client.get(url)
+    call_command('digest_media_files')
+
+    response = client.get(url)
+    etag = response['ETag']
+
+    assert etag == '"%s"' % FileDigest.objects.get(path=media_file).sha256
+    assert response['Accept-Ranges'] == 'bytes'
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert response.status_code == 304
+
+
+def test_download_does_not_hash_file(client, curator, media_file, monkeypatch):
+    client.force_login(curator.user)
+    url = reverse('protected_download', args=[media_file])
+    monkeypatch.setattr(file_digest, 'hash_file', lambda path: pytest.fail('хэш считается в запросе'))
+
+    # Старый файл без хэша: отдаётся без ETag, If-Range не совпадает — весь файл
+    response = client.get(url, HTTP_RANGE='bytes=0-4', HTTP_IF_RANGE='"x"')
+    assert response.status_code == 200
+    assert 'ETag' not in response
+    assert FileDigest.objects.get(path=media_file).sha256 == file_digest.PENDING_SHA256
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert response.status_code == 304
+
+
+def test_digest_follows_file_changes(client, curator, media_file, settings):
+    client.force_login(curator.user)
+    url = reverse('protected_download', args=[media_file])
+    client.get(url)
+    call_command('digest_media_files')
+    etag = client.get(url)['ETag']
+
+    full_path = os.path.join(settings.MEDIA_ROOT, media_file)
+    with open(full_path, 'wb') as f:
+        f.write(b'NEW')
+    os.utime(full_path, (1, 1))
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'ETag' not in response
+
+    call_command('digest_media_files')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] not in (etag, None)
+
+
+def test_single_range(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]), HTTP_RANGE='bytes=5-9')
+
+    assert response.status_code == 206
+    assert response['Content-Range'] == 'bytes 5-9/500'
+    assert response['Content-Length'] == '5'
+    assert b''.join(response.streaming_content) == b'GDSII'
+
+
+def test_suffix_range(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]), HTTP_RANGE='bytes=-3')
+
+    assert response.status_code == 206
+    assert response['Content-Range'] == 'bytes 497-499/500'
+    assert b''.join(response.streaming_content) == b'SII'
+
+
+def test_multi_range(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]), HTTP_RANGE='bytes=0-1, 495-')
+
+    assert response.status_code == 206
+    content_type = response['Content-Type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+    body = b''.join(response.streaming_content)
+    assert int(response['Content-Length']) == len(body)
+
+    message = message_from_bytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+    parts = message.get_payload()
+    assert [part['Content-Range'] for part in parts] == ['bytes 0-1/500', 'bytes 495-499/500']
+    assert [part.get_payload(decode=True) for part in parts] == [b'GD', b'GDSII']
+
+
+def test_unsatisfiable_range(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]), HTTP_RANGE='bytes=1000-')
+
+    assert response.status_code == 416
+    assert response['Content-Range'] == 'bytes */500'
+
+
+def test_if_range_mismatch_returns_full_file(client, curator, media_file):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[media_file]),
+                          HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == b'GDSII' * 100
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-0,1-1,5-', [(0, 1), (5, 9)]),
+    ('bytes=8-100', [(8, 9)]),
+    ('bytes=20-', []),
+    ('bytes=5-2', None),
+    ('items=0-1', None),
+])
+def test_parse_range_header(header, expected):
+    assert file_delivery.parse_range_header(header, 10) == expected
+
+
+@pytest.fixture
+def compressed_file(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return media_store.save('uploads/gds/chip.gds', ContentFile(COMPRESSIBLE))
+
+
+def test_compressed_file_is_sent_encoded(client, curator, compressed_file, tmp_path):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('protected_download', args=[compressed_file]),
+                          HTTP_ACCEPT_ENCODING='br, gzip;q=0.8')
+
+    body = b''.join(response.streaming_content)
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response['Vary']
+    assert body == (tmp_path / compressed_file).read_bytes()
+    assert gzip.decompress(body) == COMPRESSIBLE
+    assert response['ETag'].endswith('-gzip"')
+
+
+def test_compressed_file_is_decompressed_for_other_clients(client, curator, compressed_file):
+    client.force_login(curator.user)
+    url = reverse('protected_download', args=[compressed_file])
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+    assert 'Content-Encoding' not in response
+    assert int(response['Content-Length']) == len(COMPRESSIBLE)
+    assert b''.join(response.streaming_content) == COMPRESSIBLE
+
+    response = client.get(url, HTTP_RANGE='bytes=5000-5009')
+    assert response.status_code == 206
+    assert response['Content-Range'] == f'bytes 5000-5009/{len(COMPRESSIBLE)}'
+    assert b''.join(response.streaming_content) == COMPRESSIBLE[5000:5010]
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+    assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT_ENCODING='gzip').status_code == 200
+
+
+@override_settings(DOWNLOAD_BACKEND='account.utils.file_delivery.NginxAccelBackend')
+def test_decompression_is_not_delegated_to_nginx(client, curator, compressed_file):
+    client.force_login(curator.user)
+    url = reverse('protected_download', args=[compressed_file])
+
+    assert 'X-Accel-Redirect' in client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    response = client.get(url)
+    assert 'X-Accel-Redirect' not in response
+    assert b''.join(response.streaming_content) == COMPRESSIBLE
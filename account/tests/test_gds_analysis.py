@@ -0,0 +1,110 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from account.models import GDSLayoutInfo, Order
+from account.utils.gdsii import GDSFormatError, read_gds_metadata
+from .gds_builder import GDSBuilder
+
+
+def sample_layout():
+    return (
+        GDSBuilder(library='CHIPLIB')
+        .cell('VIA').rect(1, 0, 0, 10, 10).rect(2, 0, 0, 5, 5, datatype=3).end_cell()
+        .cell('TOP')
+        .sref('VIA', 100, 100)
+        .sref('VIA', 0, 0, angle=90)
+        .aref('VIA', 3, 2, (1000, 0), (1300, 0), (1000, 200))
+        .path(5, [(0, -50), (500, -50)], 20)
+        .text(7, 0, 0, 'label')
+        .end_cell()
+        .cell('UNUSED').rect(1, 0, 0, 1, 1).end_cell()
+    )
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    return tmp_path
+
+
+def test_metadata_of_hierarchical_layout(tmp_path):
+    metadata = read_gds_metadata(sample_layout().save(tmp_path / 'chip.gds'))
+
+    assert metadata['library_name'] == 'CHIPLIB'
+    assert metadata['user_unit'] == pytest.approx(0.001)
+    assert metadata['db_unit_m'] == pytest.approx(1e-9)
+    assert metadata['top_cells'] == ['TOP', 'UNUSED']
+    assert metadata['cell_count'] == 3
+    assert metadata['polygon_count'] == 3
+    assert metadata['path_count'] == 1
+    assert metadata['text_count'] == 1
+    assert metadata['reference_count'] == 3
+    assert metadata['layers'] == [
+        {'layer': 1, 'datatype': 0, 'count': 2},
+        {'layer': 2, 'datatype': 3, 'count': 1},
+        {'layer': 5, 'datatype': 0, 'count': 1},
+    ]
+    # Повёрнутая ссылка, массив 3×2 с шагом 100 и путь шириной 20
+    assert metadata['bbox'] == [-10, -60, 1210, 110]
+
+
+def test_padding_after_endlib_is_ignored(tmp_path):
+    path = tmp_path / 'padded.gds'
+    path.write_bytes(sample_layout().build() + b'\0' * 2048)
+
+    assert read_gds_metadata(path)['cell_count'] == 3
+
+
+def test_cyclic_references_do_not_hang(tmp_path):
+    layout = GDSBuilder().cell('A').rect(1, 0, 0, 1, 1).sref('B', 0, 0).end_cell() \
+        .cell('B').sref('A', 10, 10).end_cell()
+
+    metadata = read_gds_metadata(layout.save(tmp_path / 'cycle.gds'))
+
+    assert metadata['top_cells'] == []
+    assert metadata['cell_count'] == 2
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = tmp_path / 'broken.gds'
+    path.write_bytes(sample_layout().build()[:-30])
+
+    with pytest.raises(GDSFormatError):
+        read_gds_metadata(path)
+
+
+def test_upload_is_analyzed_by_worker(media_root, order, curator, client, capsys):
+    order.GDS_file.save('chip.gds', ContentFile(sample_layout().build()))
+
+    info = GDSLayoutInfo.objects.get(order=order)
+    assert info.status == GDSLayoutInfo.Status.PENDING
+    assert info.file_name == order.GDS_file.name
+
+    call_command('analyze_gds_files')
+
+    assert 'Analyzed 1 GDS files, failed 0' in capsys.readouterr().out
+    info.refresh_from_db()
+    assert info.status == GDSLayoutInfo.Status.DONE
+    assert info.library_name == 'CHIPLIB'
+    assert info.bbox_um['width'] == pytest.approx(1.22)
+
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.CGDS)
+    client.force_login(curator.user)
+    response = client.get(reverse('check_gds_file_curator', args=[order.pk]))
+    assert 'CHIPLIB' in response.content.decode()
+
+
+def test_reupload_resets_analysis(media_root, order):
+    order.GDS_file.save('chip.gds', ContentFile(sample_layout().build()))
+    call_command('analyze_gds_files')
+
+    order.GDS_file.save('broken.gds', ContentFile(b'not a gds file'))
+    info = GDSLayoutInfo.objects.get(order=order)
+    assert info.status == GDSLayoutInfo.Status.PENDING
+
+    call_command('analyze_gds_files')
+    info.refresh_from_db()
+    assert info.status == GDSLayoutInfo.Status.FAILED
+    assert info.error
@@ -0,0 +1,116 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from account.models import GDSLayoutInfo, Message, Topic
+from account.utils.gds_preview import GridIndex, load_layout, preview_tile_name, render_tile
+from .gds_builder import GDSBuilder
+
+
+def corner_layout():
+    # Массив 4×4 ячеек в левом нижнем углу и один прямоугольник в правом верхнем
+    return (
+        GDSBuilder()
+        .cell('PAD').rect(1, 0, 0, 80, 80).end_cell()
+        .cell('TOP')
+        .aref('PAD', 4, 4, (0, 0), (400, 0), (0, 400))
+        .rect(2, 900, 900, 1000, 1000)
+        .end_cell()
+    )
+
+
+def is_blank(image):
+    return image.convert('L').getextrema() == (255, 255)
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    return tmp_path
+
+
+def test_grid_index_returns_only_intersecting_boxes():
+    boxes = [(x * 10, y * 10, x * 10 + 5, y * 10 + 5) for x in range(20) for y in range(20)]
+    index = GridIndex((0, 0, 195, 195), boxes)
+
+    found = index.query((0, 0, 12, 12))
+
+    assert {boxes[i] for i in found} >= {(0, 0, 5, 5), (10, 10, 15, 15)}
+    assert len(found) < len(boxes) // 10
+
+
+def test_tiles_show_only_their_part_of_layout(tmp_path):
+    layout = load_layout(corner_layout().save(tmp_path / 'chip.gds'))
+
+    assert not is_blank(render_tile(layout, 0, 0, 0))
+    # Плитки нумеруются сверху вниз: (0, 1) — левый нижний угол, (1, 0) — правый верхний
+    assert not is_blank(render_tile(layout, 1, 0, 1))
+    assert not is_blank(render_tile(layout, 1, 1, 0))
+    assert is_blank(render_tile(layout, 1, 0, 0))
+    assert is_blank(render_tile(layout, 1, 1, 1))
+
+
+def test_shapes_past_coordinate_limit_are_folded_per_layer(tmp_path):
+    builder = GDSBuilder().cell('TOP')
+    for i in range(200):
+        builder.rect(1 + i % 2, i * 10, 0, i * 10 + 5, 5)
+    layout = load_layout(builder.end_cell().save(tmp_path / 'chip.gds'), max_coords=100)
+
+    cell = layout.cells['TOP']
+    # До предела фигуры хранятся как есть, дальше — по одному габариту на слой
+    assert len(cell.shapes) == len(cell.boxes) == 100 // 10 + 2
+    assert {shape[1]: box for shape, box in zip(cell.shapes[-2:], cell.boxes[-2:])} == {
+        1: (100, 0, 1985, 5), 2: (110, 0, 1995, 5),
+    }
+    assert not is_blank(render_tile(layout, 1, 1, 1))
+
+
+def test_worker_renders_preview_and_posts_to_chat(media_root, order, curator, client):
+    Topic.objects.create(name='Чат', related_order=order)
+    order.GDS_file.save('chip.gds', ContentFile(corner_layout().build()))
+
+    call_command('analyze_gds_files')
+
+    info = GDSLayoutInfo.objects.get(order=order)
+    assert info.preview_levels > 1
+    assert len(info.preview_key) == 64
+    assert (media_root / 'media' / preview_tile_name(info.preview_key, 1, 1, 0)).exists()
+
+    tile_url = reverse('gds_preview_tile', args=[order.pk, info.preview_key, 0, 0, 0])
+    assert Message.objects.filter(topic__related_order=order, text__contains=tile_url).exists()
+
+    client.force_login(curator.user)
+    response = client.get(tile_url)
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'image/png'
+    assert 'immutable' in response['Cache-Control']
+
+    response = client.get(tile_url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+
+
+def test_same_content_reuses_tiles(media_root, order):
+    order.GDS_file.save('chip.gds', ContentFile(corner_layout().build()))
+    call_command('analyze_gds_files')
+    key = GDSLayoutInfo.objects.get(order=order).preview_key
+
+    order.GDS_file.save('chip_copy.gds', ContentFile(corner_layout().build()))
+    assert GDSLayoutInfo.objects.get(order=order).preview_levels == 0
+    call_command('analyze_gds_files')
+
+    assert GDSLayoutInfo.objects.get(order=order).preview_key == key
+
+
+def test_tile_access_is_checked(media_root, order, curator, customer, client):
+    order.GDS_file.save('chip.gds', ContentFile(corner_layout().build()))
+    call_command('analyze_gds_files')
+    key = GDSLayoutInfo.objects.get(order=order).preview_key
+
+    client.force_login(curator.user)
+    assert client.get(reverse('gds_preview_tile', args=[order.pk, 'f' * 64, 0, 0, 0])).status_code == 404
+    assert client.get(reverse('gds_preview_tile', args=[order.pk, key, 0, 1, 0])).status_code == 404
+    assert client.get(reverse('gds_preview_tile', args=[order.pk, key, 9, 0, 0])).status_code == 404
+
+    client.force_login(customer.user)
+    assert client.get(reverse('gds_preview_tile', args=[order.pk, key, 0, 0, 0])).status_code == 403
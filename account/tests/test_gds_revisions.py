@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from account.models import GDSRevision, MediaBlob, Message, Topic
+from account.utils.gds_revisions import diff_cells
+from account.utils.gdsii import read_cell_signatures
+from account.utils.media_store import collect_garbage
+from .gds_builder import GDSBuilder
+
+
+def revision_one():
+    return (
+        GDSBuilder()
+        .cell('VIA').rect(1, 0, 0, 10, 10).end_cell()
+        .cell('PAD').rect(2, 0, 0, 50, 50).end_cell()
+        .cell('TOP').sref('VIA', 0, 0).sref('PAD', 100, 0).end_cell()
+    )
+
+
+def revision_two():
+    return (
+        GDSBuilder()
+        .cell('VIA').rect(1, 0, 0, 10, 10).end_cell()
+        .cell('PAD').rect(2, 0, 0, 50, 50).rect(2, 60, 0, 110, 50).rect(1, 0, 0, 5, 5).end_cell()
+        .cell('<b>NEW</b>').rect(3, 0, 0, 1, 1).end_cell()
+        .cell('TOP').sref('VIA', 0, 0).sref('PAD', 100, 0).sref('<b>NEW</b>', 0, 100).end_cell()
+    )
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    return tmp_path
+
+
+def test_cell_signatures_ignore_unchanged_cells(tmp_path):
+    old = read_cell_signatures(revision_one().save(tmp_path / 'one.gds'))
+    new = read_cell_signatures(revision_two().save(tmp_path / 'two.gds'))
+
+    assert old['VIA'] == new['VIA']
+    assert old['PAD'][1] == {'2/0': 1}
+    assert new['PAD'][1] == {'2/0': 2, '1/0': 1}
+
+    diff = diff_cells(old, new)
+    assert diff == {
+        'added': ['<b>NEW</b>'],
+        'removed': [],
+        'modified': ['PAD', 'TOP'],
+        'layers': {'1/0': 1, '2/0': 1, '3/0': 1},
+    }
+    assert diff_cells(new, old)['removed'] == ['<b>NEW</b>']
+    assert diff_cells(old, old) == {'added': [], 'removed': [], 'modified': [], 'layers': {}}
+
+
+def test_reupload_posts_diff_to_chat(media_root, order):
+    Topic.objects.create(name='Чат', related_order=order)
+    order.GDS_file.save('chip.gds', ContentFile(revision_one().build()))
+    call_command('analyze_gds_files')
+    order.GDS_file.save('chip.gds', ContentFile(revision_two().build()))
+    call_command('analyze_gds_files')
+
+    revisions = list(GDSRevision.objects.filter(order=order))
+    assert [revision.number for revision in revisions] == [1, 2]
+    assert revisions[1].diff['base'] == 1
+    assert revisions[1].diff['modified'] == ['PAD', 'TOP']
+
+    message = Message.objects.get(topic__related_order=order, text__startswith='🔀')
+    assert 'ревизия 1 → 2' in message.text
+    assert '&lt;b&gt;NEW&lt;/b&gt;' in message.text
+    assert '<b>NEW' not in message.text
+    assert '2/0: +1' in message.text
+    assert message.user == order.creator
+
+
+def test_previous_revision_file_is_kept(media_root, order):
+    order.GDS_file.save('chip.gds', ContentFile(revision_one().build()))
+    first = order.GDS_file.name
+    order.GDS_file.save('chip.gds', ContentFile(revision_two().build()))
+    call_command('analyze_gds_files')
+
+    assert collect_garbage(grace=timedelta(0)) == 0
+    assert MediaBlob.objects.filter(ref_count__gt=0).count() == 2
+    assert GDSRevision.objects.get(order=order, number=1).file.name == first
+    assert (media_root / 'media' / first).exists()
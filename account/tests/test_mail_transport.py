@@ -0,0 +1,99 @@
+from django.core.mail import EmailMessage, get_connection
+
+from account.utils.email_outbox import enqueue_email, deliver_outbox
+from account.utils.mail_transport import TokenBucket, PooledSMTPBackend, get_pooled_connection
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_paces():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(5)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3:] == [0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_token_bucket_refills_while_idle():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+
+    clock.now += 10
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.tokens == 0
+
+
+def test_token_bucket_sleeps_outside_lock():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+    locked_while_sleeping = []
+
+    def sleep(seconds):
+        locked_while_sleeping.append(bucket.lock.locked())
+        clock.sleep(seconds)
+
+    bucket.sleep = sleep
+    bucket.acquire()
+    bucket.acquire()
+
+    assert locked_while_sleeping == [False]
+
+
+def test_only_outbox_worker_uses_rate_limited_backend(smtp_server):
+    assert not isinstance(get_connection(), PooledSMTPBackend)
+    assert isinstance(get_pooled_connection(), PooledSMTPBackend)
+
+
+def test_session_is_reused_across_batches(db, smtp_server):
+    for i in range(4):
+        enqueue_email(f'user{i}@example.com', 'Тема', 'Текст')
+
+    assert deliver_outbox(batch_size=2) == (2, 0)
+    assert deliver_outbox(batch_size=2) == (2, 0)
+
+    assert smtp_server.connections == 1
+    assert len(smtp_server.messages) == 4
+
+
+def test_reconnects_when_server_drops_session(db, smtp_server):
+    smtp_server.disconnect_after = 2
+    connection = get_pooled_connection()
+
+    with connection:
+        sent = connection.send_messages([
+            EmailMessage('Тема', 'Текст', to=[f'user{i}@example.com']) for i in range(5)
+        ])
+
+    assert sent == 5
+    assert len(smtp_server.messages) == 5
+    assert connection.reconnects == 2
+    assert smtp_server.connections == 3
+
+
+def test_backend_waits_for_bucket(db, smtp_server):
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=1, clock=clock, sleep=clock.sleep)
+    backend = PooledSMTPBackend(bucket=bucket)
+
+    backend.send_messages([EmailMessage('Тема', 'Текст', to=['user@example.com']) for _ in range(3)])
+
+    assert len(smtp_server.messages) == 3
+    assert clock.sleeps == [0.1, 0.1]
@@ -0,0 +1,131 @@
+import gzip
+import os
+from datetime import timedelta
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from account.models import File, FileDigest, MediaBlob, Message, Order, Topic
+from account.utils.generate_messages import add_file_message
+from account.utils.media_store import blob_name, collect_garbage, media_store
+
+CONTENT = b'GDSII' * 1000
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def topic(order):
+    return Topic.objects.create(name='Чат', related_order=order)
+
+
+def attach(topic, profile, content, filename='layout.gds'):
+    message = Message.objects.create(topic=topic, user=profile, text='')
+    return File.objects.create(message=message, file=ContentFile(content, name=filename))
+
+
+def test_same_content_is_stored_once(media_root, topic, curator, executor):
+    first = attach(topic, curator, CONTENT)
+    second = attach(topic, executor, CONTENT, filename='copy.gds')
+
+    assert first.file.name != second.file.name
+    assert os.path.samefile(first.file.path, second.file.path)
+    blob = MediaBlob.objects.get()
+    assert blob.ref_count == 2
+    assert blob.size == len(CONTENT)
+    assert os.path.samefile(first.file.path, media_store.path(blob_name(blob.sha256)))
+    assert FileDigest.objects.get(path=first.file.name).blob == blob
+
+
+def test_references_are_counted_across_models(media_root, topic, order, curator):
+    order.GDS_file.save('layout.gds', ContentFile(CONTENT))
+    blob = MediaBlob.objects.get()
+    # Заказ и ревизия GDS
+    assert blob.ref_count == 2
+
+    # Сообщение о загрузке ссылается на тот же путь, что и заказ
+    add_file_message(order, 'GDS_file', curator)
+    blob.refresh_from_db()
+    assert blob.ref_count == 3
+
+    order.GDS_file = ''
+    order.save(update_fields=['GDS_file'])
+    blob.refresh_from_db()
+    assert blob.ref_count == 2
+
+
+def test_unreferenced_blob_is_collected(media_root, topic, curator):
+    attached = attach(topic, curator, CONTENT)
+    path = attached.file.path
+    blob = MediaBlob.objects.get()
+
+    attached.message.delete()
+    blob.refresh_from_db()
+    assert blob.ref_count == 0
+    # В течение grace-периода блоб не трогается
+    assert collect_garbage() == 0
+
+    assert collect_garbage(grace=timedelta(0)) == 1
+    assert not os.path.exists(path)
+    assert not os.path.exists(media_store.path(blob_name(blob.sha256)))
+    assert not MediaBlob.objects.exists()
+
+
+def test_dedupe_media_adopts_existing_copies(media_root, order, capsys):
+    for name in ('uploads/GDS/a.gds', 'uploads/contracts/b.pdf'):
+        os.makedirs(media_root / os.path.dirname(name), exist_ok=True)
+        (media_root / name).write_bytes(CONTENT)
+    Order.objects.filter(pk=order.pk).update(GDS_file='uploads/GDS/a.gds', contract_file='uploads/contracts/b.pdf')
+
+    call_command('dedupe_media')
+
+    assert 'Adopted 2 files' in capsys.readouterr().out
+    assert os.path.samefile(media_root / 'uploads/GDS/a.gds', media_root / 'uploads/contracts/b.pdf')
+    assert (media_root / 'uploads/GDS/a.gds').read_bytes() == CONTENT
+    assert MediaBlob.objects.get().ref_count == 2
+
+
+def test_compressible_upload_is_stored_gzipped(media_root, topic, curator):
+    attached = attach(topic, curator, CONTENT)
+    blob = MediaBlob.objects.get()
+
+    assert blob.encoding == 'gzip'
+    assert blob.size == len(CONTENT)
+    assert blob.stored_size == os.path.getsize(attached.file.path) < len(CONTENT) // 10
+    assert gzip.decompress((media_root / attached.file.name).read_bytes()) == CONTENT
+
+    with attached.file.open('rb') as f:
+        assert f.read() == CONTENT
+    assert media_store.size(attached.file.name) == len(CONTENT)
+    with media_store.local_copy(attached.file.name) as path:
+        with open(path, 'rb') as f:
+            assert f.read() == CONTENT
+    assert not os.path.exists(path)
+
+
+def test_incompressible_upload_is_stored_raw(media_root, topic, curator):
+    attached = attach(topic, curator, CONTENT, filename='contract.pdf')
+
+    assert MediaBlob.objects.get().encoding == ''
+    assert (media_root / attached.file.name).read_bytes() == CONTENT
+
+
+def test_dedupe_media_compresses_existing_blobs(media_root, order, capsys):
+    os.makedirs(media_root / 'uploads/GDS', exist_ok=True)
+    (media_root / 'uploads/GDS/a.gds').write_bytes(CONTENT)
+    Order.objects.filter(pk=order.pk).update(GDS_file='uploads/GDS/a.gds')
+
+    call_command('dedupe_media', '--compress')
+
+    assert 'Compressed 1 blobs' in capsys.readouterr().out
+    blob = MediaBlob.objects.get()
+    assert blob.encoding == 'gzip'
+    assert os.path.samefile(media_root / 'uploads/GDS/a.gds', media_store.path(blob_name(blob.sha256)))
+    with media_store.open('uploads/GDS/a.gds') as f:
+        assert f.read() == CONTENT
+    assert FileDigest.objects.get(path='uploads/GDS/a.gds').size == blob.stored_size
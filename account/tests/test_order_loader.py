@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from account.models import Order, Message, Topic
+
+
+def _order_row_queries(queries):
+    selects = [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "account_order" ' in q['sql']]
+    updates = [q for q in queries if q['sql'].startswith('UPDATE "account_order" ')]
+    return selects, updates
+
+
+def test_status_change_fetches_order_once(client, order, curator):
+    Topic.objects.create(name='Чат', is_private=True, related_order=order)
+    client.force_login(curator.user)
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.post(f'/account/edit_order/{order.id}', {'success': '1'})
+
+    assert response.status_code == 200
+    selects, updates = _order_row_queries(ctx.captured_queries)
+    assert len(selects) == 1
+    assert len(updates) == 1
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.OVC
+    assert Message.objects.filter(topic__related_order=order).count() == 1
+
+
+def test_missing_order_is_forbidden(client, curator):
+    client.force_login(curator.user)
+
+    response = client.get('/account/edit_order/999')
+
+    assert response.status_code == 403
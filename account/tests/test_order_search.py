@@ -0,0 +1,57 @@
+import pytest
+
+from account.models import Order
+from account.utils import order_search
+from account.views import search_orders
+
+
+@pytest.fixture(params=['fts', 'tokens'])
+def backend(request, monkeypatch):
+    if request.param == 'tokens':
+        monkeypatch.setattr(order_search, 'fts_available', lambda: False)
+    return request.param
+
+
+@pytest.fixture
+def indexed_orders(backend, order):
+    order.GDS_file.name = 'uploads/GDS/2025/06/03/chip_layout_v2.gds'
+    order.save()
+
+    other = Order.objects.get(pk=order.pk)
+    other.pk = None
+    other.order_number = 'F2025070100007'
+    other.order_status = Order.OrderStatus.PO
+    other.GDS_file.name = ''
+    other.order_date = None
+    other.save()
+    return order, other
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('F2025060300001', {0}),
+    ('00007', {1}),
+    ('на проверке', {0}),
+    ('оплата', {1}),
+    ('ki', {0, 1}),
+    ('01.06.2025', {0}),
+    ('chip_layout', {0}),
+    ('нет такого', set()),
+])
+def test_search_matches_indexed_fields(indexed_orders, query, expected):
+    found = set(search_orders(Order.objects.all(), query).values_list('id', flat=True))
+
+    assert found == {indexed_orders[i].id for i in expected}
+
+
+def test_search_runs_single_query(indexed_orders, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        list(search_orders(Order.objects.all(), 'проверке ki'))
+
+
+def test_status_change_reindexes_order(indexed_orders):
+    order = indexed_orders[0]
+    order.order_status = Order.OrderStatus.EO
+    order.save()
+
+    assert not search_orders(Order.objects.filter(pk=order.pk), 'проверке').exists()
+    assert search_orders(Order.objects.filter(pk=order.pk), 'завершен').exists()
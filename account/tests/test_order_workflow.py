@@ -0,0 +1,139 @@
+import pytest
+
+from account.access_rules.access_rules import ACCESS_RULES, ORDER_WORKFLOW
+from account.models import Order, OrderStatusHistory, Message
+from account.utils.list_productions_statuses import STATUS_CONFIG
+from account.utils.order_workflow import apply_transition, TransitionError, TransitionConflict
+
+
+def test_transition_writes_one_history_row_and_one_message(order, curator):
+    new_status = apply_transition(order, 'next', curator, comment='Проверено')
+
+    assert new_status == Order.OrderStatus.OVC
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.OVC
+
+    history = OrderStatusHistory.objects.filter(order=order)
+    assert history.count() == 1
+    assert (history[0].old_status, history[0].new_status) == ('OVK', 'OVC')
+    assert history[0].changed_by == curator
+    assert history[0].comment == 'Проверено'
+
+    messages = Message.objects.filter(topic__related_order=order)
+    assert messages.count() == 1
+    assert 'Комментарий: Проверено' in messages[0].text
+
+
+def test_stale_status_raises_conflict(order, curator):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.OVC)
+
+    with pytest.raises(TransitionConflict):
+        apply_transition(order, 'next', curator)
+
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.OVC
+    assert not OrderStatusHistory.objects.filter(order=order).exists()
+
+
+def test_role_not_allowed(order, customer):
+    with pytest.raises(TransitionError):
+        apply_transition(order, 'next', customer)
+
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.OVK
+
+
+def test_unknown_action(order, curator):
+    with pytest.raises(TransitionError):
+        apply_transition(order, 'not_ready', curator)
+
+
+def test_extra_fields_are_written_with_status(order, curator):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.POK)
+    order.refresh_from_db()
+
+    apply_transition(order, 'prev', curator, is_paid=False)
+
+    order.refresh_from_db()
+    assert order.order_status == Order.OrderStatus.PO
+    assert order.is_paid is False
+
+
+def test_derived_tables_match_workflow():
+    assert ACCESS_RULES[Order.OrderStatus.PS] == ['Куратор']
+    assert Order.OrderStatus.EO not in ACCESS_RULES
+    for status, config in STATUS_CONFIG.items():
+        assert config['next_status'] == ORDER_WORKFLOW[status]['edges']['next']
+        assert config['prev_status'] == ORDER_WORKFLOW[status]['edges']['prev']
+
+
+def test_production_status_view_writes_single_history_row(client, order, executor):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.MTP)
+    client.force_login(executor.user)
+
+    response = client.post(
+        f'/account/order/{order.id}/status/MTP/',
+        {'next_status': '1', 'comment': 'Шаблоны готовы'},
+    )
+
+    assert response.status_code == 200
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.MTPF
+    history = OrderStatusHistory.objects.filter(order=order)
+    assert history.count() == 1
+    assert history[0].comment == 'Шаблоны готовы'
+    assert Message.objects.filter(topic__related_order=order).count() == 1
+
+
+def test_production_status_view_escapes_comment(client, order, executor):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.MTP)
+    client.force_login(executor.user)
+
+    client.post(f'/account/order/{order.id}/status/MTP/', {
+        'next_status': '1', 'comment': '<img src=x onerror=alert(1)>',
+    })
+
+    text = Message.objects.get(topic__related_order=order).text
+    assert 'Комментарий: &lt;img src=x onerror=alert(1)&gt;' in text
+    assert '<img' not in text
+
+
+def test_second_stale_instance_conflicts(order, curator):
+    stale = Order.objects.get(pk=order.pk)
+    apply_transition(order, 'next', curator)
+
+    with pytest.raises(TransitionConflict):
+        apply_transition(stale, 'prev', curator)
+
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.OVC
+    assert OrderStatusHistory.objects.filter(order=order).count() == 1
+
+
+def test_expected_status_mismatch_conflicts(order, curator):
+    with pytest.raises(TransitionConflict):
+        apply_transition(order, 'next', curator, expected_status=Order.OrderStatus.OVC)
+
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.OVK
+
+
+def test_repeated_production_post_moves_order_once(client, order, executor):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.MTP)
+    client.force_login(executor.user)
+
+    url = f'/account/order/{order.id}/status/MTP/'
+    assert client.post(url, {'next_status': '1'}).status_code == 200
+    assert client.post(url, {'next_status': '1'}).status_code == 409
+
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.MTPF
+    assert OrderStatusHistory.objects.filter(order=order).count() == 1
+
+
+def test_repeated_form_post_moves_order_once(client, order, executor):
+    Order.objects.filter(pk=order.pk).update(order_status=Order.OrderStatus.MPO, mask_name='M1')
+    client.force_login(executor.user)
+    url = f'/account/plates_in_stock/{order.id}/'
+
+    assert 'name="expected_status" value="MPO"' in client.get(url).content.decode()
+
+    data = {'success_confirmation': '1', 'expected_status': 'MPO'}
+    assert client.post(url, data).status_code == 200
+    assert client.post(url, data).status_code == 409
+
+    assert Order.objects.get(pk=order.pk).order_status == Order.OrderStatus.MTP
+    assert OrderStatusHistory.objects.filter(order=order).count() == 1
@@ -0,0 +1,110 @@
+import pytest
+from django.core import signing
+
+from account.models import Order
+from account.utils.pagination import CURSOR_SALT, keyset_paginate
+from account.views import ORDER_SORT_KEYS, filter_orders
+
+
+def _make_orders(order, count):
+    statuses = ['OVK', 'PO', 'MTP', 'EO']
+    for i in range(count):
+        order.pk = None
+        order.order_number = f'F20250603{i + 2:05d}'
+        order.order_status = statuses[i % len(statuses)]
+        order.save()
+
+
+def _walk(queryset, filter_by, page_size, on_page=None):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_paginate(queryset, ORDER_SORT_KEYS[filter_by], cursor, page_size)
+        seen.extend(rows)
+        if on_page:
+            on_page()
+        if not cursor:
+            return seen
+
+
+@pytest.mark.parametrize('filter_by', ['order_number', 'created_at', 'status'])
+def test_pages_match_full_ordering(order, filter_by):
+    _make_orders(order, 11)
+    queryset = filter_orders(Order.objects.all(), filter_by)
+
+    seen = _walk(queryset, filter_by, page_size=4)
+
+    assert [o.id for o in seen] == list(queryset.values_list('id', flat=True))
+
+
+def test_pages_are_stable_under_concurrent_inserts(order):
+    _make_orders(order, 9)
+    template = Order.objects.get(pk=1)
+    before = set(Order.objects.values_list('id', flat=True))
+
+    def insert_newer():
+        template.pk = None
+        template.save()
+
+    seen = _walk(filter_orders(Order.objects.all(), 'created_at'), 'created_at', 3, insert_newer)
+
+    ids = [o.id for o in seen]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == before
+
+
+def test_tampered_cursor_falls_back_to_first_page(order):
+    _make_orders(order, 3)
+    queryset = filter_orders(Order.objects.all(), 'order_number')
+
+    rows, _ = keyset_paginate(queryset, ORDER_SORT_KEYS['order_number'], 'garbage', 2)
+
+    assert [o.id for o in rows] == list(queryset.values_list('id', flat=True)[:2])
+
+
+def test_cursor_of_other_sort_falls_back_to_first_page(order):
+    _make_orders(order, 5)
+    by_date = filter_orders(Order.objects.all(), 'created_at')
+    _, cursor = keyset_paginate(by_date, ORDER_SORT_KEYS['created_at'], None, 2)
+    by_status = filter_orders(Order.objects.all(), 'status')
+
+    rows, _ = keyset_paginate(by_status, ORDER_SORT_KEYS['status'], cursor, 2)
+
+    assert [o.id for o in rows] == list(by_status.values_list('id', flat=True)[:2])
+
+
+def test_cursor_with_bad_value_falls_back_to_first_page(order):
+    _make_orders(order, 5)
+    by_status = filter_orders(Order.objects.all(), 'status')
+    cursor = signing.dumps(
+        {'keys': [['status_priority', False], ['id', True]], 'values': ['2025-06-03T00:00:00', 1]},
+        salt=CURSOR_SALT, compress=True,
+    )
+
+    rows, _ = keyset_paginate(by_status, ORDER_SORT_KEYS['status'], cursor, 2)
+
+    assert [o.id for o in rows] == list(by_status.values_list('id', flat=True)[:2])
+
+
+def test_curator_orders_view_renders_one_page(client, order, curator):
+    _make_orders(order, 5)
+    client.force_login(curator.user)
+
+    response = client.get('/account/curator/orders/', {'filter_by': 'status', 'page_size': 2})
+
+    assert response.status_code == 200
+    assert len(response.context['data']['orders']) == 2
+    assert 'cursor=' in response.context['data']['next_query']
+
+
+def test_null_created_at_rows_cross_page_boundary(order):
+    _make_orders(order, 6)
+    Order.objects.filter(pk__in=list(Order.objects.order_by('id').values_list('id', flat=True)[:4])) \
+        .update(created_at=None)
+    queryset = filter_orders(Order.objects.all(), 'created_at')
+
+    # Граница первой страницы приходится на строку с NULL, следующая страница продолжает группу NULL
+    seen = _walk(queryset, 'created_at', page_size=2)
+
+    assert [o.id for o in seen] == list(queryset.values_list('id', flat=True))
+    assert len(seen) == Order.objects.count()
+    assert [o.created_at for o in seen][-4:] == [None] * 4
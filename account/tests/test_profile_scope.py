@@ -0,0 +1,80 @@
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.access_rules.access_rules import ACCESS_RULES, ROLE_NAMES, ProfileScope, profile_scope, \
+    role_can_act
+from account.authentication import load_user
+from account.models import Order, Role
+from account.utils.profile_scope import get_profile_scope
+
+
+def scope_request(user, session):
+    request = RequestFactory().get('/')
+    request.user = user
+    request.session = session
+    return request
+
+
+def test_matrix_matches_workflow_table():
+    for status in Order.OrderStatus.values:
+        for role, name in ROLE_NAMES.items():
+            scope = ProfileScope(user_id=1, profile_id=1, role=role, role_name=name)
+            assert role_can_act(scope, status) == (name in ACCESS_RULES.get(status, []))
+
+
+def test_scope_is_cached_in_session(client, executor, django_assert_num_queries):
+    client.force_login(executor.user)
+    session = client.session
+
+    scope = get_profile_scope(scope_request(executor.user, session))
+    assert (scope.role_name, scope.platform_id) == ('Исполнитель', executor.platform_id)
+
+    with django_assert_num_queries(0):
+        assert get_profile_scope(scope_request(executor.user, session)) == scope
+
+    executor.company_name = 'ZC'
+    executor.save()
+
+    updated = get_profile_scope(scope_request(executor.user, session))
+    assert updated.platform_id is None and updated.company_id == executor.company_id
+
+
+def test_role_change_reaches_sessions_in_other_workers(client, executor):
+    client.force_login(executor.user)
+    session = client.session
+    assert get_profile_scope(scope_request(load_user(executor.user_id), session)).role_name == 'Исполнитель'
+
+    role = Role.objects.get(pk=executor.role_id)
+    role.name = 'Заказчик'
+    role.save()
+
+    # Версия прав хранится в профиле: её видит любой воркер, загрузивший пользователя
+    scope = get_profile_scope(scope_request(load_user(executor.user_id), session))
+    assert scope.role_name == 'Заказчик'
+
+
+def test_restricted_view_checks_scope_without_role_query(client, executor, order):
+    client.force_login(executor.user)
+    url = reverse('edit_order', args=[order.pk])
+    assert client.get(url).status_code == 403
+
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(url).status_code == 403
+
+    # Роль не читается: ни отдельным запросом, ни вместе с профилем пользователя
+    assert not any('FROM "account_role"' in query['sql'] for query in queries)
+    assert not any('FROM "account_profile" INNER JOIN "account_role"' in query['sql'] for query in queries)
+
+
+def test_dashboard_buttons_follow_matrix(curator, executor, order):
+    template = Template('{% load custom_filters %}{% if scope|can_act:order %}act{% endif %}')
+
+    def render(profile):
+        return template.render(Context({'scope': profile_scope(profile), 'order': order}))
+
+    # OVK — этап куратора
+    assert render(curator) == 'act'
+    assert render(executor) == ''
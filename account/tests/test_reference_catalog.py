@@ -0,0 +1,78 @@
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.forms import OrderEditForm
+from account.models import Diameter, Platform, ReferenceCatalogVersion, TechnicalProcess
+from account.utils.reference_catalog import get_catalog
+
+
+def test_catalog_is_served_from_process_copy(client, order):
+    get_catalog()
+    platform_id = order.platform_code_id
+
+    with CaptureQueriesContext(connection) as queries:
+        catalog = get_catalog()
+        response = client.get(reverse('load_data'), {'platform_id': platform_id})
+        form_html = str(OrderEditForm(instance=order))
+
+    # Справочник не пересобирается: читается только номер версии из базы, общей для всех воркеров
+    assert queries.captured_queries
+    assert all('FROM "account_referencecatalogversion"' in query['sql'] for query in queries)
+
+    assert response.json()['technical_processes'] == catalog.technical_processes(platform_id)
+    assert f'value="{order.technical_process_id}" selected' in form_html
+
+
+def test_write_bumps_version(order, django_capture_on_commit_callbacks):
+    catalog = get_catalog()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        platform = Platform.objects.create(platform_name='Новая', platform_code='NEW')
+        Diameter.objects.create(platform=platform, value=150)
+        TechnicalProcess.objects.create(platform=platform, name_process='ТП-1')
+        TechnicalProcess.objects.create(platform=platform, name_process='ТП-1')
+
+    updated = get_catalog()
+    assert updated.version > catalog.version
+    assert updated.etag != catalog.etag
+    assert [d['value'] for d in updated.diameters(platform.id)] == [150]
+    # Повторяющееся название техпроцесса попадает в справочник один раз
+    assert [p['name_process'] for p in updated.technical_processes(platform.id)] == ['ТП-1']
+
+
+def test_catalog_endpoint_caching(client, order):
+    catalog = get_catalog()
+    url = reverse('reference_catalog', args=[catalog.version])
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response['ETag'] == catalog.etag
+    assert 'immutable' in response['Cache-Control']
+    assert response.json()['platforms'] == catalog.platforms()
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=catalog.etag).status_code == 304
+
+    stale = client.get(reverse('reference_catalog', args=[catalog.version - 1]))
+    assert stale.status_code == 302
+    assert stale['Location'] == url
+
+
+def test_form_rejects_process_of_other_platform(order):
+    other = Platform.objects.create(platform_name='Другая', platform_code='OTH')
+    process = TechnicalProcess.objects.create(platform=other, name_process='Чужой')
+
+    form = OrderEditForm(data={'platform_code': order.platform_code_id, 'technical_process': process.id})
+
+    assert not form.is_valid()
+    assert 'technical_process' in form.errors
+
+
+def test_version_change_by_other_worker_is_seen(order):
+    catalog = get_catalog()
+
+    # Другой воркер изменил справочник: общий номер версии в базе уже другой
+    ReferenceCatalogVersion.objects.update(version=F('version') + 1)
+
+    assert get_catalog().version == catalog.version + 1
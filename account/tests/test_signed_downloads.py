@@ -0,0 +1,97 @@
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from django.conf import settings as django_settings
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.timezone import now
+
+from account.models import Order
+from account.utils.signed_downloads import SIGNED_DOWNLOAD_MAX_AGE, signed_download_prefix, signed_download_url
+
+CONTENT = b'%PDF-1.4 contract'
+
+
+@pytest.fixture
+def contract(settings, tmp_path, order):
+    settings.MEDIA_ROOT = str(tmp_path)
+    os.makedirs(tmp_path / 'uploads' / 'contracts')
+    (tmp_path / 'uploads' / 'contracts' / 'Договор.pdf').write_bytes(CONTENT)
+    Order.objects.filter(pk=order.pk).update(contract_file='uploads/contracts/Договор.pdf')
+    return 'uploads/contracts/Договор.pdf'
+
+
+def signed_url(client, user, file_path):
+    client.force_login(user)
+    request = RequestFactory().get('/')
+    request.user = user
+    request.session = client.session
+    return signed_download_url(request, file_path)
+
+
+def test_dashboard_renders_signed_links(client, curator, contract):
+    client.force_login(curator.user)
+
+    response = client.get(reverse('dashboard'))
+
+    assert signed_download_prefix() + f'{curator.user.pk}/' in response.content.decode()
+
+
+def test_signed_download_skips_session_and_profile(client, curator, contract, django_assert_num_queries):
+    url = signed_url(client, curator.user, contract)
+    assert client.get(url).status_code == 200
+
+    # Только запись FileDigest для ETag: ни сессии, ни пользователя, ни профиля
+    with django_assert_num_queries(1):
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == CONTENT
+    assert response['Cache-Control'] == 'private'
+
+
+def test_signed_link_is_stable_within_step(client, curator, contract):
+    assert signed_url(client, curator.user, contract) == signed_url(client, curator.user, contract)
+
+
+def test_tampered_or_foreign_link_is_rejected(client, curator, executor, contract):
+    url = signed_url(client, curator.user, contract)
+
+    assert client.get(url.replace('/contracts/', '/invoices/')).status_code == 404
+    assert client.get(url.replace(f'/{curator.user.pk}/', f'/{executor.user.pk}/', 1)).status_code == 404
+
+    # Та же ссылка в чужой сессии недействительна
+    client.force_login(executor.user)
+    assert client.get(url).status_code == 404
+
+    client.cookies.pop(django_settings.SESSION_COOKIE_NAME)
+    assert client.get(url).status_code == 404
+
+
+def test_expired_link_is_rejected(client, curator, contract, freezer):
+    url = signed_url(client, curator.user, contract)
+
+    freezer.move_to(time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() + 2 * SIGNED_DOWNLOAD_MAX_AGE)))
+
+    assert client.get(url).status_code == 404
+
+
+def test_link_does_not_outlive_account(client, curator, contract, freezer):
+    curator.expiration_date = now() + timedelta(minutes=10)
+    curator.save()
+    url = signed_url(client, curator.user, contract)
+    assert f'/{int(curator.expiration_date.timestamp())}/' in url
+    assert client.get(url).status_code == 200
+
+    freezer.move_to(now() + timedelta(minutes=11))
+
+    assert client.get(url).status_code == 404
+
+
+def test_anonymous_page_gets_plain_link(rf, contract):
+    request = rf.get('/')
+    request.user = type('Anonymous', (), {'is_authenticated': False})()
+
+    assert signed_download_url(request, contract) == reverse('protected_download', kwargs={'file_path': contract})
@@ -0,0 +1,72 @@
+import pytest
+from django.test import RequestFactory
+
+from account.context_processors.context_processors import unread_messages
+from account.models import Message, UnreadCounter
+from account.utils.unread_counters import mark_topic_read, rebuild_unread_counters
+
+
+def _count(profile, topic):
+    return UnreadCounter.objects.get(profile=profile, topic=topic).unread_count
+
+
+def test_message_increments_counters_except_author(private_topic, curator, executor):
+    Message.objects.create(topic=private_topic, user=curator, text='1')
+    Message.objects.create(topic=private_topic, user=curator, text='2')
+
+    assert _count(executor, private_topic) == 2
+    assert _count(curator, private_topic) == 0
+
+
+def test_delete_unread_message_decrements_counter(private_topic, curator, executor):
+    Message.objects.create(topic=private_topic, user=curator, text='1')
+    message = Message.objects.create(topic=private_topic, user=curator, text='2')
+
+    message.delete()
+
+    assert _count(executor, private_topic) == 1
+
+
+def test_topic_detail_marks_topic_read(client, private_topic, curator, executor):
+    Message.objects.create(topic=private_topic, user=curator, text='1')
+    client.force_login(executor.user)
+
+    client.get(f'/account/topic/{private_topic.id}/')
+
+    assert _count(executor, private_topic) == 0
+
+
+def test_message_arriving_after_fetch_stays_unread(private_topic, curator, executor):
+    shown = Message.objects.create(topic=private_topic, user=curator, text='1')
+    Message.objects.create(topic=private_topic, user=curator, text='2')
+
+    # Тема отрисована с сообщением shown, второе пришло до сброса счётчика
+    mark_topic_read(executor, private_topic, shown)
+
+    assert _count(executor, private_topic) == 1
+    mark_topic_read(executor, private_topic, Message.objects.filter(topic=private_topic).order_by('-id').first())
+    assert _count(executor, private_topic) == 0
+
+
+def test_context_processor_uses_counters(private_topic, curator, executor, order, django_assert_num_queries):
+    Message.objects.create(topic=private_topic, user=curator, text='1')
+    request = RequestFactory().get('/')
+    request.user = executor.user
+    request.user.profile
+
+    with django_assert_num_queries(1):
+        context = unread_messages(request)
+
+    assert context == {'has_unread_messages_by_order_id': {order.id: True}}
+
+
+def test_rebuild_matches_incremental_counters(private_topic, curator, executor):
+    Message.objects.create(topic=private_topic, user=curator, text='1')
+    last = Message.objects.create(topic=private_topic, user=executor, text='2')
+    expected = dict(UnreadCounter.objects.values_list('profile_id', 'unread_count'))
+
+    UnreadCounter.objects.all().delete()
+    rebuild_unread_counters()
+
+    assert dict(UnreadCounter.objects.values_list('profile_id', 'unread_count')) == expected
+    assert set(UnreadCounter.objects.values_list('last_message_id', flat=True)) == {last.id}
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from account.models import EmailOutbox, JobWatermark, Message, UserTopic
+from account.utils.unread_message_email_sender import send_unread_messages, DIGEST_WATERMARK
+
+pytestmark = pytest.mark.freeze_time('2025-06-01 12:00:00')
+
+
+@pytest.fixture
+def participants(private_topic, curator, executor):
+    curator.user.email = 'curator@example.com'
+    curator.user.save()
+    executor.user.email = 'executor@example.com'
+    executor.user.save()
+    return curator, executor
+
+
+def _message(topic, author, text, age=timedelta(hours=2)):
+    message = Message.objects.create(topic=topic, user=author, text=text)
+    Message.objects.filter(pk=message.pk).update(created_at=timezone.now() - age)
+    return message
+
+
+def test_digest_goes_to_unread_participants_only(private_topic, participants):
+    curator, executor = participants
+    _message(private_topic, curator, 'Первое')
+    _message(private_topic, curator, 'Второе')
+
+    assert send_unread_messages() == 1
+
+    email = EmailOutbox.objects.get()
+    assert email.to_email == 'executor@example.com'
+    assert 'Первое' in email.body and 'Второе' in email.body
+    assert not Message.objects.filter(email_sent=False).exists()
+
+
+def test_read_messages_are_skipped(private_topic, participants):
+    curator, executor = participants
+    message = _message(private_topic, curator, 'Прочитано')
+    UserTopic.objects.filter(user=executor, topic=private_topic).update(last_read_message=message)
+
+    assert send_unread_messages() == 0
+    assert Message.objects.get(pk=message.pk).email_sent is True
+
+
+def test_recent_messages_wait_for_next_run(private_topic, participants):
+    curator, executor = participants
+    old = _message(private_topic, curator, 'Старое')
+    _message(private_topic, curator, 'Свежее', age=timedelta(minutes=5))
+
+    send_unread_messages()
+
+    assert JobWatermark.objects.get(name=DIGEST_WATERMARK).last_id == old.id
+    assert 'Свежее' not in EmailOutbox.objects.get().body
+    assert Message.objects.filter(email_sent=False).count() == 1
+
+
+def test_second_run_processes_only_new_messages(private_topic, participants):
+    curator, executor = participants
+    _message(private_topic, curator, 'Первое')
+    send_unread_messages()
+
+    assert send_unread_messages() == 0
+    assert EmailOutbox.objects.count() == 1
+
+
+def test_query_count_is_constant(private_topic, participants, curator, executor):
+    JobWatermark.objects.create(name=DIGEST_WATERMARK)
+    for i in range(3):
+        _message(private_topic, curator, f'Сообщение {i}')
+    with CaptureQueriesContext(connection) as small:
+        send_unread_messages()
+
+    for i in range(30):
+        _message(private_topic, curator if i % 2 else executor, f'Сообщение {i}')
+    with CaptureQueriesContext(connection) as large:
+        assert send_unread_messages() == 2
+
+    assert len(large.captured_queries) == len(small.captured_queries)
@@ -30,8 +30,12 @@ urlpatterns = [
     path('my_documents/<int:id>', views.my_documents, name='my_documents'),
     path('all_documents/', views.all_documents, name='all_documents'),
     path('documents/<path:company_name>/', views.company_documents, name='company_documents'),
+    path('my_documents/<int:id>/zip/', views.my_documents_zip, name='my_documents_zip'),
+    path('documents_zip/<path:company_name>/', views.company_documents_zip, name='company_documents_zip'),
+    path('order_documents_zip/<int:order_id>/', views.order_documents_zip, name='order_documents_zip'),
     path('new_order_success/', views.new_order_success_view, name='new_order_success'),
     path('download_excel/<int:order_id>/', views.download_excel_file_from_order_id, name='download_excel_from_order_id'),
+    path('orders/export/', views.export_orders_excel, name='export_orders_excel'),
     path('edit_order/<int:order_id>', views.edit_order, name='edit_order'),
     path('edit_platform', views.edit_platform, name='edit_platform'),
     path('edit_platform-success', views.edit_platform_success, name='edit_platform_success'),
@@ -44,10 +48,13 @@ urlpatterns = [
     path('add_gds/<int:order_id>/', views.add_gds, name='add_gds'),
     path('check_gds_file_curator/<int:order_id>/', views.check_gds_file_curator, name='check_gds_file_curator'),
     path('check_gds_file_exec/<int:order_id>/', views.check_gds_file_exec, name='check_gds_file_exec'),
+    path('gds_preview/<int:order_id>/<str:key>/<int:level>/<int:x>_<int:y>.png', views.gds_preview_tile,
+         name='gds_preview_tile'),
     path('order_paid/<int:order_id>/', views.order_paid, name='is_paid'),
     path('view_is_paid/<int:order_id>/', views.view_is_paid, name='view_is_paid'),
     path('view_is_paid_exec/<int:order_id>/', views.view_is_paid_exec, name='view_is_paid_exec'),
     path('order/<int:order_id>/status/<str:current_status>/', views.production_status_view, name='production_status_view'),
+    path('orders/bulk_transition/', views.bulk_transition, name='bulk_transition'),
     path('plates_in_stock/<int:order_id>/', views.plates_in_stock, name='plates_in_stock'),
     path('shipping_is_confirm/<int:order_id>/', views.shipping_is_confirm, name='shipping_is_confirm'),
     path('plates_shipped/<int:order_id>/', views.plates_shipped, name='plates_shipped'),
@@ -63,7 +70,13 @@ urlpatterns = [
     path('login-logs/', views.login_log_view, name='login_logs'),
     path('upload/', views.upload_files, name='upload_files'),
 
+    path('download/signed/<int:user_id>/<int:expires>/<str:signature>/<path:file_path>/', views.signed_download,
+         name='signed_download'),
     path('download/<path:file_path>/', views.protected_download, name='protected_download'),
+    path('uploads/', views.upload_start, name='upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/finish/', views.upload_finish, name='upload_finish'),
 
-    path('load-data/', views.load_data, name='load_data')  # AJAX
+    path('load-data/', views.load_data, name='load_data'),  # AJAX
+    path('load-data/catalog/<int:version>/', views.reference_catalog, name='reference_catalog'),
 ]
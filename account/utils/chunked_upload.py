@@ -0,0 +1,265 @@
+import glob
+import hashlib
+import os
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import Order, UploadSession
+from ..access_rules.access_rules import can_act
+from .file_digest import HASH_CHUNK_SIZE
+from .generate_messages import add_file_message
+
+S = Order.OrderStatus
+
+# Поля заказа, которые можно загружать частями, и статусы, в которых это разрешено
+# (те же, что у add_gds, check_signing_curator и view_is_paid)
+UPLOAD_FIELDS = {
+    'GDS_file': (S.OGDS,),
+    'contract_file': (S.CSA,),
+    'invoice_file': (S.POK,),
+}
+
+UPLOAD_MAX_SIZE = getattr(settings, 'UPLOAD_MAX_SIZE', 20 * 1024 ** 3)
+UPLOAD_CHUNK_SIZE = getattr(settings, 'UPLOAD_CHUNK_SIZE', 8 * 1024 ** 2)
+# Незавершённые загрузки старше этого срока удаляет cleanup_stale_uploads
+UPLOAD_SESSION_TTL = timedelta(days=2)
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Запрос к загрузке некорректен; status — HTTP-код ответа"""
+    status = 400
+
+
+class UploadForbidden(UploadError):
+    status = 403
+
+
+class UploadNotFound(UploadError):
+    status = 404
+
+
+class UploadOffsetMismatch(UploadError):
+    """Смещение части не совпало с уже принятым — клиент должен продолжить с offset"""
+    status = 409
+
+    def __init__(self, offset):
+        super().__init__(f'Ожидалось смещение {offset}')
+        self.offset = offset
+
+
+class UploadTooLarge(UploadError):
+    status = 413
+
+
+def staging_dir():
+    return getattr(settings, 'UPLOAD_STAGING_DIR', os.path.join(settings.BASE_DIR, 'upload_staging'))
+
+
+def staging_path(session):
+    return os.path.join(staging_dir(), f'{session.pk}.part')
+
+
+# Состояние SHA-256 между частями. hashlib не сериализуется, поэтому состояние живёт
+# в памяти процесса; если часть пришла в другой воркер, уже принятый префикс
+# перечитывается один раз, дальше хэш снова считается потоково.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def _get_hasher(session):
+    with _hashers_lock:
+        offset, hasher = _hashers.pop(session.pk, (None, None))
+    if offset == session.offset:
+        return hasher
+
+    hasher = hashlib.sha256()
+    remaining = session.offset
+    with open(staging_path(session), 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(HASH_CHUNK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _store_hasher(session, hasher):
+    with _hashers_lock:
+        _hashers[session.pk] = (session.offset, hasher)
+
+
+def _drop_hasher(session_id):
+    with _hashers_lock:
+        _hashers.pop(session_id, None)
+
+
+def check_upload_permission(profile, order, field_name):
+    """Загружать файл может тот же, кто может открыть страницу соответствующего этапа"""
+    if field_name not in UPLOAD_FIELDS:
+        raise UploadError(f'Поле {field_name!r} нельзя загружать частями')
+    if order.order_status not in UPLOAD_FIELDS[field_name]:
+        raise UploadForbidden('В текущем статусе заказа этот файл не загружается')
+    if not can_act(profile, order):
+        raise UploadForbidden('Вы не можете загружать файлы в этот заказ')
+
+
+def start_upload(profile, order, field_name, filename, size, sha256=''):
+    """Создаёт сессию загрузки и пустой временный файл"""
+    check_upload_permission(profile, order, field_name)
+
+    filename = os.path.basename(str(filename or '').replace('\\', '/')).strip()
+    if not filename:
+        raise UploadError('Не указано имя файла')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('Не указан размер файла')
+    if size <= 0:
+        raise UploadError('Пустой файл')
+    if size > UPLOAD_MAX_SIZE:
+        raise UploadTooLarge('Файл больше допустимого размера')
+
+    session = UploadSession.objects.create(
+        order=order,
+        profile=profile,
+        field_name=field_name,
+        filename=filename[:255],
+        size=size,
+        expected_sha256=(sha256 or '').lower()[:64],
+    )
+    os.makedirs(staging_dir(), exist_ok=True)
+    open(staging_path(session), 'wb').close()
+    return session
+
+
+def get_upload(profile, upload_id):
+    session = UploadSession.objects.filter(pk=upload_id, profile=profile).first()
+    if session is None:
+        raise UploadNotFound('Загрузка не найдена')
+    return session
+
+
+def _receive_chunk(stream, length, chunk_path):
+    """Тело запроса блоками во временный файл части; возвращает число принятых байт"""
+    received = 0
+    with open(chunk_path, 'wb') as f:
+        while received < length:
+            try:
+                block = stream.read(min(READ_BLOCK_SIZE, length - received))
+            except OSError:
+                # Обрыв соединения: принятые байты сохраняются, клиент продолжит с нового offset
+                break
+            if not block:
+                break
+            f.write(block)
+            received += len(block)
+    return received
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Дописывает часть файла с позиции offset, читая тело запроса блоками, без буферизации
+    всей части в памяти. Часть сначала принимается в собственный временный файл, затем
+    в транзакции условный UPDATE по смещению блокирует строку сессии, и только после этого
+    часть переносится в .part и в хэш. Повтор или гонка двух запросов с одним смещением
+    не трогают уже принятые байты. Возвращает новое смещение.
+    """
+    if session.status != UploadSession.Status.OPEN:
+        raise UploadError('Загрузка уже завершена')
+    if offset != session.offset:
+        raise UploadOffsetMismatch(session.offset)
+    if length > UPLOAD_CHUNK_SIZE:
+        raise UploadTooLarge('Часть больше UPLOAD_CHUNK_SIZE')
+    if offset + length > session.size:
+        raise UploadTooLarge('Часть выходит за объявленный размер файла')
+
+    # Медленный клиент не держит блокировку: сеть читается до транзакции
+    chunk_path = f'{staging_path(session)}.{uuid.uuid4().hex}'
+    try:
+        received = _receive_chunk(stream, length, chunk_path)
+        new_offset = offset + received
+        with transaction.atomic():
+            updated = UploadSession.objects.filter(
+                pk=session.pk, offset=offset, status=UploadSession.Status.OPEN,
+            ).update(offset=new_offset, updated_at=timezone.now())
+            if not updated:
+                session.refresh_from_db(fields=['offset'])
+                raise UploadOffsetMismatch(session.offset)
+
+            # Строка сессии заблокирована до конца транзакции: .part пишет только этот запрос
+            session.offset = offset
+            hasher = _get_hasher(session)
+            with open(chunk_path, 'rb') as src, open(staging_path(session), 'r+b') as f:
+                f.seek(offset)
+                f.truncate()
+                for block in iter(lambda: src.read(READ_BLOCK_SIZE), b''):
+                    f.write(block)
+                    hasher.update(block)
+            session.offset = new_offset
+            _store_hasher(session, hasher)
+    finally:
+        os.remove(chunk_path)
+    return new_offset
+
+
+def finish_upload(session):
+    """
+    Проверяет, что файл получен целиком, переносит его в хранилище под именем из upload_to поля
+    и в одной транзакции записывает путь в заказ. Посчитанный при загрузке хэш сразу
+    используется для дедупликации и ETag, файл повторно не читается.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().select_related('order').get(pk=session.pk)
+        if session.status != UploadSession.Status.OPEN:
+            raise UploadError('Загрузка уже завершена')
+        if session.offset != session.size:
+            raise UploadOffsetMismatch(session.offset)
+
+        sha256 = _get_hasher(session).hexdigest()
+        if session.expected_sha256 and session.expected_sha256 != sha256:
+            raise UploadError('Контрольная сумма файла не совпадает')
+
+        order = session.order
+        # Статус мог измениться, пока файл загружался
+        check_upload_permission(session.profile, order, session.field_name)
+        field = Order._meta.get_field(session.field_name)
+        # Временный файл становится блобом media_store (или удаляется, если такое содержимое
+        # уже хранится), под именем из upload_to создаётся ссылка на него
+        name = field.storage.store_file(
+            field.storage.get_available_name(field.generate_filename(order, session.filename)),
+            staging_path(session), sha256, session.size,
+        )
+
+        setattr(order, session.field_name, name)
+        order.save(update_fields=[session.field_name])
+        session.status = UploadSession.Status.COMPLETE
+        session.sha256 = sha256
+        session.save(update_fields=['status', 'sha256', 'updated_at'])
+        add_file_message(order, session.field_name, session.profile)
+
+    _drop_hasher(session.pk)
+    return session
+
+
+def cleanup_stale_uploads(ttl=UPLOAD_SESSION_TTL):
+    """Удаляет брошенные незавершённые загрузки и их временные файлы; возвращает их число"""
+    stale = list(UploadSession.objects.filter(
+        status=UploadSession.Status.OPEN, updated_at__lt=timezone.now() - ttl,
+    ))
+    for session in stale:
+        _drop_hasher(session.pk)
+        # .part и части, оставшиеся от оборванных запросов
+        for path in [staging_path(session), *glob.glob(glob.escape(staging_path(session)) + '.*')]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    UploadSession.objects.filter(pk__in=[session.pk for session in stale]).delete()
+    return len(stale)
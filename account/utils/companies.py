@@ -0,0 +1,33 @@
+from account.models import Company, Platform, Profile, Role
+from ..access_rules.access_rules import ROLE_EXECUTOR, ROLE_NAMES
+from .profile_scope import invalidate_profile_scopes
+
+EXECUTOR_ROLE_NAME = ROLE_NAMES[ROLE_EXECUTOR]
+
+
+def link_profile(profile):
+    """
+    Компания профиля по company_name и, для исполнителя, платформа
+    с кодом, равным названию компании
+    """
+    if profile.company_id is None or profile.company.name != profile.company_name:
+        profile.company, _ = Company.objects.get_or_create(name=profile.company_name)
+
+    role_name = Role.objects.filter(pk=profile.role_id).values_list('name', flat=True).first()
+    if role_name == EXECUTOR_ROLE_NAME:
+        if profile.platform_id is None or profile.platform.platform_code != profile.company_name:
+            profile.platform = Platform.objects.filter(platform_code=profile.company_name).order_by('id').first()
+    else:
+        profile.platform = None
+
+
+def link_platform_executors(platform):
+    """Привязка исполнителей к платформе после создания платформы или смены её кода"""
+    unlinked = platform.executors.exclude(company_name=platform.platform_code)
+    linked = Profile.objects.filter(
+        role__name=EXECUTOR_ROLE_NAME, company_name=platform.platform_code, platform__isnull=True,
+    )
+    user_ids = [*unlinked.values_list('user_id', flat=True), *linked.values_list('user_id', flat=True)]
+    unlinked.update(platform=None)
+    linked.update(platform=platform)
+    invalidate_profile_scopes(user_ids)
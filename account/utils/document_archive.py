@@ -0,0 +1,97 @@
+import os
+
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from account.models import Document, Order
+from account.templatetags.custom_filters import clean_filename
+from .media_store import ENCODING_GZIP, is_compressible, media_store, stored_blob
+from .zip_stream import ZipEntry, stream_zip
+
+DOCUMENT_FOLDERS = {
+    'NDA': 'NDA',
+    'consumer_request': 'Запросы на доступ',
+    'consumer_form': 'Анкеты',
+}
+ORDER_FILE_FOLDERS = (
+    ('contract_file', 'Договоры'),
+    ('invoice_file', 'Счета'),
+    ('GDS_file', 'GDS'),
+    ('multiplan_dicing_plan_file', 'Карты резки'),
+)
+
+
+def order_files(orders, prefix=''):
+    """(имя в архиве, путь в хранилище) для файлов заказов; папка по типу, имя с номером заказа"""
+    for order in orders.only('order_number', *(field for field, _ in ORDER_FILE_FOLDERS)).iterator():
+        for field, folder in ORDER_FILE_FOLDERS:
+            name = getattr(order, field).name
+            if name:
+                yield f'{prefix}{folder}/{order.order_number}_{clean_filename(os.path.basename(name))}', name
+
+
+def document_files(owner_ids, prefix_by_owner=None):
+    documents = Document.objects.filter(owner_id__in=owner_ids, deleted_at__isnull=True) \
+        .exclude(file_path='').only('document_type', 'file_path', 'owner_id').order_by('owner_id', 'id')
+    for document in documents.iterator():
+        prefix = prefix_by_owner[document.owner_id] if prefix_by_owner else ''
+        folder = DOCUMENT_FOLDERS.get(document.document_type, document.document_type)
+        yield f'{prefix}{folder}/{clean_filename(os.path.basename(document.file_path.name))}', document.file_path.name
+
+
+def archive_entries(files, storage=media_store):
+    """
+    ZipEntry для пар (имя в архиве, путь): отсутствующие на диске файлы пропускаются,
+    одинаковые имена получают номер. Уже сжатые форматы (PDF, офисные, архивы) пишутся
+    без сжатия, сохранённые в gzip файлы переносятся в архив без повторного сжатия.
+    """
+    used = set()
+    for arcname, name in files:
+        full_path = storage.path(name)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            continue
+
+        base, extension = os.path.splitext(arcname)
+        number = 1
+        while arcname in used:
+            number += 1
+            arcname = f'{base} ({number}){extension}'
+        used.add(arcname)
+
+        blob = stored_blob(name)
+        compressed = blob is not None and blob.encoding == ENCODING_GZIP
+        yield ZipEntry(
+            arcname=arcname,
+            path=full_path,
+            size=blob.size if compressed else stat.st_size,
+            mtime=stat.st_mtime,
+            compress=is_compressible(name),
+            gzip_path=full_path if compressed else '',
+        )
+
+
+def zip_response(files, filename):
+    """Архив отдаётся по мере чтения файлов: без буфера в памяти и временного файла"""
+    response = StreamingHttpResponse(stream_zip(archive_entries(files)), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+def order_archive_files(order):
+    return order_files(Order.objects.filter(pk=order.pk))
+
+
+def user_archive_files(user_id):
+    yield from document_files([user_id])
+    yield from order_files(Order.objects.filter(creator__user_id=user_id).order_by('id'))
+
+
+def company_archive_files(profiles):
+    """Файлы всех заказчиков компании, по папке на пользователя"""
+    prefixes = {profile.user_id: f'{profile.user.username}/' for profile in profiles}
+    yield from document_files(list(prefixes), prefixes)
+    for profile in profiles:
+        yield from order_files(Order.objects.filter(creator=profile).order_by('id'), prefixes[profile.user_id])
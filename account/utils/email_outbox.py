@@ -0,0 +1,143 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db.models import F
+from django.utils import timezone
+
+from account.models import EmailOutbox
+from .mail_transport import get_pooled_connection, close_pooled_connection
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+# Пауза перед повтором: 1, 2, 4 ... минуты, но не больше 6 часов
+OUTBOX_RETRY_BASE = timedelta(minutes=1)
+OUTBOX_RETRY_MAX = timedelta(hours=6)
+# Письмо, зависшее в статусе «отправляется» дольше этого времени, считается брошенным воркером
+OUTBOX_SENDING_TIMEOUT = timedelta(minutes=15)
+
+
+def enqueue_email(to_email, subject, body, html=False, attachments=()):
+    """Ставит письмо в очередь одной вставкой; отправка — командой send_outbox_emails"""
+    return EmailOutbox.objects.create(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        is_html=html,
+        attachments=list(attachments),
+    )
+
+
+def enqueue_emails(emails):
+    """Пакетная постановка в очередь: emails — словари с аргументами enqueue_email"""
+    return EmailOutbox.objects.bulk_create([
+        EmailOutbox(
+            to_email=email['to_email'],
+            subject=email['subject'],
+            body=email['body'],
+            is_html=email.get('html', False),
+            attachments=list(email.get('attachments', ())),
+        )
+        for email in emails
+    ])
+
+
+def retry_delay(attempts):
+    return min(OUTBOX_RETRY_BASE * 2 ** max(attempts - 1, 0), OUTBOX_RETRY_MAX)
+
+
+def build_message(item, connection=None):
+    message = EmailMessage(
+        subject=item.subject,
+        body=item.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[item.to_email],
+        connection=connection,
+    )
+    if item.is_html:
+        message.content_subtype = 'html'
+    for path in item.attachments:
+        # Недоступное вложение не должно блокировать письмо навсегда
+        if os.path.exists(path):
+            message.attach_file(path)
+    return message
+
+
+def claim_batch(batch_size=None):
+    """
+    Забирает пачку писем, которым пора уходить, переводя их в статус «отправляется».
+    Условный UPDATE по статусу не даёт двум воркерам взять одно письмо.
+    """
+    now = timezone.now()
+    batch_size = batch_size or OUTBOX_BATCH_SIZE
+
+    # Возврат писем, брошенных упавшим воркером
+    EmailOutbox.objects.filter(
+        status=EmailOutbox.Status.SENDING,
+        next_attempt_at__lte=now - OUTBOX_SENDING_TIMEOUT,
+    ).update(status=EmailOutbox.Status.PENDING)
+
+    ids = list(
+        EmailOutbox.objects.filter(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    EmailOutbox.objects.filter(id__in=ids, status=EmailOutbox.Status.PENDING) \
+        .update(status=EmailOutbox.Status.SENDING, next_attempt_at=now)
+
+    return list(
+        EmailOutbox.objects.filter(id__in=ids, status=EmailOutbox.Status.SENDING, next_attempt_at=now)
+        .order_by('id')
+    )
+
+
+def _mark_failed(item, error):
+    item.attempts += 1
+    item.last_error = str(error)[:2000]
+    if item.attempts >= OUTBOX_MAX_ATTEMPTS:
+        item.status = EmailOutbox.Status.FAILED
+    else:
+        item.status = EmailOutbox.Status.PENDING
+        item.next_attempt_at = timezone.now() + retry_delay(item.attempts)
+    item.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_outbox(batch_size=None):
+    """
+    Отправляет одну пачку писем через общее SMTP-соединение потока.
+    Возвращает (отправлено, с ошибкой).
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent_ids = []
+    failed = 0
+    # Сессия переиспользуется между пачками; закрывает её воркер (close_pooled_connection)
+    connection = get_pooled_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # Сервер недоступен — вся пачка уходит на повтор
+        close_pooled_connection()
+        for item in batch:
+            _mark_failed(item, e)
+        return 0, len(batch)
+
+    for item in batch:
+        try:
+            build_message(item, connection).send()
+        except Exception as e:
+            _mark_failed(item, e)
+            failed += 1
+        else:
+            sent_ids.append(item.id)
+
+    EmailOutbox.objects.filter(id__in=sent_ids).update(
+        status=EmailOutbox.Status.SENT,
+        sent_at=timezone.now(),
+        attempts=F('attempts') + 1,
+        last_error='',
+    )
+    return len(sent_ids), failed
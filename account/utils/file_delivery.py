@@ -0,0 +1,300 @@
+import gzip
+import mimetypes
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+from django.utils.module_loading import import_string
+
+from .file_digest import find_file_record
+
+DEFAULT_DOWNLOAD_BACKEND = 'account.utils.file_delivery.DjangoDownloadBackend'
+RANGE_CHUNK_SIZE = 64 * 1024
+# Защита от запросов из тысяч мелких диапазонов
+MAX_RANGES = 20
+
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+@dataclass
+class ServedFile:
+    relative_path: str
+    full_path: str
+    filename: str
+    as_attachment: bool
+    size: int
+    etag: str
+    last_modified: int
+    # Файл на диске сжат: content_encoding — байты отдаются как есть с Content-Encoding,
+    # decompress — клиент не принимает сжатие, Django распаковывает на лету
+    content_encoding: str = ''
+    decompress: bool = False
+
+    @property
+    def content_type(self):
+        content_type, encoding = mimetypes.guess_type(self.filename)
+        return content_type or 'application/octet-stream'
+
+
+def resolve_media_path(relative_path):
+    """Абсолютный путь файла внутри MEDIA_ROOT; выход за его пределы (../) — 404"""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    full_path = os.path.realpath(os.path.join(media_root, relative_path))
+
+    if os.path.commonpath([media_root, full_path]) != media_root or not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+    return full_path
+
+
+def parse_range_header(header, size):
+    """
+    Разбор заголовка Range: список (start, end) включительно, [] — диапазоны невыполнимы,
+    None — заголовок некорректен и должен игнорироваться (отдаётся весь файл).
+    """
+    units, _, ranges_spec = header.partition('=')
+    if units.strip().lower() != 'bytes' or not ranges_spec:
+        return None
+
+    ranges = []
+    for spec in ranges_spec.split(','):
+        match = RANGE_RE.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        else:
+            # «-N» — последние N байт
+            start = max(size - int(last), 0)
+            end = size - 1
+            if int(last) == 0:
+                continue
+        if start < size:
+            ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return _merge_ranges(ranges)
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _if_range_matches(request, served):
+    """If-Range: диапазон отдаётся, только если файл не изменился с момента первой части"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Без сохранённого хэша сильного валидатора нет — отдаётся весь файл
+        return bool(served.etag) and parse_etags(if_range) == [served.etag]
+    date = parse_http_date_safe(if_range)
+    return date is not None and date >= served.last_modified
+
+
+def _open_served(served):
+    return gzip.open(served.full_path, 'rb') if served.decompress else open(served.full_path, 'rb')
+
+
+def _read_range(served, start, end):
+    with _open_served(served) as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _multipart_ranges(served, ranges, boundary):
+    for start, end in ranges:
+        yield (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: {served.content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{served.size}\r\n\r\n'
+        ).encode()
+        yield from _read_range(served, start, end)
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+def _multipart_length(served, ranges, boundary):
+    length = 0
+    for start, end in ranges:
+        length += len((
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: {served.content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{served.size}\r\n\r\n'
+        ).encode()) + end - start + 1
+    return length + len(f'\r\n--{boundary}--\r\n'.encode())
+
+
+class DownloadBackend:
+    """Отдаёт уже проверенный Django файл из MEDIA_ROOT; подкласс решает, кто передаёт байты"""
+
+    def serve(self, request, served):
+        raise NotImplementedError
+
+    def _headers(self, response, served):
+        response['Content-Type'] = served.content_type
+        response['Content-Disposition'] = content_disposition_header(served.as_attachment, served.filename)
+        if served.content_encoding:
+            response['Content-Encoding'] = served.content_encoding
+        return response
+
+
+class DjangoDownloadBackend(DownloadBackend):
+    """Передача файла самим Django — для разработки и тестов; Range и multipart/byteranges"""
+
+    def serve(self, request, served):
+        range_header = request.META.get('HTTP_RANGE')
+        ranges = None
+        if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(request, served):
+            ranges = parse_range_header(range_header, served.size)
+
+        if ranges is None and served.decompress:
+            response = StreamingHttpResponse(_read_range(served, 0, served.size - 1))
+            self._headers(response, served)
+            response['Content-Length'] = served.size
+            return response
+
+        if ranges is None:
+            response = FileResponse(open(served.full_path, 'rb'), as_attachment=served.as_attachment,
+                                    filename=served.filename)
+            self._headers(response, served)
+            return response
+
+        if not ranges:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{served.size}'
+            return response
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            response = StreamingHttpResponse(_read_range(served, start, end), status=206)
+            self._headers(response, served)
+            response['Content-Range'] = f'bytes {start}-{end}/{served.size}'
+            response['Content-Length'] = end - start + 1
+            return response
+
+        boundary = uuid.uuid4().hex
+        response = StreamingHttpResponse(_multipart_ranges(served, ranges, boundary), status=206)
+        self._headers(response, served)
+        response['Content-Type'] = f'multipart/byteranges; boundary={boundary}'
+        response['Content-Length'] = _multipart_length(served, ranges, boundary)
+        return response
+
+
+class NginxAccelBackend(DownloadBackend):
+    """
+    nginx: Django отвечает пустым ответом с X-Accel-Redirect, файл отдаёт internal-location
+    (DOWNLOAD_ACCEL_PREFIX, по умолчанию /protected-media/ с alias на MEDIA_ROOT).
+    Range nginx обрабатывает сам.
+    """
+
+    def serve(self, request, served):
+        prefix = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(served.relative_path.replace(os.sep, '/'))
+        return self._headers(response, served)
+
+
+class ApacheSendfileBackend(DownloadBackend):
+    """
+    Apache mod_xsendfile: в X-Sendfile передаётся абсолютный путь файла, URL-кодированный —
+    заголовки должны быть ASCII, модуль раскодирует путь (XSendFileUnescape On по умолчанию).
+    """
+
+    def serve(self, request, served):
+        response = HttpResponse()
+        response['X-Sendfile'] = quote(served.full_path)
+        return self._headers(response, served)
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_download_backend():
+    return _load_backend(getattr(settings, 'DOWNLOAD_BACKEND', DEFAULT_DOWNLOAD_BACKEND))
+
+
+def accepts_encoding(request, encoding):
+    """Клиент принимает кодирование (Accept-Encoding), q=0 — явный отказ"""
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        token, _, params = item.partition(';')
+        if token.strip().lower() in (encoding, '*'):
+            quality = params.strip().lower().removeprefix('q=').strip()
+            try:
+                return float(quality or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def serve_media_file(request, relative_path, filename=None, as_attachment=True):
+    """
+    Отдаёт файл из MEDIA_ROOT после проверок в view. Передачу байтов выполняет
+    бэкенд из настройки DOWNLOAD_BACKEND, чтобы большие файлы не занимали воркер Django.
+    ETag строится из сохранённого SHA-256 содержимого, повторная загрузка
+    неизменённого файла получает 304 без тела. Пока хэш не посчитан (старый или изменённый файл
+    ждёт digest_media_files), файл отдаётся без ETag: проверка идёт только по Last-Modified.
+    Сжатый в media_store файл отдаётся как есть с Content-Encoding, если клиент его принимает,
+    иначе Django распаковывает его на лету; у двух представлений разные ETag.
+    """
+    full_path = resolve_media_path(relative_path)
+    relative_path = os.path.relpath(full_path, os.path.realpath(settings.MEDIA_ROOT))
+    stat = os.stat(full_path)
+    # Хэш и блоб media_store (сжатие) одним запросом
+    record = find_file_record(relative_path, stat)
+    served = ServedFile(
+        relative_path=relative_path,
+        full_path=full_path,
+        filename=filename or os.path.basename(full_path),
+        as_attachment=as_attachment,
+        size=stat.st_size,
+        etag=f'"{record.sha256}"' if record is not None else '',
+        last_modified=int(stat.st_mtime),
+    )
+
+    blob = record.blob if record is not None else None
+    encoding = blob.encoding if blob is not None else ''
+    if encoding and accepts_encoding(request, encoding):
+        served.content_encoding = encoding
+        served.etag = f'{served.etag[:-1]}-{encoding}"'
+    elif encoding:
+        served.decompress = True
+        served.size = blob.size
+
+    response = get_conditional_response(request, etag=served.etag or None, last_modified=served.last_modified)
+    if response is None:
+        # Распаковку умеет только сам Django, а не nginx/Apache
+        backend = _load_backend(DEFAULT_DOWNLOAD_BACKEND) if served.decompress else get_download_backend()
+        response = backend.serve(request, served)
+
+    if served.etag:
+        response['ETag'] = served.etag
+    response['Last-Modified'] = http_date(served.last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
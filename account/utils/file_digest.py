@@ -0,0 +1,84 @@
+import hashlib
+import os
+
+from django.conf import settings
+
+from account.models import FileDigest
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DIGEST_BATCH_SIZE = 20
+# Хэш ещё не посчитан: запись ждёт фоновой команды digest_media_files
+PENDING_SHA256 = ''
+
+
+def hash_file(full_path):
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_file_record(relative_path, full_path, stat=None):
+    """
+    Запись FileDigest файла вместе с блобом media_store (одним запросом). Файл читается целиком
+    только при первом обращении или после его изменения (сверяются размер и mtime).
+    Для фоновых задач; запрос пользователя использует find_file_record.
+    """
+    stat = stat or os.stat(full_path)
+    record = FileDigest.objects.select_related('blob').filter(path=relative_path).first()
+    if record and record.size == stat.st_size and record.mtime == stat.st_mtime:
+        return record
+
+    sha256 = hash_file(full_path)
+    record, _ = FileDigest.objects.update_or_create(
+        path=relative_path,
+        defaults={'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256},
+    )
+    return record
+
+
+def get_file_digest(relative_path, full_path, stat=None):
+    """Хэш содержимого файла из таблицы FileDigest"""
+    return get_file_record(relative_path, full_path, stat).sha256
+
+
+def find_file_record(relative_path, stat):
+    """
+    Актуальная запись FileDigest с блобом или None; файл в запросе не читается.
+    Файл без записи (старый или изменённый на диске) ставится в очередь digest_media_files.
+    """
+    record = FileDigest.objects.select_related('blob').filter(path=relative_path).first()
+    if record and record.size == stat.st_size and record.mtime == stat.st_mtime:
+        return record if record.sha256 != PENDING_SHA256 else None
+
+    # Изменённый файл уже не совпадает с блобом: связь с ним снимается
+    FileDigest.objects.update_or_create(
+        path=relative_path,
+        defaults={'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': PENDING_SHA256, 'blob': None},
+    )
+    return None
+
+
+def digest_pending_files(batch_size=DIGEST_BATCH_SIZE):
+    """
+    Одна пачка очереди: хэши файлов, отмеченных find_file_record. Запись обновляется условно —
+    только если файл не изменился, пока читался. Возвращает число посчитанных файлов.
+    """
+    done = 0
+    pending = FileDigest.objects.filter(sha256=PENDING_SHA256).order_by('id')[:batch_size]
+    for record in pending:
+        full_path = os.path.join(settings.MEDIA_ROOT, record.path)
+        try:
+            stat = os.stat(full_path)
+            sha256 = hash_file(full_path)
+        except FileNotFoundError:
+            FileDigest.objects.filter(pk=record.pk, sha256=PENDING_SHA256).delete()
+            continue
+        after = os.stat(full_path)
+        if (after.st_size, after.st_mtime) != (stat.st_size, stat.st_mtime):
+            continue
+        done += FileDigest.objects.filter(pk=record.pk, sha256=PENDING_SHA256).update(
+            size=stat.st_size, mtime=stat.st_mtime, sha256=sha256,
+        )
+    return done
@@ -0,0 +1,126 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from account.models import GDSLayoutInfo, Order
+from .file_digest import get_file_digest, get_file_record
+from .gds_preview import PREVIEW_LEVELS, preview_exists, preview_tile_name, render_preview
+from .gds_revisions import add_gds_revision, diff_gds_revision
+from .gdsii import read_gds_metadata
+from .generate_messages import add_gds_preview_message
+
+logger = logging.getLogger(__name__)
+
+GDS_BATCH_SIZE = 5
+# Анализ, зависший дольше этого времени (упал воркер), запускается заново
+GDS_PROCESSING_TIMEOUT = timedelta(hours=2)
+
+
+def schedule_gds_analysis(order):
+    """
+    Ставит GDS_file заказа в очередь анализа, если сводка построена не для этого файла,
+    и запоминает новый файл как ревизию. Вызывается из post_save заказа; сам разбор выполняет воркер analyze_gds_files.
+    """
+    name = order.GDS_file.name if order.GDS_file else ''
+    if not name:
+        GDSLayoutInfo.objects.filter(order_id=order.pk).delete()
+        return
+
+    updated = GDSLayoutInfo.objects.filter(order_id=order.pk).exclude(file_name=name).update(
+        file_name=name, status=GDSLayoutInfo.Status.PENDING, error='', started_at=None,
+        preview_key='', preview_levels=0, preview_error='',
+    )
+    if not updated:
+        _, created = GDSLayoutInfo.objects.get_or_create(order_id=order.pk, defaults={'file_name': name})
+        if not created:
+            return
+    add_gds_revision(order, name)
+
+
+def claim_gds_batch(batch_size=GDS_BATCH_SIZE):
+    """Забирает файлы на анализ условным UPDATE по статусу, чтобы два воркера не разбирали один файл"""
+    now = timezone.now()
+    GDSLayoutInfo.objects.filter(
+        status=GDSLayoutInfo.Status.PROCESSING,
+        started_at__lte=now - GDS_PROCESSING_TIMEOUT,
+    ).update(status=GDSLayoutInfo.Status.PENDING)
+
+    ids = list(
+        GDSLayoutInfo.objects.filter(status=GDSLayoutInfo.Status.PENDING)
+        .order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    GDSLayoutInfo.objects.filter(id__in=ids, status=GDSLayoutInfo.Status.PENDING) \
+        .update(status=GDSLayoutInfo.Status.PROCESSING, started_at=now)
+    return list(GDSLayoutInfo.objects.filter(
+        id__in=ids, status=GDSLayoutInfo.Status.PROCESSING, started_at=now,
+    ).select_related('order'))
+
+
+def analyze_gds(info):
+    """Разбирает файл одной сводки; результат записывается, только если файл заказа не сменился"""
+    storage = Order._meta.get_field('GDS_file').storage
+    current = GDSLayoutInfo.objects.filter(pk=info.pk, file_name=info.file_name,
+                                           status=GDSLayoutInfo.Status.PROCESSING)
+    try:
+        # Сжатый на диске файл распаковывается во временный: разбор читает его через mmap
+        with storage.local_copy(info.file_name) as path:
+            metadata = read_gds_metadata(path)
+            metadata['file_size'] = os.path.getsize(path)
+            metadata.update(build_preview(info, path, storage.path(info.file_name)))
+            if not current.update(status=GDSLayoutInfo.Status.DONE, error='', analyzed_at=timezone.now(),
+                                  **metadata):
+                return False
+            if metadata['preview_levels']:
+                add_gds_preview_message(info.order, metadata['preview_key'])
+            try:
+                diff_gds_revision(info.order, info.file_name, path)
+            except Exception as e:
+                # Сводка уже сохранена; без отличий ревизий обсуждение в чате не блокируется
+                logger.warning('GDS revision diff of %s failed: %s', info.file_name, e)
+    except Exception as e:
+        logger.warning('GDS analysis of %s failed: %s', info.file_name, e)
+        current.update(status=GDSLayoutInfo.Status.FAILED, error=str(e)[:2000], analyzed_at=timezone.now())
+        return False
+    return True
+
+
+def record_tile_digests(key):
+    """Записи FileDigest всех плиток превью: ETag плитки готов до первого запроса"""
+    for level in range(PREVIEW_LEVELS):
+        for x in range(2 ** level):
+            for y in range(2 ** level):
+                name = preview_tile_name(key, level, x, y)
+                get_file_record(name, os.path.join(settings.MEDIA_ROOT, name))
+
+
+def build_preview(info, path, stored_path):
+    """
+    Плитки превью для файла сводки (path — несжатое содержимое, stored_path — файл в хранилище).
+    Ключ — SHA-256 содержимого, поэтому повторная загрузка
+    того же файла (в том числе в другой заказ) использует уже нарисованные плитки.
+    Ошибка отрисовки не отменяет сводку, а записывается в preview_error.
+    Хэши плиток (ETag) считаются здесь же, чтобы view не читал файлы.
+    """
+    try:
+        key = get_file_digest(info.file_name, stored_path)
+        if not preview_exists(key):
+            render_preview(path, key)
+        record_tile_digests(key)
+    except Exception as e:
+        logger.warning('GDS preview of %s failed: %s', info.file_name, e)
+        return {'preview_key': '', 'preview_levels': 0, 'preview_error': str(e)[:2000]}
+    return {'preview_key': key, 'preview_levels': PREVIEW_LEVELS, 'preview_error': ''}
+
+
+def analyze_pending_gds(batch_size=GDS_BATCH_SIZE):
+    """Одна пачка анализа; возвращает (готово, с ошибкой)"""
+    done = failed = 0
+    for info in claim_gds_batch(batch_size):
+        if analyze_gds(info):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
@@ -0,0 +1,308 @@
+import math
+import os
+import tempfile
+from array import array
+
+from django.conf import settings
+from PIL import Image, ImageDraw
+
+from . import gdsii
+
+PREVIEW_DIR = 'gds_previews'
+PREVIEW_TILE_SIZE = 256
+# Уровни 0..PREVIEW_LEVELS-1: на уровне L весь чертёж покрыт 2^L × 2^L плитками
+PREVIEW_LEVELS = getattr(settings, 'GDS_PREVIEW_LEVELS', 4)
+# Предел хранимых координат: после него фигуры не хранятся, а расширяют габарит своего слоя в ячейке
+PREVIEW_MAX_COORDS = getattr(settings, 'GDS_PREVIEW_MAX_COORDS', 20_000_000)
+# Экземпляр ячейки меньше стольких пикселей рисуется прямоугольником без обхода его содержимого
+PREVIEW_DETAIL_PX = 2
+GRID_MAX = 64
+# Глубже иерархия не обходится (защита от циклических ссылок)
+MAX_DEPTH = 64
+
+PALETTE = [
+    (31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+    (140, 86, 75), (227, 119, 194), (127, 127, 127), (188, 189, 34), (23, 190, 207),
+]
+FILL_ALPHA = 110
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def layer_color(layer, datatype, alpha=FILL_ALPHA):
+    return PALETTE[((layer or 0) * 7 + datatype) % len(PALETTE)] + (alpha,)
+
+
+def preview_tile_name(key, level, x, y):
+    return f'{PREVIEW_DIR}/{key}/{level}/{x}_{y}.png'
+
+
+def element_transform(element, dx, dy):
+    """Аффинное преобразование ссылки (a, b, c, d, e, f): x' = a·x + b·y + e, y' = c·x + d·y + f"""
+    cos = math.cos(math.radians(element.angle)) * element.mag
+    sin = math.sin(math.radians(element.angle)) * element.mag
+    r = -1 if element.reflect else 1
+    return cos, -sin * r, sin, cos * r, dx, dy
+
+
+def compose(outer, inner):
+    a1, b1, c1, d1, e1, f1 = outer
+    a2, b2, c2, d2, e2, f2 = inner
+    return (
+        a1 * a2 + b1 * c2, a1 * b2 + b1 * d2,
+        c1 * a2 + d1 * c2, c1 * b2 + d1 * d2,
+        a1 * e2 + b1 * f2 + e1, c1 * e2 + d1 * f2 + f1,
+    )
+
+
+def invert(m):
+    a, b, c, d, e, f = m
+    det = a * d - b * c
+    ia, ib, ic, id_ = d / det, -b / det, -c / det, a / det
+    return ia, ib, ic, id_, -(ia * e + ib * f), -(ic * e + id_ * f)
+
+
+def apply_bbox(m, bbox):
+    a, b, c, d, e, f = m
+    xs, ys = [], []
+    for x, y in ((bbox[0], bbox[1]), (bbox[0], bbox[3]), (bbox[2], bbox[1]), (bbox[2], bbox[3])):
+        xs.append(a * x + b * y + e)
+        ys.append(c * x + d * y + f)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class GridIndex:
+    """Равномерная сетка над габаритами ячейки: запрос по прямоугольнику возвращает только попавшие в него фигуры"""
+
+    def __init__(self, bbox, boxes):
+        self.bbox = bbox
+        count = len(boxes)
+        self.size = max(1, min(GRID_MAX, int(math.sqrt(count / 4)) or 1))
+        self.step_x = max((bbox[2] - bbox[0]) / self.size, 1)
+        self.step_y = max((bbox[3] - bbox[1]) / self.size, 1)
+        self.cells = {}
+        for index, box in enumerate(boxes):
+            for key in self._keys(box):
+                self.cells.setdefault(key, []).append(index)
+
+    def _range(self, low, high, origin, step):
+        first = min(max(int((low - origin) // step), 0), self.size - 1)
+        last = min(max(int((high - origin) // step), 0), self.size - 1)
+        return range(first, last + 1)
+
+    def _keys(self, box):
+        for gx in self._range(box[0], box[2], self.bbox[0], self.step_x):
+            for gy in self._range(box[1], box[3], self.bbox[1], self.step_y):
+                yield gx, gy
+
+    def query(self, box):
+        if not intersects(box, self.bbox):
+            return set()
+        found = set()
+        for key in self._keys(box):
+            found.update(self.cells.get(key, ()))
+        return found
+
+
+class CellGeometry:
+    __slots__ = ('shapes', 'boxes', 'coarse', 'references', 'index', 'color')
+
+    def __init__(self):
+        # (вид, слой, тип данных, ширина пути, координаты)
+        self.shapes = []
+        self.boxes = []
+        # (слой, тип данных) -> габарит фигур, не поместившихся в предел координат
+        self.coarse = {}
+        self.references = []
+        self.index = None
+        self.color = None
+
+    def query(self, bbox, box):
+        if self.index is None:
+            self.index = GridIndex(bbox, self.boxes)
+        return self.index.query(box)
+
+
+class Layout:
+    """Геометрия библиотеки по ячейкам, без развёртки иерархии"""
+
+    def __init__(self, cells, bboxes, top_cells):
+        self.cells = cells
+        self.bboxes = bboxes
+        self.top_cells = top_cells
+        self.bbox = None
+        for name in top_cells:
+            self.bbox = gdsii.union_bbox(self.bbox, bboxes.get(name))
+
+
+def load_layout(path, max_coords=PREVIEW_MAX_COORDS):
+    buffer = gdsii.open_gds(path)
+    cells = {}
+    own_bbox = {}
+    references = {}
+    referenced = set()
+    stored = 0
+    current = None
+    try:
+        for event, value in gdsii.iter_library(buffer):
+            if event == 'element':
+                geometry = cells[current]
+                if value.kind in gdsii.GEOMETRY_KINDS and value.xy:
+                    bbox = value.bbox()
+                    own_bbox[current] = gdsii.union_bbox(own_bbox[current], bbox)
+                    if geometry.color is None:
+                        geometry.color = layer_color(value.layer, value.datatype, alpha=255)
+                    if stored + len(value.xy) > max_coords:
+                        # Предел исчерпан: память дальше не растёт с числом фигур
+                        stored = max_coords
+                        key = (value.layer, value.datatype)
+                        geometry.coarse[key] = gdsii.union_bbox(geometry.coarse.get(key), bbox)
+                        continue
+                    stored += len(value.xy)
+                    geometry.shapes.append((value.kind, value.layer, value.datatype, value.width, value.xy))
+                    geometry.boxes.append(bbox)
+                elif value.kind in ('sref', 'aref') and value.sname and value.xy:
+                    referenced.add(value.sname)
+                    references.setdefault(current, []).append((value.sname, value))
+                    geometry.references.append(value)
+            elif event == 'cell':
+                current = value
+                cells.setdefault(current, CellGeometry())
+                own_bbox.setdefault(current, None)
+    finally:
+        buffer.close()
+
+    for geometry in cells.values():
+        for (layer, datatype), bbox in geometry.coarse.items():
+            xy = array('i', (bbox[0], bbox[1], bbox[2], bbox[1], bbox[2], bbox[3], bbox[0], bbox[3]))
+            geometry.shapes.append(('boundary', layer, datatype, 0, xy))
+            geometry.boxes.append(bbox)
+
+    bboxes = gdsii.resolve_bboxes(own_bbox, references)
+    top_cells = sorted(name for name in cells if name not in referenced)
+    return Layout(cells, bboxes, top_cells)
+
+
+def _visible_range(count, step, low, high, clip_low, clip_high):
+    """Номера экземпляров массива вдоль одной оси, чьи габариты [low + k·step, high + k·step] задевают окно"""
+    if step == 0:
+        return range(count) if low <= clip_high and clip_low <= high else range(0)
+    if step > 0:
+        first, last = math.ceil((clip_low - high) / step), math.floor((clip_high - low) / step)
+    else:
+        first, last = math.ceil((clip_high - low) / step), math.floor((clip_low - high) / step)
+    return range(max(first, 0), min(last, count - 1) + 1)
+
+
+def iter_instances(element, child_bbox=None, clip=None):
+    """
+    Преобразования экземпляров ссылки. Для массива с шагами вдоль осей и заданным окном clip
+    перебираются только экземпляры, попадающие в окно, а не все cols × rows.
+    """
+    x0, y0 = element.xy[0], element.xy[1]
+    if element.kind == 'sref' or not element.colrow or len(element.xy) < 6:
+        yield element_transform(element, x0, y0)
+        return
+    cols, rows = element.colrow
+    col_dx = (element.xy[2] - x0) / max(cols, 1)
+    col_dy = (element.xy[3] - y0) / max(cols, 1)
+    row_dx = (element.xy[4] - x0) / max(rows, 1)
+    row_dy = (element.xy[5] - y0) / max(rows, 1)
+
+    col_range, row_range = range(cols), range(rows)
+    if clip is not None and child_bbox is not None and col_dy == 0 and row_dx == 0:
+        base = apply_bbox(element_transform(element, x0, y0), child_bbox)
+        col_range = _visible_range(cols, col_dx, base[0], base[2], clip[0], clip[2])
+        row_range = _visible_range(rows, row_dy, base[1], base[3], clip[1], clip[3])
+    for i in col_range:
+        for j in row_range:
+            yield element_transform(element, x0 + i * col_dx + j * row_dx, y0 + i * col_dy + j * row_dy)
+
+
+def tile_extent(layout, level, x, y):
+    xmin, ymin, xmax, ymax = layout.bbox
+    side = max(xmax - xmin, ymax - ymin, 1)
+    step = side / 2 ** level
+    # Плитки нумеруются сверху вниз, как на экране
+    top = ymin + side - y * step
+    return xmin + x * step, top - step, xmin + (x + 1) * step, top
+
+
+def render_tile(layout, level, x, y, size=PREVIEW_TILE_SIZE):
+    """
+    Рисует одну плитку: обходит иерархию от верхних ячеек, отсекая экземпляры вне плитки
+    по их габаритам, и берёт из сеточного индекса ячейки только фигуры, попавшие в плитку.
+    """
+    image = Image.new('RGBA', (size, size), (255, 255, 255, 255))
+    if layout.bbox is None:
+        return image
+    draw = ImageDraw.Draw(image, 'RGBA')
+    tile = tile_extent(layout, level, x, y)
+    scale = size / (tile[2] - tile[0])
+
+    def to_px(px, py):
+        return (px - tile[0]) * scale, (tile[3] - py) * scale
+
+    stack = [(name, IDENTITY, 0) for name in layout.top_cells]
+    while stack:
+        name, matrix, depth = stack.pop()
+        cell = layout.cells.get(name)
+        cell_bbox = layout.bboxes.get(name)
+        if cell is None or cell_bbox is None:
+            continue
+        world = apply_bbox(matrix, cell_bbox)
+        if not intersects(world, tile):
+            continue
+        if (world[2] - world[0]) * scale < PREVIEW_DETAIL_PX and (world[3] - world[1]) * scale < PREVIEW_DETAIL_PX:
+            px0, py0 = to_px(world[0], world[3])
+            draw.rectangle((px0, py0, px0 + 1, py0 + 1), fill=cell.color or layer_color(0, 0, alpha=255))
+            continue
+
+        a, b, c, d, e, f = matrix
+        local_tile = apply_bbox(invert(matrix), tile)
+        for index in cell.query(cell_bbox, local_tile):
+            kind, layer, datatype, width, xy = cell.shapes[index]
+            points = [to_px(a * xy[i] + b * xy[i + 1] + e, c * xy[i] + d * xy[i + 1] + f)
+                      for i in range(0, len(xy) - 1, 2)]
+            color = layer_color(layer, datatype)
+            if kind == 'path':
+                line_width = max(1, int(abs(width) * math.hypot(a, c) * scale))
+                draw.line(points, fill=color[:3] + (255,), width=line_width)
+            elif len(points) >= 3:
+                draw.polygon(points, fill=color, outline=color[:3] + (255,))
+            else:
+                draw.point(points, fill=color[:3] + (255,))
+
+        if depth >= MAX_DEPTH:
+            continue
+        for element in cell.references:
+            for transform in iter_instances(element, layout.bboxes.get(element.sname), local_tile):
+                stack.append((element.sname, compose(matrix, transform), depth + 1))
+    return image
+
+
+def render_preview(path, key, levels=PREVIEW_LEVELS, media_root=None):
+    """Рисует все плитки пирамиды в MEDIA_ROOT/gds_previews/<key>/; возвращает число уровней"""
+    media_root = media_root or settings.MEDIA_ROOT
+    layout = load_layout(path)
+    for level in range(levels):
+        for x in range(2 ** level):
+            for y in range(2 ** level):
+                target = os.path.join(media_root, preview_tile_name(key, level, x, y))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.png')
+                with os.fdopen(fd, 'wb') as f:
+                    render_tile(layout, level, x, y).save(f, 'PNG', optimize=True)
+                os.replace(tmp_path, target)
+    return levels
+
+
+def preview_exists(key, levels=PREVIEW_LEVELS, media_root=None):
+    """Плитки с тем же содержимым уже нарисованы (тот же файл загружен в другой заказ)"""
+    media_root = media_root or settings.MEDIA_ROOT
+    last = levels - 1
+    side = 2 ** last - 1
+    return os.path.exists(os.path.join(media_root, preview_tile_name(key, last, side, side)))
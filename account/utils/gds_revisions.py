@@ -0,0 +1,70 @@
+from collections import Counter
+
+from account.models import GDSRevision
+from .gdsii import read_cell_signatures
+from .generate_messages import add_gds_diff_message
+
+
+def add_gds_revision(order, name):
+    """Запоминает загруженный GDS_file как новую ревизию, если последняя ревизия — другой файл"""
+    last = GDSRevision.objects.filter(order_id=order.pk).order_by('-number').first()
+    if last and last.file.name == name:
+        return last
+    number = (last.number if last else 0) + 1
+    return GDSRevision.objects.create(order_id=order.pk, number=number, file=name)
+
+
+def layer_sort_key(key):
+    layer, _, datatype = key.partition('/')
+    return int(layer) if layer.lstrip('-').isdigit() else -1, int(datatype or 0)
+
+
+def diff_cells(old, new):
+    """
+    Структурные отличия двух ревизий за один проход по ячейкам: ячейки с совпавшим хэшем
+    пропускаются, для остальных считается изменение числа фигур по слоям.
+    """
+    added = sorted(new.keys() - old.keys())
+    removed = sorted(old.keys() - new.keys())
+    modified = []
+    layers = Counter()
+    for name, (digest, counts) in new.items():
+        previous = old.get(name)
+        if previous is None:
+            layers.update(counts)
+        elif previous[0] != digest:
+            modified.append(name)
+            layers.update(counts)
+            layers.subtract(previous[1])
+    for name in removed:
+        layers.subtract(old[name][1])
+
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': sorted(modified),
+        'layers': {key: layers[key] for key in sorted(layers, key=layer_sort_key) if layers[key]},
+    }
+
+
+def diff_gds_revision(order, file_name, path):
+    """
+    Снимает отпечатки ячеек файла ревизии и сравнивает их с предыдущей разобранной ревизией;
+    отличия записываются в ревизию и публикуются в чате заказа. Возвращает ревизию.
+    """
+    revision = GDSRevision.objects.filter(order_id=order.pk, file=file_name).order_by('-number').first() \
+        or add_gds_revision(order, file_name)
+    if revision.cells is None:
+        revision.cells = read_cell_signatures(path)
+        GDSRevision.objects.filter(pk=revision.pk).update(cells=revision.cells)
+
+    previous = GDSRevision.objects.filter(order_id=order.pk, number__lt=revision.number, cells__isnull=False) \
+        .order_by('-number').first()
+    if previous is None or revision.diff is not None:
+        return revision
+
+    revision.diff = dict(diff_cells(previous.cells, revision.cells), base=previous.number)
+    # Условное обновление: сообщение публикует только тот воркер, который записал отличия
+    if GDSRevision.objects.filter(pk=revision.pk, diff__isnull=True).update(diff=revision.diff):
+        add_gds_diff_message(order, previous.number, revision.number, revision.diff)
+    return revision
@@ -0,0 +1,364 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+
+# Типы записей GDSII (второй байт заголовка записи)
+HEADER = 0x00
+BGNLIB = 0x01
+LIBNAME = 0x02
+UNITS = 0x03
+ENDLIB = 0x04
+BGNSTR = 0x05
+STRNAME = 0x06
+ENDSTR = 0x07
+BOUNDARY = 0x08
+PATH = 0x09
+SREF = 0x0A
+AREF = 0x0B
+TEXT = 0x0C
+LAYER = 0x0D
+DATATYPE = 0x0E
+WIDTH = 0x0F
+XY = 0x10
+ENDEL = 0x11
+SNAME = 0x12
+COLROW = 0x13
+NODE = 0x15
+TEXTTYPE = 0x16
+STRANS = 0x1A
+MAG = 0x1B
+ANGLE = 0x1C
+BOX = 0x2D
+BOXTYPE = 0x2E
+
+ELEMENT_KINDS = {
+    BOUNDARY: 'boundary',
+    PATH: 'path',
+    SREF: 'sref',
+    AREF: 'aref',
+    TEXT: 'text',
+    NODE: 'node',
+    BOX: 'box',
+}
+GEOMETRY_KINDS = ('boundary', 'path', 'box')
+
+
+class GDSFormatError(ValueError):
+    """Файл не является корректным потоком GDSII"""
+
+
+def open_gds(path):
+    """
+    Отображает файл в память только для чтения. Страницы подгружаются ядром по мере чтения
+    и вытесняются без записи на диск, поэтому разбор многогигабайтного файла не требует
+    соответствующего объёма памяти.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise GDSFormatError('Пустой файл')
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(buffer, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        buffer.madvise(mmap.MADV_SEQUENTIAL)
+    return buffer
+
+
+def iter_records(buffer):
+    """Записи потока: (тип записи, данные без заголовка); в памяти одновременно только одна запись"""
+    size = len(buffer)
+    offset = 0
+    while offset + 4 <= size:
+        length = (buffer[offset] << 8) | buffer[offset + 1]
+        rtype = buffer[offset + 2]
+        if length == 0:
+            # Хвост файла, дополненный нулями до размера блока ленты
+            return
+        if length < 4 or offset + length > size:
+            raise GDSFormatError(f'Повреждённая запись по смещению {offset}')
+        yield rtype, buffer[offset + 4:offset + length]
+        offset += length
+        if rtype == ENDLIB:
+            return
+
+
+def read_int16(data):
+    values = array('h')
+    values.frombytes(data)
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+
+def read_int32(data):
+    values = array('i')
+    values.frombytes(data)
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+
+def read_real8(data):
+    """8-байтное вещественное GDSII: знак, 7 бит экспоненты по основанию 16 (смещение 64), 56 бит мантиссы"""
+    values = []
+    for i in range(0, len(data), 8):
+        raw = int.from_bytes(data[i:i + 8], 'big')
+        sign = -1 if raw >> 63 else 1
+        exponent = (raw >> 56) & 0x7F
+        mantissa = raw & 0x00FFFFFFFFFFFFFF
+        values.append(sign * mantissa / (1 << 56) * 16.0 ** (exponent - 64))
+    return values
+
+
+def read_string(data):
+    return bytes(data).rstrip(b'\0').decode('ascii', errors='replace')
+
+
+class Element:
+    """Элемент структуры; xy — плоский массив координат x0, y0, x1, y1 ... в единицах БД"""
+    __slots__ = ('kind', 'layer', 'datatype', 'xy', 'width', 'sname', 'reflect', 'mag', 'angle', 'colrow',
+                 'text')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.layer = None
+        self.datatype = 0
+        self.xy = None
+        self.width = 0
+        self.sname = None
+        self.reflect = False
+        self.mag = 1.0
+        self.angle = 0.0
+        self.colrow = None
+        self.text = None
+
+    def bbox(self):
+        if not self.xy:
+            return None
+        xs, ys = self.xy[0::2], self.xy[1::2]
+        # Толщина пути выступает за осевую линию на половину ширины
+        pad = abs(self.width) // 2 if self.kind == 'path' else 0
+        return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+
+
+def iter_library(buffer):
+    """
+    Потоковый разбор библиотеки. События:
+    ('library', имя), ('units', (в пользовательских единицах, в метрах)),
+    ('cell', имя), ('element', Element), ('endcell', имя).
+    """
+    cell = None
+    element = None
+    for rtype, data in iter_records(buffer):
+        if rtype == LIBNAME:
+            yield 'library', read_string(data)
+        elif rtype == UNITS:
+            yield 'units', tuple(read_real8(data))
+        elif rtype == STRNAME:
+            cell = read_string(data)
+            yield 'cell', cell
+        elif rtype == ENDSTR:
+            yield 'endcell', cell
+            cell = None
+        elif rtype in ELEMENT_KINDS:
+            if cell is None:
+                raise GDSFormatError('Элемент вне структуры')
+            element = Element(ELEMENT_KINDS[rtype])
+        elif element is None:
+            continue
+        elif rtype == ENDEL:
+            yield 'element', element
+            element = None
+        elif rtype == LAYER:
+            element.layer = read_int16(data)[0]
+        elif rtype in (DATATYPE, TEXTTYPE, BOXTYPE):
+            element.datatype = read_int16(data)[0]
+        elif rtype == XY:
+            element.xy = read_int32(data)
+        elif rtype == WIDTH:
+            element.width = read_int32(data)[0]
+        elif rtype == SNAME:
+            element.sname = read_string(data)
+        elif rtype == STRANS:
+            element.reflect = bool(data[0] & 0x80)
+        elif rtype == MAG:
+            element.mag = read_real8(data)[0]
+        elif rtype == ANGLE:
+            element.angle = read_real8(data)[0]
+        elif rtype == COLROW:
+            element.colrow = tuple(read_int16(data))
+
+
+def reference_offsets(element):
+    """Смещения экземпляров ссылки; для AREF — только угловые, их достаточно для габаритов"""
+    x0, y0 = element.xy[0], element.xy[1]
+    if element.kind == 'sref' or not element.colrow or len(element.xy) < 6:
+        return [(x0, y0)]
+    cols, rows = element.colrow
+    col_dx = (element.xy[2] - x0) / max(cols, 1)
+    col_dy = (element.xy[3] - y0) / max(cols, 1)
+    row_dx = (element.xy[4] - x0) / max(rows, 1)
+    row_dy = (element.xy[5] - y0) / max(rows, 1)
+    return [
+        (x0 + i * col_dx + j * row_dx, y0 + i * col_dy + j * row_dy)
+        for i in {0, cols - 1} for j in {0, rows - 1}
+    ]
+
+
+def transform_bbox(bbox, element):
+    """Габариты ячейки после отражения, масштаба, поворота и переноса ссылки"""
+    xmin, ymin, xmax, ymax = bbox
+    cos = math.cos(math.radians(element.angle)) * element.mag
+    sin = math.sin(math.radians(element.angle)) * element.mag
+    points = []
+    for x, y in ((xmin, ymin), (xmin, ymax), (xmax, ymin), (xmax, ymax)):
+        if element.reflect:
+            y = -y
+        points.append((x * cos - y * sin, x * sin + y * cos))
+    xs = [x + dx for dx, _ in reference_offsets(element) for x, _ in points]
+    ys = [y + dy for _, dy in reference_offsets(element) for _, y in points]
+    return math.floor(min(xs)), math.floor(min(ys)), math.ceil(max(xs)), math.ceil(max(ys))
+
+
+def union_bbox(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def resolve_bboxes(own_bbox, references):
+    """Габариты ячеек с учётом иерархии; обход без рекурсии Python, циклические ссылки пропускаются"""
+    resolved = {}
+    for root in own_bbox:
+        if root in resolved:
+            continue
+        stack = [(root, False)]
+        visiting = set()
+        while stack:
+            name, children_done = stack.pop()
+            if name in resolved:
+                continue
+            if not children_done:
+                visiting.add(name)
+                stack.append((name, True))
+                for child, _ in references.get(name, ()):
+                    if child in own_bbox and child not in resolved and child not in visiting:
+                        stack.append((child, False))
+                continue
+            visiting.discard(name)
+            bbox = own_bbox[name]
+            for child, element in references.get(name, ()):
+                child_bbox = resolved.get(child)
+                if child_bbox is not None:
+                    bbox = union_bbox(bbox, transform_bbox(child_bbox, element))
+            resolved[name] = bbox
+    return resolved
+
+
+def read_gds_metadata(path):
+    """
+    Сводка по GDSII-файлу за один последовательный проход: имя библиотеки, единицы,
+    верхние ячейки, число ячеек и элементов, слои/типы данных и габариты.
+    В памяти держатся только сводки по ячейкам и ссылки между ними, а не геометрия.
+    """
+    buffer = open_gds(path)
+    try:
+        library_name = ''
+        units = (None, None)
+        counts = Counter()
+        layers = Counter()
+        own_bbox = {}
+        references = {}
+        referenced = set()
+        current = None
+
+        for event, value in iter_library(buffer):
+            if event == 'element':
+                counts[value.kind] += 1
+                if value.kind in GEOMETRY_KINDS:
+                    layers[(value.layer, value.datatype)] += 1
+                    own_bbox[current] = union_bbox(own_bbox[current], value.bbox())
+                elif value.kind in ('sref', 'aref') and value.sname and value.xy:
+                    referenced.add(value.sname)
+                    references.setdefault(current, []).append((value.sname, value))
+            elif event == 'cell':
+                current = value
+                own_bbox.setdefault(current, None)
+            elif event == 'library':
+                library_name = value
+            elif event == 'units':
+                units = value
+    finally:
+        buffer.close()
+
+    if not own_bbox and not library_name:
+        raise GDSFormatError('В файле нет библиотеки GDSII')
+
+    top_cells = sorted(name for name in own_bbox if name not in referenced)
+    bboxes = resolve_bboxes(own_bbox, references)
+    bbox = None
+    for name in top_cells:
+        bbox = union_bbox(bbox, bboxes.get(name))
+
+    return {
+        'library_name': library_name,
+        'user_unit': units[0],
+        'db_unit_m': units[1],
+        'top_cells': top_cells,
+        'cell_count': len(own_bbox),
+        'polygon_count': counts['boundary'] + counts['box'],
+        'path_count': counts['path'],
+        'text_count': counts['text'],
+        'reference_count': counts['sref'] + counts['aref'],
+        'layers': [
+            {'layer': layer, 'datatype': datatype, 'count': count}
+            for (layer, datatype), count in sorted(layers.items(), key=lambda item: (item[0][0] or 0, item[0][1]))
+        ],
+        'bbox': list(bbox) if bbox else None,
+    }
+
+
+def read_cell_signatures(path):
+    """
+    Отпечатки ячеек за один последовательный проход по записям, без разбора геометрии:
+    BLAKE2 от байтов записей ячейки и число фигур по слоям/типам данных.
+    Дата изменения из BGNSTR в хэш не входит, поэтому пересохранение без правок ячейку не меняет.
+    Ссылки входят в хэш по имени: правка дочерней ячейки родителя измененным не делает.
+    """
+    buffer = open_gds(path)
+    cells = {}
+    try:
+        name = hasher = layers = kind = None
+        layer, datatype = None, 0
+        for rtype, data in iter_records(buffer):
+            if rtype == BGNSTR:
+                name, hasher, layers = None, hashlib.blake2b(digest_size=16), Counter()
+                continue
+            if hasher is None:
+                continue
+            if rtype == ENDSTR:
+                cells[name] = [hasher.hexdigest(), dict(layers)]
+                hasher = None
+                continue
+            hasher.update(struct.pack('>HB', len(data), rtype))
+            hasher.update(data)
+            if rtype == STRNAME:
+                name = read_string(data)
+            elif rtype in ELEMENT_KINDS:
+                kind, layer, datatype = ELEMENT_KINDS[rtype], None, 0
+            elif rtype == LAYER:
+                layer = read_int16(data)[0]
+            elif rtype in (DATATYPE, BOXTYPE):
+                datatype = read_int16(data)[0]
+            elif rtype == ENDEL:
+                if kind in GEOMETRY_KINDS:
+                    layers[f'{layer}/{datatype}'] += 1
+                kind = None
+    finally:
+        buffer.close()
+    return cells
@@ -1,4 +1,8 @@
+from django.urls import reverse
+from django.utils.html import escape
+
 from ..models import Topic, Message, File, Order
+from .unread_counters import register_messages
 
 def add_file_message(order, field_name, user):
     file_field = getattr(order, field_name, None)
@@ -14,41 +18,101 @@ def add_file_message(order, field_name, user):
     
     display_name = file_display_names.get(field_name, field_name)
 
+    message = post_order_message(order, user, f'📎 Загружен {display_name}')
+    if message:
+        File.objects.create(message=message, file=file_field)
+
+
+def post_order_message(order, user, text):
+    """Сообщение в чат заказа; если чата ещё нет, ничего не публикуется"""
     topic = Topic.objects.filter(related_order=order).first()
     if not topic:
-        return
+        return None
+    return Message.objects.create(topic=topic, user=user, text=text)
 
-    message_text = f'📎 Загружен {display_name}'
-    message = Message.objects.create(
-        topic=topic,
-        user=user,
-        text=message_text
+
+def add_gds_preview_message(order, key):
+    """Сообщение в чат заказа с обзорной плиткой превью GDS; плитка отдаётся с проверкой прав"""
+    tile_url = reverse('gds_preview_tile', args=[order.pk, key, 0, 0, 0])
+    return post_order_message(
+        order, order.creator,
+        f'🖼 Превью GDS файла<br><img src="{tile_url}" width="256" height="256" alt="Превью GDS">',
     )
 
-    File.objects.create(message=message, file=file_field)
 
+GDS_DIFF_MAX_CELLS = 20
+
+
+def add_gds_diff_message(order, old_number, new_number, diff):
+    """Сводка отличий ревизий GDS в чат заказа; имена ячеек экранируются — текст выводится как HTML"""
+    def cell_list(title, names):
+        shown = ', '.join(escape(name) for name in names[:GDS_DIFF_MAX_CELLS])
+        if len(names) > GDS_DIFF_MAX_CELLS:
+            shown += f' и ещё {len(names) - GDS_DIFF_MAX_CELLS}'
+        return f'<br>{title} ({len(names)}): {shown}' if names else ''
+
+    text = f'🔀 Изменения GDS: ревизия {old_number} → {new_number}'
+    if not (diff['added'] or diff['removed'] or diff['modified']):
+        text += '<br>Структура ячеек не изменилась'
+    text += cell_list('Добавлены ячейки', diff['added'])
+    text += cell_list('Удалены ячейки', diff['removed'])
+    text += cell_list('Изменены ячейки', diff['modified'])
+    if diff['layers']:
+        text += '<br>Фигур по слоям: ' + ', '.join(
+            f'{escape(layer)}: {count:+d}' for layer, count in diff['layers'].items()
+        )
+    return post_order_message(order, order.creator, text)
 
-def create_status_notification(order, old_status, new_status, user):
+
+def create_status_notification(order, old_status, new_status, user, comment=None):
     if old_status == new_status:
         return None
     
     topic, created = Topic.objects.get_or_create(
         related_order=order,
         defaults={
-            'title': f"Чат по заказу #{order.order_number}",
+            'name': f"Чат по заказу #{order.order_number}",
         }
     )
     
-    status_choices = dict(Order.OrderStatus.choices)
-    old_status_name = status_choices.get(old_status, old_status)
-    new_status_name = status_choices.get(new_status, new_status)
-    
-    message_text = f"Статус заказа изменен на: {new_status_name}"
-    
     message = Message.objects.create(
         topic=topic,
         user=user,
-        text=message_text
+        text=status_message_text(old_status, new_status, comment)
     )
     
-    return message
\ No newline at end of file
+    return message
+
+
+def status_message_text(old_status, new_status, comment=None):
+    """Текст сообщения о смене статуса; выводится как HTML, поэтому комментарий пользователя экранируется"""
+    status_choices = dict(Order.OrderStatus.choices)
+    old_status_name = status_choices.get(old_status, old_status)
+    new_status_name = status_choices.get(new_status, new_status)
+    
+    message_text = f"Статус заказа изменен: {old_status_name} → {new_status_name}"
+    if comment:
+        message_text += f"<br>Комментарий: {escape(comment)}"
+    return message_text
+
+
+def create_status_notifications(orders, old_status, new_status, user, comment=None):
+    """Сообщения о смене статуса для группы заказов: темы и сообщения создаются пачками"""
+    topics = {}
+    for topic in Topic.objects.filter(related_order__in=orders).order_by('id'):
+        topics.setdefault(topic.related_order_id, topic)
+
+    missing = [
+        Topic(related_order=order, name=f"Чат по заказу #{order.order_number}")
+        for order in orders if order.id not in topics
+    ]
+    for topic in Topic.objects.bulk_create(missing):
+        topics[topic.related_order_id] = topic
+
+    text = status_message_text(old_status, new_status, comment)
+    messages = Message.objects.bulk_create(
+        [Message(topic=topics[order.id], user=user, text=text) for order in orders]
+    )
+    # bulk_create не отправляет post_save, счётчики непрочитанных обновляем явно
+    register_messages(messages)
+    return messages
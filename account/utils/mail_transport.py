@@ -0,0 +1,127 @@
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.smtp import EmailBackend
+
+# Коды, с которыми сервер закрывает сессию (421 — сервис недоступен / слишком долгий простой)
+RECONNECT_CODES = (421,)
+
+
+class TokenBucket:
+    """
+    Ограничение скорости отправки: не больше rate писем в секунду в среднем,
+    всплеск до capacity писем подряд. Вместо фиксированных пауз ждёт ровно
+    столько, сколько нужно для появления следующего токена.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Забирает токен, при необходимости ожидая; возвращает время ожидания в секундах"""
+        if self.rate <= 0:
+            return 0.0
+        # Токен резервируется под блокировкой, ожидание — без неё: другие потоки
+        # не стоят в очереди за спящим, а встают за ним по своему резерву
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay:
+            self.sleep(delay)
+        return delay
+
+
+_bucket_lock = threading.Lock()
+_buckets = {}
+
+
+def get_send_bucket():
+    """Общий на процесс token bucket: лимит провайдера действует на все соединения"""
+    rate = getattr(settings, 'EMAIL_SEND_RATE', 0)
+    burst = getattr(settings, 'EMAIL_SEND_BURST', 1)
+    with _bucket_lock:
+        if (rate, burst) not in _buckets:
+            _buckets[(rate, burst)] = TokenBucket(rate, burst)
+        return _buckets[(rate, burst)]
+
+
+class PooledSMTPBackend(EmailBackend):
+    """
+    SMTP-бэкенд для массовой отправки: одна авторизованная сессия на все письма,
+    скорость ограничивается token bucket (EMAIL_SEND_RATE, EMAIL_SEND_BURST),
+    при обрыве соединения сервером письмо переотправляется через новую сессию.
+    """
+
+    def __init__(self, *args, bucket=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bucket = bucket or get_send_bucket()
+        self.reconnects = 0
+
+    def _reconnect(self):
+        self.reconnects += 1
+        try:
+            self.close()
+        except Exception:
+            self.connection = None
+        self.open()
+
+    def _send(self, email_message):
+        self.bucket.acquire()
+        try:
+            return super()._send(email_message)
+        except smtplib.SMTPServerDisconnected:
+            pass
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code not in RECONNECT_CODES:
+                raise
+        # Сервер закрыл простаивающую или перегруженную сессию — одна повторная попытка
+        self._reconnect()
+        return super()._send(email_message)
+
+
+_local = threading.local()
+
+
+def outbox_backend():
+    """Бэкенд воркера очереди: лимит скорости действует только на него, а не на письма из запросов"""
+    return getattr(settings, 'EMAIL_OUTBOX_BACKEND', 'account.utils.mail_transport.PooledSMTPBackend')
+
+
+def _connection_key():
+    return (outbox_backend(), settings.EMAIL_HOST, settings.EMAIL_PORT, settings.EMAIL_HOST_USER)
+
+
+def get_pooled_connection():
+    """Соединение текущего потока, которое живёт между пачками писем воркера"""
+    key = _connection_key()
+    if getattr(_local, 'key', None) != key:
+        close_pooled_connection()
+        _local.connection = get_connection(backend=outbox_backend(), fail_silently=False)
+        _local.key = key
+    return _local.connection
+
+
+def close_pooled_connection():
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    _local.key = None
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,344 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+# Файловые поля, содержимое которых хранится один раз на уникальный SHA-256.
+# Строки таблиц ссылаются на блоб через жёсткую ссылку с обычным путём из upload_to,
+# поэтому url, protected_download и X-Accel-Redirect работают без изменений.
+MEDIA_STORE_FIELDS = {
+    'account.Order': ('GDS_file', 'contract_file', 'invoice_file', 'multiplan_dicing_plan_file'),
+    'account.File': ('file',),
+    'account.Document': ('file_path',),
+    'account.TechnicalProcess': ('PDK_file',),
+    'account.PDKHelpFileModel': ('file',),
+    'account.GDSRevision': ('file',),
+}
+
+BLOB_DIR = '.blobs'
+# Блоб без ссылок удаляется не сразу: параллельная загрузка того же содержимого
+# могла уже создать жёсткую ссылку, но ещё не сохранить строку
+BLOB_GC_GRACE = timedelta(hours=1)
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+# Новые блобы с такими расширениями хранятся сжатыми (GDSII и текстовые форматы сжимаются в разы);
+# PDF, архивы и офисные документы уже сжаты
+COMPRESSIBLE_EXTENSIONS = getattr(settings, 'MEDIA_COMPRESSIBLE_EXTENSIONS', (
+    '.gds', '.gds2', '.gdsii', '.cif', '.lef', '.def', '.v', '.sp', '.cir', '.txt', '.csv',
+))
+COMPRESS_LEVEL = getattr(settings, 'MEDIA_COMPRESS_LEVEL', 6)
+# Сжатый вариант сохраняется, только если он меньше исходного хотя бы на эту долю
+COMPRESS_MIN_SAVING = 0.1
+ENCODING_GZIP = 'gzip'
+
+
+def blob_name(sha256):
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище с дедупликацией: при сохранении файл хэшируется на лету, содержимое
+    кладётся в .blobs/<sha256> один раз, а под именем файла создаётся жёсткая ссылка на блоб.
+    Учёт ссылок — MediaBlob.ref_count (см. update_media_refs), удаление — collect_garbage.
+    Сжимаемые файлы хранятся в gzip (MediaBlob.encoding): open() и size() отдают исходное содержимое,
+    а коду, которому нужен путь к файлу, служит local_copy().
+    """
+
+    def _save(self, name, content):
+        blob_root = self.path(BLOB_DIR)
+        os.makedirs(blob_root, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=blob_root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(content, 'seek') and content.seekable():
+                    content.seek(0)
+                for chunk in content.chunks(WRITE_CHUNK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+            return self.store_file(name, tmp_path, hasher.hexdigest(), size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store_file(self, name, source_path, sha256, size=None):
+        """
+        Помещает в хранилище файл с уже посчитанным хэшем (например, собранный по частям).
+        source_path становится блобом или удаляется, если такое содержимое уже есть.
+        Возвращает имя, под которым файл доступен.
+        """
+        from account.models import FileDigest, MediaBlob
+
+        if size is None:
+            size = os.path.getsize(source_path)
+        blob, created = MediaBlob.objects.get_or_create(sha256=sha256, defaults={'size': size})
+        MediaBlob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+
+        blob_path = self.path(blob_name(sha256))
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Сжимается только новое содержимое: у дубликата блоб уже есть
+        compressed = compress_file(source_path, os.path.dirname(blob_path)) \
+            if created and is_compressible(name) else None
+        try:
+            os.link(compressed or source_path, blob_path)
+            if compressed:
+                MediaBlob.objects.filter(pk=blob.pk).update(encoding=ENCODING_GZIP,
+                                                            stored_size=os.path.getsize(blob_path))
+        except FileExistsError:
+            pass
+        finally:
+            if compressed:
+                os.remove(compressed)
+        os.remove(source_path)
+
+        name = self._link_name(name, blob_path)
+        stat = os.stat(self.path(name))
+        FileDigest.objects.update_or_create(
+            path=name,
+            defaults={'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256, 'blob': blob},
+        )
+        return name
+
+    def _link_name(self, name, blob_path):
+        while True:
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(blob_path, full_path)
+                return name
+            except FileExistsError:
+                # Имя заняли параллельно — как FileSystemStorage, берём следующее свободное
+                name = self.get_available_name(name)
+
+    def _open(self, name, mode='rb'):
+        if not any(flag in mode for flag in 'wa+') and stored_encoding(name) == ENCODING_GZIP:
+            return File(gzip.open(self.path(name), 'rb'), name)
+        return super()._open(name, mode)
+
+    def size(self, name):
+        blob = stored_blob(name)
+        if blob is not None and blob.encoding:
+            return blob.size
+        return super().size(name)
+
+    @contextmanager
+    def local_copy(self, name):
+        """
+        Путь к файлу с исходным содержимым для кода, который читает файл сам (mmap, сторонние
+        библиотеки). Сжатый файл распаковывается во временный, который удаляется после выхода.
+        """
+        if stored_encoding(name) != ENCODING_GZIP:
+            yield self.path(name)
+            return
+
+        tmp_dir = self.path(BLOB_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.part' + os.path.splitext(name)[1])
+        try:
+            with os.fdopen(fd, 'wb') as dst, gzip.open(self.path(name), 'rb') as src:
+                shutil.copyfileobj(src, dst, WRITE_CHUNK_SIZE)
+            yield tmp_path
+        finally:
+            os.remove(tmp_path)
+
+    def delete(self, name):
+        # Тот же путь может быть у нескольких строк (File копирует путь из заказа),
+        # поэтому файл удаляет collect_garbage, когда на содержимое не остаётся ссылок
+        pass
+
+
+media_store = ContentAddressedStorage()
+
+
+def is_compressible(name):
+    return os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compress_file(source_path, directory):
+    """gzip-копия файла во временном файле в directory; None, если сжатие не окупается"""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.gz.part')
+    try:
+        with open(source_path, 'rb') as src, os.fdopen(fd, 'wb') as raw, \
+                gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=COMPRESS_LEVEL, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, WRITE_CHUNK_SIZE)
+        if os.path.getsize(tmp_path) > os.path.getsize(source_path) * (1 - COMPRESS_MIN_SAVING):
+            os.remove(tmp_path)
+            return None
+        return tmp_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def stored_blob(name):
+    """Блоб, на который указывает путь хранилища, или None для файлов вне media_store"""
+    from account.models import MediaBlob
+
+    return MediaBlob.objects.filter(paths__path=name).first()
+
+
+def stored_encoding(name):
+    blob = stored_blob(name)
+    return blob.encoding if blob is not None else ''
+
+
+def compress_blob(blob, storage=media_store):
+    """
+    Сжимает уже хранящийся блоб: файл блоба и все пути-ссылки атомарно заменяются
+    жёсткими ссылками на сжатый файл. Возвращает True, если блоб сжат.
+    """
+    from account.models import FileDigest, MediaBlob
+
+    blob_path = storage.path(blob_name(blob.sha256))
+    if blob.encoding or not os.path.isfile(blob_path):
+        return False
+    compressed = compress_file(blob_path, os.path.dirname(blob_path))
+    if compressed is None:
+        return False
+
+    paths = list(FileDigest.objects.filter(blob=blob).values_list('path', flat=True))
+    try:
+        for full_path in [blob_path] + [storage.path(name) for name in paths]:
+            if not os.path.isfile(full_path):
+                continue
+            tmp_path = full_path + '.gz-link'
+            os.link(compressed, tmp_path)
+            os.replace(tmp_path, full_path)
+    finally:
+        os.remove(compressed)
+
+    MediaBlob.objects.filter(pk=blob.pk).update(encoding=ENCODING_GZIP, stored_size=os.path.getsize(blob_path))
+    for name in paths:
+        if os.path.isfile(storage.path(name)):
+            stat = os.stat(storage.path(name))
+            FileDigest.objects.filter(path=name).update(size=stat.st_size, mtime=stat.st_mtime)
+    return True
+
+
+def media_store_models():
+    return [(apps.get_model(label), fields) for label, fields in MEDIA_STORE_FIELDS.items()]
+
+
+def media_names(instance):
+    """Пути файлов экземпляра без обращения к БД (отложенные поля пропускаются)"""
+    names = {}
+    for field in MEDIA_STORE_FIELDS[instance._meta.label]:
+        value = instance.__dict__.get(field)
+        name = getattr(value, 'name', value)
+        if isinstance(name, str) and name:
+            names[field] = name
+    return names
+
+
+def update_media_refs(added=(), removed=()):
+    """Меняет ref_count блобов, на которые указывают пути; пути вне хранилища пропускаются"""
+    from account.models import FileDigest, MediaBlob
+
+    delta = Counter(added)
+    delta.subtract(removed)
+    delta = {name: count for name, count in delta.items() if count}
+    if not delta:
+        return
+
+    per_blob = Counter()
+    for path, blob_id in FileDigest.objects.filter(path__in=delta, blob__isnull=False) \
+            .values_list('path', 'blob_id'):
+        per_blob[blob_id] += delta[path]
+
+    now = timezone.now()
+    for blob_id, count in per_blob.items():
+        if count:
+            MediaBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + count, updated_at=now)
+
+
+def adopt_file(name, storage=media_store):
+    """Переводит уже лежащий на диске файл в хранилище: дубликат заменяется ссылкой на блоб"""
+    from account.models import FileDigest, MediaBlob
+    from .file_digest import hash_file
+
+    full_path = storage.path(name)
+    if FileDigest.objects.filter(path=name, blob__isnull=False).exists() or not os.path.isfile(full_path):
+        return False
+
+    sha256 = hash_file(full_path)
+    stat = os.stat(full_path)
+    blob, _ = MediaBlob.objects.get_or_create(sha256=sha256, defaults={'size': stat.st_size})
+    blob_path = storage.path(blob_name(sha256))
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    try:
+        os.link(full_path, blob_path)
+    except FileExistsError:
+        if not os.path.samefile(full_path, blob_path):
+            # Атомарная замена копии ссылкой на существующий блоб
+            tmp_path = full_path + '.blob'
+            os.link(blob_path, tmp_path)
+            os.replace(tmp_path, full_path)
+
+    stat = os.stat(full_path)
+    FileDigest.objects.update_or_create(
+        path=name,
+        defaults={'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256, 'blob': blob},
+    )
+    return True
+
+
+def recount_media_refs():
+    """Пересчитывает ref_count всех блобов по текущим значениям полей из MEDIA_STORE_FIELDS"""
+    from account.models import FileDigest, MediaBlob
+
+    references = Counter()
+    for model, fields in media_store_models():
+        for field in fields:
+            references.update(
+                name for name in model._base_manager.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .values_list(field, flat=True)
+            )
+
+    per_blob = Counter()
+    for path, blob_id in FileDigest.objects.filter(blob__isnull=False).values_list('path', 'blob_id'):
+        per_blob[blob_id] += references.get(path, 0)
+
+    for blob in MediaBlob.objects.all():
+        if blob.ref_count != per_blob.get(blob.pk, 0):
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=per_blob.get(blob.pk, 0))
+    return per_blob
+
+
+def collect_garbage(grace=BLOB_GC_GRACE, storage=media_store):
+    """Удаляет блобы без ссылок вместе со всеми путями-ссылками на них; возвращает число блобов"""
+    from account.models import FileDigest, MediaBlob
+
+    cutoff = timezone.now() - grace
+    removed = 0
+    for blob in MediaBlob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff):
+        paths = list(FileDigest.objects.filter(blob=blob).values_list('path', flat=True))
+        # Условное удаление: если блоб за это время снова использовали, updated_at уже свежий
+        if not MediaBlob.objects.filter(pk=blob.pk, ref_count__lte=0, updated_at__lt=cutoff).delete()[0]:
+            continue
+        for name in paths + [blob_name(blob.sha256)]:
+            try:
+                os.remove(storage.path(name))
+            except FileNotFoundError:
+                pass
+        removed += 1
+    return removed
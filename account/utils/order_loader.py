@@ -0,0 +1,38 @@
+from django.http import Http404
+
+from account.models import Order
+
+ORDER_RELATED_FIELDS = (
+    'creator__user',
+    'creator__role',
+    'platform_code',
+    'technical_process',
+    'selected_thickness',
+    'selected_diameter',
+)
+
+
+def load_order(request, order_id):
+    """
+    Загружает заказ один раз за запрос и отдаёт один и тот же экземпляр
+    декоратору restrict_by_status и view.
+    Бросает Order.DoesNotExist, если заказа нет.
+    """
+    cache = request.__dict__.setdefault('_order_cache', {})
+    order_id = int(order_id)
+
+    if order_id not in cache:
+        cache[order_id] = Order.objects.select_related(*ORDER_RELATED_FIELDS) \
+            .filter(id=order_id).first()
+
+    order = cache[order_id]
+    if order is None:
+        raise Order.DoesNotExist(f'Order {order_id} does not exist')
+    return order
+
+
+def get_order_or_404(request, order_id):
+    try:
+        return load_order(request, order_id)
+    except (Order.DoesNotExist, ValueError, TypeError):
+        raise Http404('Заказ не найден')
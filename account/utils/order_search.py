@@ -0,0 +1,138 @@
+import os
+import re
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.timezone import localtime
+
+from account.models import Order, OrderSearchToken
+
+FTS_TABLE = 'account_order_search_fts'
+
+# Те же правила разбиения на слова, что у токенизатора FTS5 unicode61:
+# разделитель — всё, что не буква и не цифра (включая «_»)
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+MAX_TOKEN_LENGTH = 100
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def _suffixes(token):
+    # Суффиксы идентификаторов превращают поиск по подстроке номера
+    # (например «00001» в F2025060300001) в поиск по префиксу
+    return [token[i:] for i in range(len(token))]
+
+
+def order_search_tokens(order):
+    """Множество поисковых токенов заказа: номер, id, площадка, статус/тип, даты, имена файлов"""
+    tokens = set()
+
+    for identifier in (order.order_number, str(order.id), order.platform_code.platform_code):
+        for token in tokenize(identifier):
+            tokens.update(_suffixes(token))
+
+    tokens.update(tokenize(order.get_order_status_display()))
+    tokens.update(tokenize(order.get_order_type_display()))
+
+    for value in (order.order_date, order.deadline_date):
+        if value:
+            value = localtime(value)
+            for fmt in DATE_FORMATS:
+                tokens.update(tokenize(value.strftime(fmt)))
+
+    for file_field in (order.contract_file, order.invoice_file, order.GDS_file):
+        if file_field and file_field.name:
+            tokens.update(tokenize(os.path.basename(file_field.name)))
+
+    return {token[:MAX_TOKEN_LENGTH] for token in tokens}
+
+
+@lru_cache(maxsize=None)
+def _fts_available(alias):
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def fts_available():
+    return _fts_available(connection.alias)
+
+
+def index_order(order):
+    """Обновляет поисковый индекс заказа; вызывается из Order.save"""
+    index_orders([order])
+
+
+def index_orders(orders):
+    """Переиндексация группы заказов пачкой запросов (массовые переходы статуса)"""
+    tokens_by_order = {order.id: order_search_tokens(order) for order in orders}
+    if not tokens_by_order:
+        return
+
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [[order_id] for order_id in tokens_by_order],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, content) VALUES (%s, %s)',
+                [[order_id, ' '.join(sorted(tokens))] for order_id, tokens in tokens_by_order.items()],
+            )
+        return
+
+    OrderSearchToken.objects.filter(order_id__in=tokens_by_order).delete()
+    OrderSearchToken.objects.bulk_create(
+        [
+            OrderSearchToken(order_id=order_id, token=token)
+            for order_id, tokens in tokens_by_order.items()
+            for token in tokens
+        ],
+        batch_size=1000,
+    )
+
+
+def unindex_order(order_id):
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [order_id])
+    # Строки OrderSearchToken удаляются каскадом вместе с заказом
+
+
+def search_order_queryset(queryset, query):
+    """Фильтрует queryset заказов по индексу: все слова запроса должны совпасть с префиксом токена"""
+    words = tokenize(query)
+    if not words:
+        return queryset
+
+    if fts_available():
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+
+    for word in words:
+        # Диапазон вместо LIKE 'word%', чтобы запрос шёл по B-tree индексу token
+        matching = OrderSearchToken.objects.filter(
+            token__gte=word, token__lt=word + '\U0010ffff'
+        ).values('order_id')
+        queryset = queryset.filter(id__in=matching)
+    return queryset
+
+
+def rebuild_order_search_index(batch_size=1000):
+    """Полная переиндексация заказов (после миграции или изменения кодов площадок)"""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        OrderSearchToken.objects.all().delete()
+
+    total = 0
+    for order in Order.objects.select_related('platform_code').iterator(chunk_size=batch_size):
+        index_order(order)
+        total += 1
+    return total
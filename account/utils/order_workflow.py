@@ -0,0 +1,147 @@
+from django.db import transaction
+
+from account.models import Order, OrderStatusHistory
+from ..access_rules.access_rules import ORDER_WORKFLOW, edit_permission_q, profile_scope, role_can_act
+from .generate_messages import create_status_notification, create_status_notifications
+from .order_search import index_order, index_orders
+
+S = Order.OrderStatus
+
+PRODUCTION_STATUSES = (S.MTP, S.MTPF, S.MPT, S.MTPB, S.MFT, S.MCS, S.MCP, S.MPOP)
+
+# Переходы без загрузки файлов и заполнения форм, которые можно применять к группе заказов.
+# Значение — поля, которые пишет тот же UPDATE (как в соответствующей одиночной view).
+BULK_TRANSITIONS = {
+    (S.OVK, 'next'): {}, (S.OVK, 'prev'): {},
+    (S.OVC, 'next'): {}, (S.OVC, 'prev'): {},
+    (S.CGDS, 'next'): {}, (S.CGDS, 'prev'): {},
+    (S.EGDS, 'next'): {}, (S.EGDS, 'prev'): {},
+    (S.POC, 'next'): {'is_paid': True}, (S.POC, 'prev'): {'is_paid': False},
+    **{(status, action): {} for status in PRODUCTION_STATUSES for action in ('next', 'prev')},
+    (S.SO, 'next'): {}, (S.SO, 'prev'): {},
+    (S.PS, 'next'): {}, (S.PS, 'prev'): {},
+}
+
+
+class TransitionError(Exception):
+    """Переход не разрешён таблицей ORDER_WORKFLOW"""
+
+
+class TransitionConflict(TransitionError):
+    """Статус заказа успел измениться в параллельном запросе"""
+
+
+def get_target_status(status, action):
+    spec = ORDER_WORKFLOW.get(status)
+    if spec is None or action not in spec['edges']:
+        raise TransitionError(f'Действие {action!r} недоступно в статусе {status}')
+    return spec['edges'][action]
+
+
+def check_transition(status, action, profile):
+    """Проверяет роль и ребро перехода, возвращает целевой статус"""
+    target = get_target_status(status, action)
+    if not role_can_act(profile, status):
+        raise TransitionError(f'Роль {profile_scope(profile).role_name} не может менять статус {status}')
+    return target
+
+
+def apply_transition(order, action, profile, comment=None, expected_status=None, **fields):
+    """
+    Переводит заказ по ребру action одним условным UPDATE ... WHERE order_status=<текущий>,
+    пишет ровно одну запись истории и одно сообщение в чат заказа.
+    expected_status — статус, для которого была показана страница: повторная отправка формы
+    после перехода не переводит заказ дальше, а завершается TransitionConflict.
+    fields — дополнительные поля заказа, обновляемые тем же UPDATE (is_paid, order_date…).
+    Возвращает новый статус или None, если ребро ведёт в тот же статус.
+    """
+    current = getattr(order, '_persisted_status', None) or order.order_status
+    if expected_status is not None and expected_status != current:
+        raise TransitionConflict(f'Статус заказа {order.pk} уже изменён')
+    target = check_transition(current, action, profile)
+
+    if target == current and not fields:
+        return None
+
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, order_status=current) \
+            .update(order_status=target, **fields)
+        if not updated:
+            raise TransitionConflict(f'Статус заказа {order.pk} уже изменён')
+
+        order.order_status = target
+        order._persisted_status = target
+        for name, value in fields.items():
+            setattr(order, name, value)
+
+        if target != current:
+            OrderStatusHistory.objects.create(
+                order=order,
+                old_status=current,
+                new_status=target,
+                comment=comment or None,
+                changed_by=profile,
+            )
+            create_status_notification(order, current, target, profile, comment)
+
+        index_order(order)
+
+    return target if target != current else None
+
+
+def bulk_transition_choices(profile):
+    """Массовые переходы, доступные роли пользователя: [(значение для формы, подпись)]"""
+    labels = dict(S.choices)
+    scope = profile_scope(profile)
+    return [
+        (f'{status}:{action}', f'{labels[status]} → {labels[ORDER_WORKFLOW[status]["edges"][action]]}')
+        for status, action in BULK_TRANSITIONS
+        if role_can_act(scope, status)
+    ]
+
+
+def apply_bulk_transition(order_ids, status, action, profile, comment=None):
+    """
+    Переводит группу заказов из статуса status по ребру action за постоянное число запросов:
+    одна выборка с проверкой прав, один UPDATE, пакетные вставки истории и сообщений.
+    Заказы не в статусе status или недоступные пользователю пропускаются.
+    Возвращает список переведённых заказов.
+    """
+    if (status, action) not in BULK_TRANSITIONS:
+        raise TransitionError(f'Действие {action!r} в статусе {status} нельзя выполнить массово')
+    target = check_transition(status, action, profile)
+    fields = BULK_TRANSITIONS[(status, action)]
+
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_related('platform_code')
+            .filter(edit_permission_q(profile), id__in=order_ids, order_status=status)
+        )
+        if not orders:
+            return []
+
+        updated = Order.objects.filter(id__in=[order.id for order in orders], order_status=status) \
+            .update(order_status=target, **fields)
+        if updated != len(orders):
+            raise TransitionConflict('Статус части заказов уже изменён')
+
+        for order in orders:
+            order.order_status = target
+            order._persisted_status = target
+            for name, value in fields.items():
+                setattr(order, name, value)
+
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(
+                order=order,
+                old_status=status,
+                new_status=target,
+                comment=comment or None,
+                changed_by=profile,
+            )
+            for order in orders
+        ])
+        create_status_notifications(orders, status, target, profile, comment)
+        index_orders(orders)
+
+    return orders
@@ -0,0 +1,105 @@
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+ORDERS_PAGE_SIZE = getattr(settings, 'ORDERS_PAGE_SIZE', 50)
+ORDERS_MAX_PAGE_SIZE = getattr(settings, 'ORDERS_MAX_PAGE_SIZE', 200)
+
+CURSOR_SALT = 'account.orders.cursor'
+
+
+def get_page_size(raw_value):
+    """Размер страницы из GET-параметра с ограничением сверху"""
+    try:
+        page_size = int(raw_value)
+    except (TypeError, ValueError):
+        return ORDERS_PAGE_SIZE
+    return max(1, min(page_size, ORDERS_MAX_PAGE_SIZE))
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _cursor_keys(sort_keys):
+    return [[name, bool(descending)] for name, descending in sort_keys]
+
+
+def encode_cursor(obj, sort_keys):
+    """Курсор подписывается вместе с ключами сортировки: к другой сортировке он не применяется"""
+    values = [_encode_value(getattr(obj, name)) for name, _ in sort_keys]
+    return signing.dumps({'keys': _cursor_keys(sort_keys), 'values': values}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor, sort_keys):
+    if not cursor:
+        return None
+    try:
+        payload = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(payload, dict) or payload.get('keys') != _cursor_keys(sort_keys):
+        return None
+    values = payload.get('values')
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        return None
+    return values
+
+
+def sort_order(sort_keys):
+    """Выражения для order_by; NULL идут последними при любом направлении и в любой СУБД"""
+    return [
+        F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+        for name, descending in sort_keys
+    ]
+
+
+def _after_cursor(sort_keys, values):
+    """
+    Лексикографическое условие «строго после курсора» для набора ключей сортировки.
+    NULL идут последними: после значения — остальные значения и группа NULL,
+    после NULL в этом ключе — только строки с тем же NULL.
+    """
+    condition = Q()
+    equal_prefix = Q()
+    for (name, descending), value in zip(sort_keys, values):
+        is_null = Q(**{f'{name}__isnull': True})
+        if value is None:
+            equal_prefix &= is_null
+            continue
+        lookup = f'{name}__lt' if descending else f'{name}__gt'
+        condition |= equal_prefix & (Q(**{lookup: value}) | is_null)
+        equal_prefix &= Q(**{name: value})
+    return condition
+
+
+def keyset_paginate(queryset, sort_keys, cursor=None, page_size=None):
+    """
+    Keyset-пагинация: страница строится по WHERE (ключи) > (курсор) вместо OFFSET,
+    поэтому стоимость не зависит от номера страницы, а вставки новых строк
+    не сдвигают уже выданные страницы.
+    sort_keys — список (поле, по убыванию?), последним должен идти уникальный ключ (id).
+    Возвращает (список объектов, курсор следующей страницы или None).
+    """
+    page_size = page_size or ORDERS_PAGE_SIZE
+    queryset = queryset.order_by(*sort_order(sort_keys))
+
+    values = decode_cursor(cursor, sort_keys)
+    if values is not None:
+        try:
+            queryset = queryset.filter(_after_cursor(sort_keys, values))
+        except (ValueError, TypeError, ValidationError):
+            # Значение не подходит к типу поля — курсор недействителен, страница с начала
+            pass
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1], sort_keys)
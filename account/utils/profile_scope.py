@@ -0,0 +1,61 @@
+from django.db.models import F
+
+from account.models import Profile
+from ..access_rules.access_rules import ProfileScope, profile_scope
+
+SCOPE_SESSION_KEY = '_profile_scope'
+
+
+def invalidate_profile_scopes(user_ids):
+    """
+    Сброс scope после изменения профилей, ролей или платформ: номер версии в профиле растёт,
+    и scope, сохранённый в сессии с прежним номером, собирается заново в любом воркере
+    """
+    Profile.objects.filter(user_id__in=user_ids).update(scope_version=F('scope_version') + 1)
+
+
+def get_profile_scope(request, user=None):
+    """
+    ProfileScope текущего пользователя; None для анонимного пользователя и пользователя без профиля.
+    В установившемся режиме берётся из сессии и сверяется с scope_version профиля,
+    загруженного вместе с пользователем: отдельных запросов к базе нет.
+    """
+    if hasattr(request, '_profile_scope'):
+        return request._profile_scope
+
+    scope = None
+    user = user if user is not None else request.user
+    # Профиль и роль уже загружены вместе с пользователем (authentication.load_user)
+    profile = getattr(user, 'profile', None) if user.is_authenticated else None
+    if profile is not None:
+        session = getattr(request, 'session', None)
+        stored = session.get(SCOPE_SESSION_KEY) if session is not None else None
+        if stored and stored['stamp'] == profile.scope_version and stored['scope']['profile_id'] == profile.pk:
+            scope = ProfileScope(**stored['scope'])
+        else:
+            scope = profile_scope(profile)
+            if session is not None:
+                session[SCOPE_SESSION_KEY] = {'stamp': profile.scope_version, 'scope': scope.as_dict()}
+
+    request._profile_scope = scope
+    return scope
+
+
+def refresh_profile_scope(request, user):
+    """Scope заново из профиля пользователя при входе: в сессию сразу попадают актуальные данные"""
+    if hasattr(request, '_profile_scope'):
+        del request._profile_scope
+    session = getattr(request, 'session', None)
+    if session is not None:
+        session.pop(SCOPE_SESSION_KEY, None)
+    return get_profile_scope(request, user)
+
+
+def session_expiry(request):
+    """
+    Срок действия учётной записи (timestamp) из scope текущего пользователя.
+    Scope из сессии сверяется с scope_version профиля, загруженного вместе с пользователем,
+    поэтому блокировка или продление срока действуют со следующего запроса в любом воркере.
+    """
+    scope = get_profile_scope(request)
+    return scope.expires_at if scope is not None else None
@@ -0,0 +1,118 @@
+import hashlib
+import json
+
+from django.db import transaction
+from django.db.models import F, Min
+
+from account.models import Diameter, Order, Platform, ReferenceCatalogVersion, TechnicalProcess, Thickness
+
+CATALOG_VERSION_ID = 1
+# Документ по версионному адресу не меняется, его можно кешировать без ограничения срока
+CATALOG_MAX_AGE = 365 * 24 * 60 * 60
+CATALOG_MODELS = (Platform, Diameter, Thickness, TechnicalProcess)
+
+CONTAINER_RULES = {
+    Order.WaferDeliverFormat.NotCut: [
+        (Order.ContainerForCrystals.СontainerForCrystalls, 'Тара для пластин'),
+    ],
+    Order.WaferDeliverFormat.Cut: [
+        (Order.ContainerForCrystals.EmFrame, 'Пяльцы'),
+    ],
+    Order.WaferDeliverFormat.Container: [
+        (Order.ContainerForCrystals.PlasticCells, 'Пластмассовые ячейки'),
+        (Order.ContainerForCrystals.GelPack, 'Gel-Pak'),
+    ],
+}
+
+# Копия справочника в процессе по номеру версии: в установившемся режиме
+# запрос к справочнику стоит одного чтения номера версии по первичному ключу
+_catalogs = {}
+
+
+class Catalog:
+    """Справочник для формы заказа: данные, JSON-документ и его ETag"""
+
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+        self.content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+        self.etag = f'"{hashlib.sha256(self.content).hexdigest()[:32]}"'
+
+    def platforms(self):
+        return self.data['platforms']
+
+    def diameters(self, platform_id):
+        return self.data['diameters'].get(str(platform_id), [])
+
+    def technical_processes(self, platform_id):
+        return self.data['technical_processes'].get(str(platform_id), [])
+
+    def thicknesses(self):
+        return self.data['thicknesses']
+
+    def containers(self, wafer_deliver_format):
+        return self.data['containers'].get(wafer_deliver_format, [])
+
+
+def catalog_version():
+    version = ReferenceCatalogVersion.objects.filter(pk=CATALOG_VERSION_ID) \
+        .values_list('version', flat=True).first()
+    if version is None:
+        version = ReferenceCatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_ID)[0].version
+    return version
+
+
+def bump_catalog_version():
+    if not ReferenceCatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).update(version=F('version') + 1):
+        ReferenceCatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_ID, defaults={'version': 2})
+
+
+def catalog_changed():
+    """
+    Сброс справочника после записи в одну из его моделей. Версия повышается сразу
+    и ещё раз после коммита: копия, собранная до коммита по старым данным, не переживёт его.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def build_catalog_data():
+    diameters, technical_processes = {}, {}
+    for diameter in Diameter.objects.order_by('platform_id', 'id'):
+        diameters.setdefault(str(diameter.platform_id), []).append({'id': diameter.id, 'value': diameter.value})
+
+    # Из техпроцессов с одинаковым названием на платформе остаётся первый
+    unique_ids = TechnicalProcess.objects.values('platform_id', 'name_process') \
+        .annotate(min_id=Min('id')).values_list('min_id', flat=True)
+    for process in TechnicalProcess.objects.filter(id__in=unique_ids).order_by('platform_id', 'id'):
+        technical_processes.setdefault(str(process.platform_id), []).append(
+            {'id': process.id, 'name_process': process.name_process}
+        )
+
+    return {
+        'platforms': [
+            {'id': platform.id, 'name': platform.platform_name, 'code': platform.platform_code}
+            for platform in Platform.objects.order_by('id')
+        ],
+        'diameters': diameters,
+        'technical_processes': technical_processes,
+        'thicknesses': [{'id': t.id, 'value': t.value} for t in Thickness.objects.order_by('id')],
+        'containers': {
+            str(wafer_format): [{'id': str(value), 'value': label} for value, label in containers]
+            for wafer_format, containers in CONTAINER_RULES.items()
+        },
+    }
+
+
+def get_catalog():
+    """Текущий справочник: из памяти процесса или, после смены версии, из базы"""
+    version = catalog_version()
+    catalog = _catalogs.get(version)
+    if catalog is not None:
+        return catalog
+
+    catalog = Catalog(version, build_catalog_data())
+    # Старые версии больше не запрашиваются
+    _catalogs.clear()
+    _catalogs[version] = catalog
+    return catalog
@@ -0,0 +1,62 @@
+import hashlib
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .profile_scope import get_profile_scope
+
+# Срок действия ссылки; срок округляется вверх до шага, поэтому при повторной отрисовке
+# страницы ссылки не меняются и браузер берёт файлы из своего кеша
+SIGNED_DOWNLOAD_MAX_AGE = getattr(settings, 'SIGNED_DOWNLOAD_MAX_AGE', 60 * 60)
+SIGNED_DOWNLOAD_STEP = max(SIGNED_DOWNLOAD_MAX_AGE // 4, 1)
+SIGNED_DOWNLOAD_SALT = 'account.signed_downloads'
+
+
+def _session_hash(session_key):
+    # В подпись входит хэш ключа сессии, а не сам ключ: ссылка не раскрывает cookie
+    return hashlib.sha256(session_key.encode()).hexdigest()
+
+
+def download_signature(file_path, user_id, expires, session_key):
+    value = f'{file_path}\n{user_id}\n{expires}\n{_session_hash(session_key)}'
+    return salted_hmac(SIGNED_DOWNLOAD_SALT, value, algorithm='sha256').hexdigest()
+
+
+def signed_download_url(request, file_path):
+    """
+    Ссылка на файл, подписанная для пользователя и его сессии. Права проверяет view,
+    который рисует страницу; сам файл по такой ссылке отдаётся без загрузки сессии,
+    пользователя и профиля, поэтому срок ссылки ограничен сроком учётной записи.
+    Без сессии — обычная ссылка protected_download.
+    """
+    session_key = getattr(getattr(request, 'session', None), 'session_key', None)
+    if not session_key or not request.user.is_authenticated:
+        return reverse('protected_download', kwargs={'file_path': file_path})
+
+    now = int(time.time())
+    expires = -(-(now + SIGNED_DOWNLOAD_MAX_AGE) // SIGNED_DOWNLOAD_STEP) * SIGNED_DOWNLOAD_STEP
+    # Scope уже загружен страницей, которая рисует ссылки: отдельного запроса нет
+    scope = get_profile_scope(request)
+    if scope is not None and scope.expires_at is not None:
+        expires = min(expires, int(scope.expires_at))
+    signature = download_signature(file_path, request.user.pk, expires, session_key)
+    return reverse('signed_download', args=[request.user.pk, expires, signature, file_path])
+
+
+def verify_download(request, file_path, user_id, expires, signature):
+    """Проверка подписи только по URL и cookie сессии, без обращений к БД"""
+    if expires < time.time():
+        return False
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return False
+    return constant_time_compare(signature, download_signature(file_path, user_id, expires, session_key))
+
+
+@lru_cache(maxsize=None)
+def signed_download_prefix():
+    """Начало URL подписанных ссылок с учётом префикса приложения"""
+    return reverse('signed_download', args=[0, 0, 'x', 'f']).removesuffix('0/0/x/f/')
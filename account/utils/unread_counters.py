@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from account.models import Message, UserTopic, UnreadCounter
+
+
+def _ensure_counters(topic_id, profile_ids):
+    """Создаёт недостающие строки счётчиков для участников темы"""
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(profile_id=pid, topic_id=topic_id) for pid in profile_ids],
+        ignore_conflicts=True,
+    )
+
+
+def register_message(message):
+    """Инкремент счётчиков всех участников темы, кроме автора сообщения"""
+    participant_ids = list(
+        UserTopic.objects.filter(topic_id=message.topic_id).values_list('user_id', flat=True)
+    )
+    if not participant_ids:
+        return
+
+    _ensure_counters(message.topic_id, participant_ids)
+
+    counters = UnreadCounter.objects.filter(topic_id=message.topic_id)
+    counters.exclude(profile_id=message.user_id).update(
+        unread_count=F('unread_count') + 1,
+        last_message_id=message.id,
+    )
+    counters.filter(profile_id=message.user_id).update(last_message_id=message.id)
+
+
+def register_messages(messages):
+    """
+    Пакетный вариант register_message для сообщений из bulk_create
+    (не больше одного сообщения на тему): число запросов не зависит от числа тем.
+    """
+    topics_by_author = defaultdict(set)
+    for message in messages:
+        topics_by_author[message.user_id].add(message.topic_id)
+    topic_ids = {message.topic_id for message in messages}
+    if not topic_ids:
+        return
+
+    UnreadCounter.objects.bulk_create(
+        [
+            UnreadCounter(profile_id=profile_id, topic_id=topic_id)
+            for profile_id, topic_id in UserTopic.objects.filter(topic_id__in=topic_ids)
+            .values_list('user_id', 'topic_id')
+        ],
+        ignore_conflicts=True,
+    )
+
+    last_message_id = Subquery(
+        Message.objects.filter(topic_id=OuterRef('topic_id')).order_by('-id').values('id')[:1]
+    )
+    for author_id, author_topic_ids in topics_by_author.items():
+        counters = UnreadCounter.objects.filter(topic_id__in=author_topic_ids)
+        counters.exclude(profile_id=author_id).update(
+            unread_count=F('unread_count') + 1,
+            last_message_id=last_message_id,
+        )
+        counters.filter(profile_id=author_id).update(last_message_id=last_message_id)
+
+
+def unregister_message(message):
+    """Декремент счётчиков тех участников, для которых удаляемое сообщение ещё не прочитано"""
+    # Вызывается до удаления: после него last_read_message обнуляется через SET_NULL
+    unread_for = UserTopic.objects.filter(topic_id=message.topic_id).filter(
+        Q(last_read_message__isnull=True) | Q(last_read_message_id__lt=message.id)
+    ).exclude(user_id=message.user_id).values('user_id')
+
+    counters = UnreadCounter.objects.filter(topic_id=message.topic_id)
+    counters.filter(profile_id__in=unread_for, unread_count__gt=0).update(
+        unread_count=F('unread_count') - 1,
+    )
+
+    last_message_id = (
+        Message.objects.filter(topic_id=message.topic_id)
+        .exclude(id=message.id)
+        .aggregate(last_id=Max('id'))['last_id']
+    )
+    counters.filter(last_message_id=message.id).update(last_message_id=last_message_id)
+
+
+def init_counter(user_topic):
+    """Начальное значение счётчика для нового участника темы"""
+    messages = Message.objects.filter(topic_id=user_topic.topic_id).exclude(user_id=user_topic.user_id)
+    if user_topic.last_read_message_id:
+        messages = messages.filter(id__gt=user_topic.last_read_message_id)
+
+    stats = messages.aggregate(unread=Count('id'))
+    last_message_id = (
+        Message.objects.filter(topic_id=user_topic.topic_id).aggregate(last_id=Max('id'))['last_id']
+    )
+    UnreadCounter.objects.update_or_create(
+        profile_id=user_topic.user_id,
+        topic_id=user_topic.topic_id,
+        defaults={'unread_count': stats['unread'], 'last_message_id': last_message_id},
+    )
+
+
+def mark_topic_read(profile, topic, last_message):
+    """
+    Обнуляет счётчик пользователя при открытии темы. Сброс условный: счётчик обнуляется,
+    только если последним в нём учтено то же сообщение, что показано пользователю
+    """
+    last_message_id = last_message.id if last_message else None
+    counters = UnreadCounter.objects.filter(profile=profile, topic=topic)
+    if counters.filter(last_message_id=last_message_id).update(unread_count=0):
+        return
+
+    # Счётчика ещё нет или после выборки в тему пришли новые сообщения: непрочитанными остаются они
+    messages = Message.objects.filter(topic=topic)
+    unread = messages.filter(id__gt=last_message_id or 0).exclude(user=profile).count()
+    UnreadCounter.objects.update_or_create(
+        profile=profile,
+        topic=topic,
+        defaults={
+            'unread_count': unread,
+            'last_message_id': messages.aggregate(last_id=Max('id'))['last_id'],
+        },
+    )
+
+
+def get_unread_counts(profile):
+    """Все ненулевые счётчики пользователя одним запросом: {topic_id: unread_count}"""
+    return dict(
+        UnreadCounter.objects
+        .filter(profile=profile, unread_count__gt=0)
+        .values_list('topic_id', 'unread_count')
+    )
+
+
+def rebuild_unread_counters():
+    """Полный пересчёт счётчиков по Message/UserTopic (восстановление после сбоев)"""
+    user_topics = UserTopic.objects.annotate(
+        unread=Count(
+            'topic__messages',
+            filter=Q(topic__messages__id__gt=Coalesce(F('last_read_message_id'), Value(0)))
+            & ~Q(topic__messages__user_id=F('user_id')),
+        ),
+        last_id=Max('topic__messages__id'),
+    ).values_list('user_id', 'topic_id', 'unread', 'last_id')
+
+    counters = [
+        UnreadCounter(profile_id=profile_id, topic_id=topic_id,
+                      unread_count=unread, last_message_id=last_id)
+        for profile_id, topic_id, unread, last_id in user_topics.iterator()
+    ]
+
+    with transaction.atomic():
+        UnreadCounter.objects.all().delete()
+        UnreadCounter.objects.bulk_create(counters, batch_size=1000)
+
+    return len(counters)
@@ -1,83 +1,86 @@
 from datetime import timedelta
 from django.utils.timezone import now
-from django.core.mail import send_mail
-from django.conf import settings
-from account.models import Message, UserTopic
-from .email_recipients import send_email_about_unread_message
-import time
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Max, Q
+from account.models import Message, JobWatermark
+from .email_outbox import enqueue_emails
 
-def send_unread_messages():
-    """Получает данные из email_recipients, работает с cron"""
-    import sys
-    print("=== STEP 1: Function started ===", flush=True)
-    
-    today_start = now().replace(hour=0, minute=0, second=0, microsecond=0)
-    threshold = now() - timedelta(hours=1)
-    
-    print(f"=== STEP 2: today_start={today_start}, threshold={threshold}", flush=True)
+DIGEST_WATERMARK = 'unread_message_digest'
 
-    messages = (
+
+def collect_unread_digest(after_id, upto_id, since):
+    """
+    Одним запросом с join Message/UserTopic/Profile/User: кому какие сообщения
+    из диапазона (after_id, upto_id] не прочитаны. Возвращает {email: [(тема, текст), ...]}.
+    """
+    # Условия на участника собраны в одном FilteredRelation, чтобы все они относились
+    # к одной и той же паре (сообщение, участник), а не к разным join по теме
+    unread_participant = FilteredRelation(
+        'topic__usertopic',
+        condition=~Q(topic__usertopic__user_id=F('user_id')) & (
+            Q(topic__usertopic__last_read_message__isnull=True)
+            | Q(topic__usertopic__last_read_message_id__lt=F('id'))
+        ),
+    )
+    rows = (
         Message.objects
-        .filter(created_at__gte=today_start, created_at__lte=threshold, email_sent=False)
-        .select_related('topic')
+        .annotate(participant=unread_participant)
+        .filter(
+            id__gt=after_id,
+            id__lte=upto_id,
+            created_at__gte=since,
+            email_sent=False,
+            participant__isnull=False,
+            participant__user__user__email__gt='',
+        )
+        .order_by('participant__user__user__email', 'id')
+        .values_list('participant__user__user__email', 'topic__name', 'text')
     )
-    
-    print(f"=== STEP 3: Found {messages.count()} messages", flush=True)
 
-    recipients_dict = {}
+    digest = {}
+    for email, topic_name, text in rows:
+        digest.setdefault(email, []).append((topic_name, text))
+    return digest
 
-    for message in messages:
-        print(f"=== STEP 4: Processing message {message.id}", flush=True)
-        
-        user_topics = UserTopic.objects.filter(topic=message.topic)
-        print(f"=== STEP 5: UserTopic count = {user_topics.count()}", flush=True)
 
-        still_unread = False
-        for ut in user_topics:
-            last_read = ut.last_read_message
-            if not last_read or last_read.id < message.id:
-                still_unread = True
-                break
-
-        if not still_unread:
-            print(f"=== STEP 6: Message {message.id} - all users read it", flush=True)
-            message.email_sent = True
-            message.save(update_fields=['email_sent'])
-            continue
+def send_unread_messages():
+    """
+    Дайджест непрочитанных сообщений, работает с cron.
+    Обрабатывает только сообщения после сохранённой отметки JobWatermark,
+    число запросов не зависит от числа сообщений и участников.
+    """
+    today_start = now().replace(hour=0, minute=0, second=0, microsecond=0)
+    threshold = now() - timedelta(hours=1)
 
-        print(f"=== STEP 7: Message {message.id} - still unread", flush=True)
-        
-        recipients = send_email_about_unread_message(message)
-        print(f"=== STEP 8: Recipients = {recipients}", flush=True)
-        
-        for recipient in recipients:
-            recipients_dict.setdefault(recipient, []).append(message)
+    with transaction.atomic():
+        watermark, _ = JobWatermark.objects.select_for_update().get_or_create(name=DIGEST_WATERMARK)
 
-    print(f"=== STEP 9: recipients_dict = {recipients_dict}", flush=True)
+        # Сообщения моложе часа остаются за отметкой до следующего запуска
+        upto_id = (
+            Message.objects
+            .filter(id__gt=watermark.last_id, created_at__lte=threshold)
+            .aggregate(upto_id=Max('id'))['upto_id']
+        )
+        if upto_id is None:
+            print("=== Нет новых сообщений для рассылки", flush=True)
+            return 0
 
-    for recipient, msgs in recipients_dict.items():
-        full_text = ""
-        for msg in msgs:
-            full_text += f"Чат: {msg.topic.name}\nТекст: {msg.text}\n\n"
+        digest = collect_unread_digest(watermark.last_id, upto_id, today_start)
 
-        print(f"=== STEP 10: Sending email to {recipient}", flush=True)
+        emails = []
+        for recipient, items in digest.items():
+            full_text = ""
+            for topic_name, text in items:
+                full_text += f"Чат: {topic_name}\nТекст: {text}\n\n"
+            emails.append({'to_email': recipient, 'subject': "Непрочитанные сообщения", 'body': full_text})
 
-        try:
-            send_mail(
-                subject="Непрочитанные сообщения",
-                message=full_text,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[recipient],
-                fail_silently=False,
-            )
-            print(f"=== STEP 11: Email sent to {recipient}", flush=True)
-        except Exception as e:
-            print(f"=== STEP 11 ERROR: {e}", flush=True)
+        # Отправка и повторы — в воркере send_outbox_emails, здесь только постановка в очередь
+        enqueue_emails(emails)
+        Message.objects.filter(id__gt=watermark.last_id, id__lte=upto_id, email_sent=False) \
+            .update(email_sent=True)
 
-        time.sleep(5)
+        watermark.last_id = upto_id
+        watermark.save(update_fields=['last_id', 'updated_at'])
 
-        for msg in msgs:
-            msg.email_sent = True
-            msg.save(update_fields=['email_sent'])
-    
-    print("=== STEP 12: Function finished ===", flush=True)
\ No newline at end of file
+    print(f"=== Поставлено в очередь писем: {len(emails)}, сообщения до id={upto_id}", flush=True)
+    return len(emails)
@@ -0,0 +1,189 @@
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+
+READ_CHUNK_SIZE = 256 * 1024
+DEFLATE_LEVEL = 6
+ZIP64_LIMIT = 0xFFFFFFFF
+# Запись с возможным размером больше этого сразу пишется в формате ZIP64:
+# сжатый размер становится известен только после записи данных
+ZIP64_ENTRY_THRESHOLD = ZIP64_LIMIT - 16 * 1024 * 1024
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+
+
+@dataclass
+class ZipEntry:
+    """
+    Файл архива. Если задан gzip_path — содержимое хранится в gzip (media_store),
+    и его deflate-поток переносится в архив без распаковки и повторного сжатия.
+    """
+    arcname: str
+    path: str
+    size: int
+    mtime: float
+    compress: bool = False
+    gzip_path: str = ''
+
+
+def dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def gzip_member(path):
+    """
+    Границы deflate-потока в однотомном gzip-файле: (начало, конец, CRC-32, размер mod 2^32).
+    None, если заголовок не разобран.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(10)
+        if len(header) < 10 or header[:3] != b'\x1f\x8b\x08':
+            return None
+        flags = header[3]
+        if flags & 0x04:
+            extra_length, = struct.unpack('<H', f.read(2))
+            f.seek(extra_length, os.SEEK_CUR)
+        for flag in (0x08, 0x10):
+            if flags & flag:
+                while f.read(1) not in (b'\0', b''):
+                    pass
+        if flags & 0x02:
+            f.seek(2, os.SEEK_CUR)
+        start = f.tell()
+        end = f.seek(-8, os.SEEK_END)
+        crc, isize = struct.unpack('<II', f.read(8))
+    return (start, end, crc, isize) if end >= start else None
+
+
+def _read(path, start=0, end=None):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            chunk = f.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _gunzip(path):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in _read(path):
+        yield decompressor.decompress(chunk)
+    yield decompressor.flush()
+
+
+class ZipStream:
+    """
+    ZIP, собираемый по мере отдачи: заголовок, данные и дескриптор данных каждой записи
+    выдаются сразу, в памяти остаются только строки центрального каталога.
+    Архив не требует seek, поэтому подходит для StreamingHttpResponse.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.central_directory = []
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def _entry_data(self, entry, state):
+        """Данные записи; CRC-32 и сжатый размер накапливаются в state и известны после последнего блока"""
+        if state['member']:
+            start, end, state['crc'], _ = state['member']
+            for chunk in _read(entry.gzip_path, start, end):
+                state['compressed'] += len(chunk)
+                yield chunk
+            return
+
+        if entry.gzip_path:
+            # Deflate-поток нельзя взять как есть — распаковка на лету
+            source = _gunzip(entry.gzip_path)
+        else:
+            source = _read(entry.path)
+        compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -15) if entry.compress else None
+        for chunk in source:
+            state['crc'] = zlib.crc32(chunk, state['crc'])
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                state['compressed'] += len(chunk)
+                yield chunk
+        if compressor:
+            tail = compressor.flush()
+            state['compressed'] += len(tail)
+            yield tail
+
+    def write(self, entry):
+        name = entry.arcname.encode('utf-8')
+        zip64 = entry.size >= ZIP64_ENTRY_THRESHOLD
+        dos_time, dos_date = dos_datetime(entry.mtime)
+        header_offset = self.offset
+        flags = FLAG_DATA_DESCRIPTOR | FLAG_UTF8
+
+        member = gzip_member(entry.gzip_path) if entry.gzip_path else None
+        if member and member[3] != entry.size & 0xFFFFFFFF:
+            member = None
+        method = METHOD_DEFLATED if member or entry.compress else METHOD_STORED
+        state = {'member': member, 'crc': 0, 'compressed': 0}
+
+        extra = struct.pack('<HHQQ', 1, 16, 0, 0) if zip64 else b''
+        placeholder = ZIP64_LIMIT if zip64 else 0
+        yield self._emit(struct.pack(
+            '<IHHHHHIIIHH', 0x04034B50, 45 if zip64 else 20, flags, method, dos_time, dos_date,
+            0, placeholder, placeholder, len(name), len(extra),
+        ) + name + extra)
+
+        for chunk in self._entry_data(entry, state):
+            yield self._emit(chunk)
+
+        crc, compressed = state['crc'], state['compressed']
+        if zip64:
+            yield self._emit(struct.pack('<IIQQ', 0x08074B50, crc, compressed, entry.size))
+        else:
+            yield self._emit(struct.pack('<IIII', 0x08074B50, crc, compressed, entry.size))
+
+        self.central_directory.append(
+            (name, flags, method, dos_time, dos_date, crc, compressed, entry.size, header_offset)
+        )
+
+    def finish(self):
+        start = self.offset
+        for name, flags, method, dos_time, dos_date, crc, compressed, size, header_offset in self.central_directory:
+            zip64 = max(compressed, size, header_offset) >= ZIP64_LIMIT
+            extra = struct.pack('<HHQQQ', 1, 24, size, compressed, header_offset) if zip64 else b''
+            yield self._emit(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014B50, (3 << 8) | 45, 45 if zip64 else 20, flags, method,
+                dos_time, dos_date, crc,
+                ZIP64_LIMIT if zip64 else compressed, ZIP64_LIMIT if zip64 else size,
+                len(name), len(extra), 0, 0, 0, 0o100644 << 16, ZIP64_LIMIT if zip64 else header_offset,
+            ) + name + extra)
+
+        count = len(self.central_directory)
+        size = self.offset - start
+        if count >= 0xFFFF or size >= ZIP64_LIMIT or start >= ZIP64_LIMIT:
+            end_offset = self.offset
+            yield self._emit(struct.pack('<IQHHIIQQQQ', 0x06064B50, 44, 45, 45, 0, 0, count, count, size, start))
+            yield self._emit(struct.pack('<IIQI', 0x07064B50, 0, end_offset, 1))
+            count, size, start = 0xFFFF, ZIP64_LIMIT, ZIP64_LIMIT
+        yield self._emit(struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, count, count, size, start, 0))
+
+
+def stream_zip(entries):
+    """Генератор байтов ZIP-архива из ZipEntry; записи читаются с диска по одной"""
+    archive = ZipStream()
+    for entry in entries:
+        yield from archive.write(entry)
+    yield from archive.finish()
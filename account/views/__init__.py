@@ -9,6 +9,7 @@ from django.conf import settings
 from django.forms.models import model_to_dict
 from django.http import HttpResponse, JsonResponse, Http404, FileResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db import transaction
 from django.db.models import Q, Max, Case, When, IntegerField
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
@@ -16,23 +17,40 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.utils import timezone
 from django.utils.timezone import localtime
-from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST, require_http_methods
+from django.utils.cache import get_conditional_response
 
-from ..access_rules.access_rules import ROLE_CURATOR, ROLE_CUSTOMER, ROLE_EXECUTOR
+from ..access_rules.access_rules import ROLE_CURATOR, ROLE_CUSTOMER, ROLE_EXECUTOR, view_permission_q, \
+    check_view_permission
 from ..forms import LoginForm, UserEditForm, ProfileEditForm, OrderEditForm, \
 OrderEditingForm, EditPlatform, AddGDSFile, MessageForm, EditPaidForm, \
 ViewOrderForm, RegistrationForm, AddContractForm, AddContractFileForm
-from ..models import Profile, Order, TechnicalProcess, Platform, \
-Thickness, Diameter, Topic, UserTopic, Message, File, Document, TopicFileModel, \
-LoginLog, PDKHelpFileModel, OrderStatusHistory, RegistrationRequest
-from ..export_excel import generate_excel_file
-from ..utils.email_sender import send_email_with_attachments
+from ..models import Company, Profile, Order, TechnicalProcess, Platform, \
+Thickness, Topic, UserTopic, Message, File, Document, TopicFileModel, \
+LoginLog, PDKHelpFileModel, OrderStatusHistory, RegistrationRequest, GDSLayoutInfo
+from ..export_excel import generate_excel_file, export_orders_to_tempfile
+from ..utils.email_outbox import enqueue_emails
 from ..utils.generate_messages import add_file_message
 from ..decorators.restrict import restrict_by_status
-from ..decorators.log_status_change import log_order_status_change
 from ..utils.sanitizer import sanitizer
 from ..utils.generate_messages import create_status_notification
 from ..utils.list_productions_statuses import STATUS_CONFIG
+from ..utils.unread_counters import get_unread_counts, mark_topic_read
+from ..utils.pagination import keyset_paginate, get_page_size, sort_order
+from ..utils.order_search import search_order_queryset
+from ..utils.order_loader import get_order_or_404
+from ..utils.file_delivery import serve_media_file
+from ..utils.gds_preview import preview_tile_name
+from ..utils.signed_downloads import signed_download_url, verify_download
+from ..utils.profile_scope import get_profile_scope
+from ..utils.reference_catalog import CATALOG_MAX_AGE, get_catalog
+from ..utils.document_archive import zip_response, order_archive_files, user_archive_files, \
+    company_archive_files
+from ..utils.chunked_upload import UploadError, UploadOffsetMismatch, UPLOAD_CHUNK_SIZE, \
+start_upload, get_upload, write_chunk, finish_upload
+from ..utils.order_workflow import apply_transition, apply_bulk_transition, \
+bulk_transition_choices, TransitionError, TransitionConflict
 from ..utils.loging_for_registration import *
 
 
@@ -44,46 +62,65 @@ ORDER_STATUS_PRIORITY = [
     'POK', 'POC', 'PO', 'MPO', 'SO', 'PS', 'CR', 'EO'
 ]
 
+def page_status(request):
+    """Статус заказа, для которого была показана форма (скрытое поле expected_status)"""
+    return request.POST.get('expected_status') or None
+
+
+def save_order_form(form):
+    """Сохраняет поля формы заказа, не трогая статус: его меняет только apply_transition"""
+    order = form.save(commit=False)
+    model_fields = {field.name for field in Order._meta.concrete_fields}
+    order.save(update_fields=[name for name in form.fields
+                              if name in model_fields and name != 'order_status'])
+    form.save_m2m()
+    return order
+
+
 def search_orders(queryset, query=None):
     if not query:
         return queryset
 
-    query_lower = query.lower()
-
-    orm_filtered = queryset.filter(
-        Q(order_number__icontains=query) |
-        Q(id__icontains=query) |
-        Q(platform_code__platform_code__icontains=query) |
-        Q(order_date__icontains=query) |
-        Q(deadline_date__icontains=query) |
-        Q(contract_file__icontains=query) |
-        Q(invoice_file__icontains=query) |
-        Q(GDS_file__icontains=query)
-    )
+    # Поиск по индексу (FTS5 или таблица токенов), см. utils/order_search.py
+    return search_order_queryset(queryset, query)
 
-    display_ids = [
-        o.id for o in queryset
-        if query_lower in o.get_order_type_display().lower()
-        or query_lower in o.get_order_status_display().lower()
-    ]
 
-    if display_ids:
-        orm_filtered = orm_filtered | queryset.filter(id__in=display_ids)
-
-    return orm_filtered.distinct()
+ORDER_SORT_KEYS = {
+    'order_number': [('order_number', True), ('id', True)],
+    'created_at': [('created_at', True), ('id', True)],
+    'status': [('status_priority', False), ('id', True)],
+}
+DEFAULT_ORDER_SORT_KEYS = ORDER_SORT_KEYS['created_at']
 
 
 def filter_orders(queryset, filter_by=None):
-    if filter_by == 'order_number':
-        return queryset.order_by('-order_number')
-    elif filter_by == 'created_at':
-        return queryset.order_by('-created_at')
-    elif filter_by == 'status':
+    if filter_by == 'status':
         whens = [When(order_status=s, then=pos) for pos, s in enumerate(ORDER_STATUS_PRIORITY)]
-        return queryset.annotate(
-            status_priority=Case(*whens, output_field=IntegerField())
-        ).order_by('status_priority')
-    return queryset
+        # default=-1 сохраняет прежний порядок: статусы вне списка (NULL) шли первыми
+        queryset = queryset.annotate(
+            status_priority=Case(*whens, default=-1, output_field=IntegerField())
+        )
+    sort_keys = ORDER_SORT_KEYS.get(filter_by, DEFAULT_ORDER_SORT_KEYS)
+    return queryset.order_by(*sort_order(sort_keys))
+
+
+def paginate_orders(request, queryset, filter_by=None):
+    """Страница заказов по курсору из GET-параметров и query-string для ссылки на следующую"""
+    sort_keys = ORDER_SORT_KEYS.get(filter_by, DEFAULT_ORDER_SORT_KEYS)
+    orders, next_cursor = keyset_paginate(
+        queryset,
+        sort_keys,
+        cursor=request.GET.get('cursor'),
+        page_size=get_page_size(request.GET.get('page_size')),
+    )
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+
+    return orders, next_query
 
 
 def  search_orders_view(request, role_id):
@@ -97,25 +134,33 @@ def  search_orders_view(request, role_id):
     elif role_id == ROLE_CURATOR:
         base_qs = Order.objects.all()
         template = 'account/dashboard_curator.html'
-        platform_name = get_object_or_404(Profile, id=request.user.id).company_name
-        extra = {'platform_name': platform_name}
+        platform_name = request.user.profile.company_name
+        extra = {
+            'platform_name': platform_name,
+            'bulk_transitions': bulk_transition_choices(get_profile_scope(request)),
+        }
     elif role_id == ROLE_EXECUTOR:
         profile = request.user.profile
-        code_company = get_object_or_404(Platform, platform_code=profile.company_name)
-        base_qs = Order.objects.filter(platform_code_id=code_company)
+        if profile.platform_id is None:
+            raise Http404('Платформа исполнителя не найдена')
+        base_qs = Order.objects.filter(platform_code_id=profile.platform_id)
         template = 'account/dashboard_executor.html'
-        name_platform = Platform.objects.filter(platform_code=code_company)\
-            .values_list('platform_name', flat=True).first()
-        extra = {'name_platform': name_platform}
+        extra = {
+            'name_platform': profile.platform.platform_name,
+            'bulk_transitions': bulk_transition_choices(get_profile_scope(request)),
+        }
     else:
         raise ValueError(f'Unknown role_id: {role_id}')
 
+    base_qs = base_qs.select_related('creator', 'platform_code')
     orders = search_orders(base_qs, query)
     orders = filter_orders(orders, filter_by)
+    orders, next_query = paginate_orders(request, orders, filter_by)
 
     return render(request, template, {
         'data': {
             'orders': orders,
+            'next_query': next_query,
             **extra
         }
     })
@@ -158,67 +203,50 @@ def registration(request):
                 </body>
                 </html>
             '''
-            sender_email = settings.EMAIL_HOST_USER
-            password = settings.EMAIL_HOST_PASSWORD
             file_paths = [
                 os.path.join(settings.MEDIA_ROOT, 'uploads/for_send/access_request_form.docx'),
                 #os.path.join(settings.MEDIA_ROOT, 'uploads/for_send/Confidentiality_agreement.pdf'),
                 os.path.join(settings.MEDIA_ROOT, 'uploads/for_send/Инструкция_пользователя_Платформы_Исполнитель.pdf')
             ]
 
-            send_email_with_attachments(sender_email, user_email, password, subject, body, file_paths)
+            # Письма только ставятся в очередь, отправляет их команда send_outbox_emails
+            emails = [{
+                'to_email': user_email,
+                'subject': subject,
+                'body': body,
+                'html': True,
+                'attachments': file_paths,
+            }]
 
-            curator_users = User.objects.filter(
+            curator_emails = list(User.objects.filter(
                 profile__role__name='Куратор',
                 profile__deleted_at__isnull=True,
                 is_active=True
-            ).distinct()
+            ).exclude(email='').values_list('email', flat=True).distinct())
 
-            if not curator_users.exists():
+            if not curator_emails:
                 print('Предупреждение: не найдено активных кураторов для уведомления')
 
-            for curator in curator_users:
-                if not curator.email:
-                    print(f'Пропуск: у куратора {curator.username} не указан email')
-                    continue
-
-                curator_subject = 'Новая заявка на регистрацию'
-                curator_body = f'''
-                    <html>
-                    <body>
-                        <h1>Новая заявка на регистрацию</h1>
-                        <p>Пользователь {form.cleaned_data['name']} ({user_email}) подал заявку на регистрацию.</p>
-                        <p>Компания: {form.cleaned_data['company']}</p>
-                        <p>Телефон: {form.cleaned_data['number']}</p>
-                        <p>Почта: {form.cleaned_data['mail']}</p>
-                    </body>
-                    </html>
-                '''
-                try:
-                    send_email_with_attachments(
-                        sender_email,
-                        curator.email,
-                        password,
-                        curator_subject,
-                        curator_body,
-                        file_paths=[]
-                    )
-                    print(f'Уведомление отправлено куратору: {curator.email}')
-                except Exception as e:
-                    print(f'Ошибка при отправке письма куратору {curator.email}: {e}')
-
-            try:
-                send_email_with_attachments(
-                    sender_email,
-                    os.getenv('EMAIL_HOST_USER'),
-                    password,
-                    curator_subject,
-                    curator_body,
-                    file_paths=[]
-                )
-                print('Копия письма отправлена на основную почту')
-            except Exception as e:
-                print(f'Ошибка при отправке копии на основную почту: {e}')
+            curator_subject = 'Новая заявка на регистрацию'
+            curator_body = f'''
+                <html>
+                <body>
+                    <h1>Новая заявка на регистрацию</h1>
+                    <p>Пользователь {form.cleaned_data['name']} ({user_email}) подал заявку на регистрацию.</p>
+                    <p>Компания: {form.cleaned_data['company']}</p>
+                    <p>Телефон: {form.cleaned_data['number']}</p>
+                    <p>Почта: {form.cleaned_data['mail']}</p>
+                </body>
+                </html>
+            '''
+            # Копия уведомления уходит на основную почту
+            if settings.EMAIL_HOST_USER:
+                curator_emails.append(settings.EMAIL_HOST_USER)
+            emails += [
+                {'to_email': email, 'subject': curator_subject, 'body': curator_body, 'html': True}
+                for email in curator_emails
+            ]
+            enqueue_emails(emails)
 
             messages.success(request, 'Регистрация прошла успешно!')
             return render(request, 'account/registration_done.html')
@@ -233,12 +261,10 @@ def registration(request):
 
 def download_privacy_file(request):
     """Скачивание файла конфиденциальности"""
-    file_path = os.path.join(settings.MEDIA_ROOT, 'uploads/privacy_file/Политика_в_отношении_обработки_персональных_данных.pdf')
-
-    if not os.path.exists(file_path):
-        raise Http404('Файл не найден')
-
-    return FileResponse(open(file_path, 'rb'), as_attachment=True, filename='Политика_в_отношении_обработки_персональных_данных.pdf')
+    return serve_media_file(
+        request,
+        'uploads/privacy_file/Политика_в_отношении_обработки_персональных_данных.pdf',
+    )
 
 
 
@@ -288,12 +314,12 @@ def account_expired(request):
 def _dashboard_client(request, message=''):
     profile = request.user.profile
     company_name = profile.company_name
-    users_in_company = Profile.objects.filter(company_name=company_name) \
-                        .values_list('user', flat=True)
-
-    orders = Order.objects.filter(creator__user__in=users_in_company) \
-                        .select_related('creator', 'platform_code') \
-                        .order_by('-created_at')
+    if profile.company_id is not None:
+        orders = Order.objects.filter(creator__company_id=profile.company_id)
+    else:
+        orders = Order.objects.filter(creator=profile)
+    orders = orders.select_related('creator', 'platform_code')
+    orders, next_query = paginate_orders(request, orders)
 
     return render(
         request,
@@ -303,6 +329,7 @@ def _dashboard_client(request, message=''):
             'data': {
                 'platform_name': company_name,
                 'orders': orders,
+                'next_query': next_query,
                 'profile': profile,
                 'current_user_id': request.user.id,
             }
@@ -338,7 +365,7 @@ def new_order(request):
             order_in_progress = Order.objects.latest('created_at')
             order_data = model_to_dict(order_in_progress)
             file_field = order_in_progress.multiplan_dicing_plan_file
-            order_data['multiplan_dicing_plan_file'] = file_field.url if file_field else None
+            order_data['multiplan_dicing_plan_file'] = signed_download_url(request, file_field.name) if file_field else None
 
             for key, value in list(order_data.items()):
                 if not isinstance(value, (str, int, float, bool, type(None))):
@@ -408,13 +435,9 @@ def my_documents(request, id):
     return render(request, 'account/client/my_documents.html', context)
 
 def all_documents(request):
-    profiles = Profile.objects.filter(role__name__in=['Заказчик'])
-
-    all_company_names = profiles.filter(
-        role__name='Заказчик'
-    ).exclude(
-        company_name__in=['', None]
-    ).values_list('company_name', flat=True).distinct()
+    all_company_names = Company.objects.filter(
+        profiles__role__name='Заказчик'
+    ).exclude(name='').order_by('name').values_list('name', flat=True).distinct()
 
     return render(request, 'account/all_documents.html', {
         'all_company_names': all_company_names,
@@ -423,10 +446,11 @@ def all_documents(request):
 
 def company_documents(request, company_name):
     company_name = urllib.parse.unquote(company_name)
+    company = get_object_or_404(Company, name=company_name)
 
     customer_profiles = Profile.objects.filter(
         role__name='Заказчик',
-        company_name=company_name
+        company=company
     )
 
     user_documents = {}
@@ -447,7 +471,7 @@ def company_documents(request, company_name):
             'invoice_documents': invoice_documents,
         }
 
-    company_orders = Order.objects.filter(creator__company_name=company_name)
+    company_orders = Order.objects.filter(creator__company=company)
 
     return render(request, 'account/company_documents.html', {
         'user_documents': user_documents,
@@ -457,16 +481,51 @@ def company_documents(request, company_name):
     })
 
 
-@log_order_status_change
+@login_required
+def my_documents_zip(request, id):
+    """Все документы и файлы заказов пользователя одним ZIP-архивом"""
+    profile = request.user.profile
+    if request.user.id != id and profile.role.name != 'Куратор':
+        return render(request, 'account/forbidden.html', {
+            'reason': 'Вы не можете скачивать чужие документы.'
+        }, status=403)
+    owner = get_object_or_404(User, pk=id)
+    return zip_response(user_archive_files(owner.pk), f'Документы {owner.username}.zip')
+
+
+@login_required
+def company_documents_zip(request, company_name):
+    """Документы всех заказчиков компании одним ZIP-архивом, по папке на пользователя"""
+    profile = request.user.profile
+    if profile.role.name != 'Куратор' and profile.company_name != company_name:
+        return render(request, 'account/forbidden.html', {
+            'reason': 'Вы не можете скачивать документы этой компании.'
+        }, status=403)
+    profiles = list(Profile.objects.filter(role__name='Заказчик', company__name=company_name).select_related('user'))
+    return zip_response(company_archive_files(profiles), f'Документы {company_name}.zip')
+
+
+@login_required
+def order_documents_zip(request, order_id):
+    """Файлы заказа (договор, счёт, GDS, карта резки) одним ZIP-архивом"""
+    order = get_order_or_404(request, order_id)
+    if not check_view_permission(get_profile_scope(request), order):
+        return render(request, 'account/forbidden.html', {
+            'reason': 'Вы не можете просматривать этот заказ.'
+        }, status=403)
+    return zip_response(order_archive_files(order), f'Заказ {order.order_number}.zip')
+
+
 @login_required
 @restrict_by_status()
 def changes_in_order(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_order_or_404(request, order_id)
     if request.method == 'POST':
         order_form = OrderEditForm(request.POST, request.FILES, instance=order)
         if order_form.is_valid():
-            order.order_status = 'OVK'
-            order_form.save()
+            with transaction.atomic():
+                save_order_form(order_form)
+                apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             return render(request, 'account/client/changes_in_order_success.html',
                           {'order_form': order_form,
                           'order_id': order_id})
@@ -481,23 +540,24 @@ def changes_in_order(request, order_id):
     })
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def signing_agreement(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
 
     if request.method == 'POST':
         form = AddContractForm(request.POST, instance=order)
         if form.is_valid():
             action = None
             if form.cleaned_data.get('contract_is_ready', False):
-                order.order_status = 'CSA'
+                transition = 'next'
                 action = 'confirmed'
             else:
-                order.order_status = 'SA'
+                transition = 'not_ready'
                 action = 'not_confirmed'
-            form.save()
+            with transaction.atomic():
+                save_order_form(form)
+                apply_transition(order, transition, request.user.profile, expected_status=page_status(request))
             return render(
                 request, 
                 'account/client/signing_agreement_success.html',
@@ -513,6 +573,7 @@ def signing_agreement(request, order_id):
         request,
         'account/client/signing_agreement.html',
         {
+            'order': order,
             'form': form,
             'view_form': view_form,
             'order_items': order_items,
@@ -520,17 +581,14 @@ def signing_agreement(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def add_gds(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_order_or_404(request, order_id)
     old_file = order.GDS_file.name
 
     if request.method == 'POST':
         if 'cancel' in request.POST:
-            order.order_status = 'OGDS'
-            order.save()
             return render(
                 request,
                 'account/client/add_gds_success.html',
@@ -540,16 +598,16 @@ def add_gds(request, order_id):
         form = AddGDSFile(request.POST, request.FILES, instance=order)
         if form.is_valid():
             action = None
-            if form.cleaned_data.get('GDS_file', False):
-                order.order_status = 'CGDS'
-                action = 'confirmed'
-                new_file = order.GDS_file.name
-                if old_file != new_file:
-                    add_file_message(order, 'GDS_file', request.user.profile)
-            else:
-                order.order_status = 'OGDS'
-                action = 'not_confirmed'
-            form.save()
+            with transaction.atomic():
+                save_order_form(form)
+                if form.cleaned_data.get('GDS_file', False):
+                    apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
+                    action = 'confirmed'
+                    new_file = order.GDS_file.name
+                    if old_file != new_file:
+                        add_file_message(order, 'GDS_file', request.user.profile)
+                else:
+                    action = 'not_confirmed'
             return render(
                 request, 
                 'account/client/add_gds_success.html',
@@ -572,22 +630,17 @@ def add_gds(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def order_paid(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
 
     if request.method == 'POST':
         action = None
         if 'paid_success' in request.POST:
-            order.is_paid = True
-            order.order_status = 'POK'
-            order.order_date = timezone.now()
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request),
+                             is_paid=True, order_date=timezone.now())
             action = 'success'
-        else:
-            pass
-        order.save()
 
         return render(
             request,
@@ -605,26 +658,23 @@ def order_paid(request, order_id):
     })
     
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def confirmation_receipt(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
 
     if request.method == 'POST':
         action = None
         if 'receipt_success' in request.POST:
-            order.is_paid = True
-            order.order_status = 'EO'
+            apply_transition(order, 'next', request.user.profile,
+                             expected_status=page_status(request), is_paid=True)
             action = 'success'
         elif 'receipt_cancel' in request.POST:
-            order.is_paid = False
-            order.order_status = 'PS'
+            apply_transition(order, 'prev', request.user.profile,
+                             expected_status=page_status(request), is_paid=False)
             action = 'cancelled'
         else:
-            order.order_status = 'CR'
             action='unknown'
-        order.save()
 
         return render(
             request,
@@ -644,10 +694,10 @@ def confirmation_receipt(request, order_id):
 
 def _dashboard_curator(request, message=''):
     profile = request.user.profile
-    orders = Order.objects.all().select_related('creator')
+    orders = Order.objects.all().select_related('creator', 'platform_code')
+    orders, next_query = paginate_orders(request, orders)
 
-    platform = Profile.objects.get(id=request.user.id)
-    platform_name = platform.company_name
+    platform_name = profile.company_name
 
     return render(
         request,
@@ -657,28 +707,28 @@ def _dashboard_curator(request, message=''):
             'data': {
                 'platform_name': platform_name,
                 'orders': orders,
+                'next_query': next_query,
                 'profile': profile,
+                'bulk_transitions': bulk_transition_choices(get_profile_scope(request)),
             },
         }
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def edit_order(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_order_or_404(request, order_id)
     creator_name = order.creator.user.username
 
     if request.method == 'POST':
         action = None
         if 'success' in request.POST:
-            order.order_status = 'OVC'
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             action = 'success'
         elif 'cancelled' in request.POST:
-            order.order_status = 'NFW'
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
-        order.save()
 
         return render(
             request, 'account/edit_order_success.html', {'order': order, 'action': action}
@@ -700,11 +750,10 @@ def edit_order(request, order_id):
     )
     
     
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def check_signing_curator(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     old_contract = order.contract_file.name or ''
 
     if request.method == 'POST':
@@ -714,24 +763,27 @@ def check_signing_curator(request, order_id):
         if form.is_valid():
             file_provided = bool(form.cleaned_data.get('contract_file'))
 
-            if 'success' in request.POST:
-                if file_provided:
-                    order.order_status = 'ESA'
-                    action = 'success'
+            with transaction.atomic():
+                if 'success' in request.POST:
+                    save_order_form(form)
+                    if file_provided:
+                        apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
+                        action = 'success'
+                    else:
+                        action = 'no_file'
+                elif 'cancelled' in request.POST:
+                    if order.contract_file:
+                        order.contract_file.delete(save=False)
+                        order.contract_file = None
+                    save_order_form(form)
+                    apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
+                    action = 'cancelled'
                 else:
-                    order.order_status = 'CSA'
-                    action = 'no_file'
-            elif 'cancelled' in request.POST:
-                if order.contract_file:
-                    order.contract_file.delete(save=False)
-                    order.contract_file = None
-                order.order_status = 'SA'
-                action = 'cancelled'
-
-            form.save()
+                    save_order_form(form)
 
             new_file = order.contract_file.name or ''
-            if action == 'success' and file_provided:
+            # Файл, загруженный частями, уже объявлен в чате при завершении загрузки
+            if action == 'success' and file_provided and old_contract != new_file:
                 add_file_message(order, 'contract_file', request.user.profile)
 
             return render(request, 'account/check_signing_success.html', 
@@ -746,6 +798,7 @@ def check_signing_curator(request, order_id):
         request,
         'account/check_signing_curator.html',
         {
+            'order': order,
             'form': form,
             'view_form': view_form,
             'order_items': order_items,
@@ -753,11 +806,10 @@ def check_signing_curator(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def view_is_paid(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     old_invoice = order.invoice_file.name or ''
 
     if request.method == 'POST':
@@ -765,19 +817,19 @@ def view_is_paid(request, order_id):
         if form.is_valid():
             file_provided = bool(form.cleaned_data.get('invoice_file'))
             action = None
-            if 'paid_confirmation' in request.POST:      
-                if file_provided:
-                    order.is_paid = True
-                    order.order_status = 'POC'
-                    action = 'success'
-                else:
-                    order.order_status = 'POK'
-                    action = 'no_file'
-            elif 'paid_cansel' in request.POST:
-                order.is_paid = False
-                order.order_status = 'PO'
-                action = 'cancelled'
-            order.save()
+            with transaction.atomic():
+                save_order_form(form)
+                if 'paid_confirmation' in request.POST:      
+                    if file_provided:
+                        apply_transition(order, 'next', request.user.profile,
+                                         expected_status=page_status(request), is_paid=True)
+                        action = 'success'
+                    else:
+                        action = 'no_file'
+                elif 'paid_cansel' in request.POST:
+                    apply_transition(order, 'prev', request.user.profile,
+                                     expected_status=page_status(request), is_paid=False)
+                    action = 'cancelled'
             new_file = order.invoice_file.name or ''
             if old_invoice != new_file and new_file != '' and action == 'success':
                 add_file_message(order, 'invoice_file', request.user.profile)
@@ -805,24 +857,21 @@ def view_is_paid(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def shipping_is_confirm(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
 
     if request.method == 'POST':
         action = None
         if 'success_shipping' in request.POST:
-            order.order_status = 'PS'
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             action = 'success'
         elif 'cancel_shipping' in request.POST:
-            order.order_status = 'MPOP'
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
         else:
-            order.order_status='SO'
             action='unknown'
-        order.save()
 
         return render(
             request,
@@ -844,24 +893,21 @@ def shipping_is_confirm(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def plates_shipped(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
 
     if request.method == 'POST':
         action = None
         if 'success_shipped' in request.POST:
-            order.order_status = 'CR'
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             action = 'success'
         elif 'cancel_shipped' in request.POST:
-            order.order_status = 'SO'
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
         else:
-            order.order_status = 'PS'
             action='unknown'
-        order.save()
 
         return render(
             request,
@@ -886,10 +932,12 @@ def plates_shipped(request, order_id):
 @login_required
 def _dashboard_executor(request, message=''):
     profile = request.user.profile
-    code_company = Platform.objects.get(platform_code=profile.company_name)
-    orders = Order.objects.filter(platform_code_id=code_company).select_related('creator')
-    name_platform = Platform.objects.filter(platform_code=code_company).values_list('platform_name', flat=True).first()
-    print(name_platform)
+    code_company = profile.platform
+    if code_company is None:
+        raise Http404('Платформа исполнителя не найдена')
+    orders = Order.objects.filter(platform_code_id=code_company.id).select_related('creator', 'platform_code')
+    orders, next_query = paginate_orders(request, orders)
+    name_platform = code_company.platform_name
 
     return render(
         request,
@@ -898,29 +946,29 @@ def _dashboard_executor(request, message=''):
             'section': 'dashboard',
             'data': {
                 'orders': orders,
+                'next_query': next_query,
                 'name_platform': name_platform,
                 'code_company': code_company,
                 'profile': profile,
+                'bulk_transitions': bulk_transition_choices(get_profile_scope(request)),
             }
         })
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def order_view(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_order_or_404(request, order_id)
     creator_name = order.creator.user.username
 
     if request.method == 'POST':
         action = None
         if 'save_changes' in request.POST:
-            order.order_status = 'OA'
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             action = 'success'
         elif 'cancel_changes' in request.POST:
-            order.order_status = 'OVK'
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
-        order.save()
 
         return render(
             request, 'account/order_view_success.html', {'order': order, 'action': action}
@@ -965,7 +1013,7 @@ def order_view_success(request):
 
 @login_required
 def order_detail(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     
     status_dates = {
         h.new_status: h.changed_at
@@ -1000,22 +1048,20 @@ def edit_platform_success(request):
     return render(request, 'account/edit_platform_success.html')
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def check_signing_exec(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     old_contract = order.contract_file.name
     
     if request.method == 'POST':
         action = None
         if 'success' in request.POST:
-            order.order_status = 'OGDS'
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             action = 'success'
         elif 'cancelled' in request.POST:
-            order.order_status = 'CSA'
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
-        order.save()
         
         new_file = order.contract_file.name
         if old_contract != new_file and action == 'success':
@@ -1034,6 +1080,7 @@ def check_signing_exec(request, order_id):
         request,
         'account/check_signing_exec.html',
         {
+            'order': order,
             'section': dashboard,
             'view_form': view_form,
             'order_items': order_items,
@@ -1041,11 +1088,10 @@ def check_signing_exec(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def check_gds_file_curator(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     creator_name = order.creator.user.username
     order_dict = {key: value for key, value in order.__dict__.items() if not key.startswith('_')}
     old_file = order.GDS_file.name
@@ -1053,15 +1099,13 @@ def check_gds_file_curator(request, order_id):
     if request.method == 'POST':
         action = None
         if 'success_gds' in request.POST:
-            order.order_status = 'EGDS'
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             action = 'confirmed'
         elif 'cancel_gds' in request.POST:
-            order.order_status = 'OGDS'
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
         else:
-            order.order_status = 'CGDS'
             action = ''
-        order.save()
         
         new_file = order.GDS_file.name
         if old_file != new_file and 'success_gds' in request.POST:
@@ -1078,6 +1122,7 @@ def check_gds_file_curator(request, order_id):
 
     return render(request, 'account/check_gds_file_curator.html', {
         'section': dashboard,
+        'gds_info': GDSLayoutInfo.objects.filter(order=order).first(),
         'order': order_dict,
         'creator_name': creator_name,
         'view_form': view_form,
@@ -1086,11 +1131,10 @@ def check_gds_file_curator(request, order_id):
 )
     
     
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def check_gds_file_exec(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     creator_name = order.creator.user.username
     order_dict = {key: value for key, value in order.__dict__.items() if not key.startswith('_')}
     old_file = order.GDS_file.name
@@ -1098,15 +1142,13 @@ def check_gds_file_exec(request, order_id):
     if request.method == 'POST':
         action = None
         if 'success_gds' in request.POST:
-            order.order_status = 'PO'
+            apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
             action = 'confirmed'
         elif 'cancel_gds' in request.POST:
-            order.order_status = 'CGDS'
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
         else:
-            order.order_status = 'EGDS'
             action = ''
-        order.save()
         new_file = order.GDS_file.name
         if old_file != new_file and 'success_gds' in request.POST:
             add_file_message(order, 'GDS_file', request.user.profile)
@@ -1122,6 +1164,7 @@ def check_gds_file_exec(request, order_id):
 
     return render(request, 'account/check_gds_file_exec.html', {
         'section': dashboard,
+        'gds_info': GDSLayoutInfo.objects.filter(order=order).first(),
         'order': order,
         'creator_name': creator_name,
         'view_form': view_form,
@@ -1130,23 +1173,21 @@ def check_gds_file_exec(request, order_id):
 )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def view_is_paid_exec(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     
     if request.method == 'POST':
         action = None
         if 'paid_confirmation' in request.POST:
-            order.is_paid = True
-            order.order_status = 'MPO'
+            apply_transition(order, 'next', request.user.profile,
+                             expected_status=page_status(request), is_paid=True)
             action = 'success'
         elif 'paid_cansel' in request.POST:
-            order.is_paid = False
-            order.order_status = 'POK'
+            apply_transition(order, 'prev', request.user.profile,
+                             expected_status=page_status(request), is_paid=False)
             action = 'cancelled'
-        order.save()
 
         return render(
             request,
@@ -1168,18 +1209,16 @@ def view_is_paid_exec(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def plates_in_stock(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_order_or_404(request, order_id)
     mask_name_empty = not order.mask_name or str(order.mask_name).strip() == ''
     action = None
 
     if request.method == 'POST':
         if 'cancel_confirmation' in request.POST:
-            order.order_status = 'POK'
-            order.save()
+            apply_transition(order, 'prev', request.user.profile, expected_status=page_status(request))
             action = 'cancelled'
             form = None
 
@@ -1188,23 +1227,18 @@ def plates_in_stock(request, order_id):
                 form = OrderEditingForm(request.POST, request.FILES, instance=order)
                 form.fields['mask_name'].required = True
                 if form.is_valid():
-                    form.save()
-                    order.order_status = 'MTP'
-                    order.save()
+                    with transaction.atomic():
+                        save_order_form(form)
+                        apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
                     action = 'success'
                 else:
-                    order.order_status = 'MPO'
-                    order.save()
                     action = 'missing_mask'
             else:
                 form = None
-                order.order_status = 'MTP'
-                order.save()
+                apply_transition(order, 'next', request.user.profile, expected_status=page_status(request))
                 action = 'success'
         else:
             form = None
-            order.order_status = 'MPO'
-            order.save()
             action='unknown'
 
         if action:
@@ -1235,11 +1269,10 @@ def plates_in_stock(request, order_id):
     )
 
 
-@log_order_status_change
 @login_required
 @restrict_by_status()
 def production_status_view(request, order_id, current_status):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_order_or_404(request, order_id)
     config = STATUS_CONFIG[current_status]
     
     if request.method == 'POST':
@@ -1247,29 +1280,14 @@ def production_status_view(request, order_id, current_status):
         comment = request.POST.get('comment', '').strip()
         
         if 'next_status' in request.POST:
-            new_status = config['next_status']
             action = 'next'
         elif 'prev_status' in request.POST:
-            new_status = config['prev_status']
             action = 'prev'
-        else:
-            new_status = None
         
-        if new_status:
-            old_status = order.order_status  # сохраняем старый статус до изменения
-            
-            # Создаем запись в истории
-            OrderStatusHistory.objects.create(
-                order=order,
-                old_status=old_status,
-                new_status=new_status,
-                comment=comment if comment else None,
-                changed_by=request.user.profile
-            )
-            
-            # Обновляем статус заказа
-            order.order_status = new_status
-            order.save()
+        if action:
+            # Запись истории с комментарием и сообщение в чат пишет сам переход
+            apply_transition(order, action, request.user.profile, comment=comment,
+                             expected_status=current_status)
 
         return render(
             request,
@@ -1297,6 +1315,33 @@ def production_status_view(request, order_id, current_status):
     )
 
 
+@login_required
+@require_POST
+def bulk_transition(request):
+    profile = request.user.profile
+    status, _, action = request.POST.get('transition', '').partition(':')
+    order_ids = [int(value) for value in request.POST.getlist('order_ids') if value.isdigit()]
+    comment = request.POST.get('comment', '').strip()
+
+    try:
+        orders = apply_bulk_transition(order_ids, status, action, profile, comment=comment)
+    except TransitionConflict:
+        return render(request, 'account/forbidden.html', {
+            'reason': 'Статус части заказов уже изменён другим пользователем. Обновите страницу.'
+        }, status=409)
+    except TransitionError as e:
+        return render(request, 'account/forbidden.html', {'reason': str(e)}, status=403)
+
+    return render(
+        request,
+        'account/bulk_transition_success.html',
+        {
+            'orders': orders,
+            'skipped': len(set(order_ids)) - len(orders),
+        }
+    )
+
+
 @login_required
 def edit(request):
     if request.method == 'POST':
@@ -1323,83 +1368,35 @@ def edit(request):
                    'profile_form': profile_form})
 
 
-
-def get_diameters_by_platform(platform_id):
-    #Хелпер для получения диаметров по платформе
-    try:
-        diameters = Diameter.objects.filter(platform_id=platform_id)
-        print(f'Diameters: {[d.value for d in diameters]}')
-        return JsonResponse({
-            'diameters': [{'id': d.id, 'value': d.value} for d in diameters]
-        })
-    except (ValueError, Platform.DoesNotExist):
-        return JsonResponse({'error': 'Invalid platform'}, status=400)
-
 def get_all_thicknesses():
     #Хелпер для получения всех толщин
-    thicknesses = Thickness.objects.all()
-    return JsonResponse({
-        'thicknesses': [{'id': t.id, 'value': t.value} for t in thicknesses]
-    })
+    return JsonResponse({'thicknesses': get_catalog().thicknesses()})
 
 def get_containers_by_format(wafer_deliver_format):
     #Хелпер для получения контейнеров по формату доставки
-    if wafer_deliver_format == 'Пластины неразделенные':
-        choices = [
-            {'id': Order.ContainerForCrystals.СontainerForCrystalls, 'value': 'Тара для пластин'}
-        ]
-    elif wafer_deliver_format == 'Пластина разделенная на полимерном носителе':
-        choices = [
-            {'id': Order.ContainerForCrystals.EmFrame, 'value': 'Пяльцы'}
-        ]
-    elif wafer_deliver_format == 'Кристаллы в таре':
-        choices = [
-            {'id': Order.ContainerForCrystals.PlasticCells, 'value': 'Пластмассовые ячейки'},
-            {'id': Order.ContainerForCrystals.GelPack, 'value': 'Gel-Pak'}
-        ]
-    else:
-        choices = []
-    
-    return JsonResponse({'container_for_crystals': choices})
+    return JsonResponse({'container_for_crystals': get_catalog().containers(wafer_deliver_format)})
 
 
 def get_technical_processes_by_platform(request):
     # Хелпер для получения доступных техпроцессов по выбранной платформе
     platform_id = request.GET.get('platform_id')
     if platform_id:
-        try:
-            platform = Platform.objects.get(id=platform_id)
-            technical_processes = platform.technicalprocess_set.all()
-            technical_processes_data = [
-                {'id': tp.id, 'name_process': tp.name_process} for tp in technical_processes
-            ]
-            return JsonResponse({'technical_processes': technical_processes_data})
-        except Platform.DoesNotExist:
+        catalog = get_catalog()
+        if not any(str(platform['id']) == platform_id for platform in catalog.platforms()):
             return JsonResponse({'error': 'Platform not found'}, status=404)
+        return JsonResponse({'technical_processes': catalog.technical_processes(platform_id)})
     return JsonResponse({'technical_processes': []})
 
 
 def load_data(request):
-    #Использование хелперов на выбор load_data
+    #Использование хелперов на выбор load_data; данные берутся из справочника без запросов к базе
     platform_id = request.GET.get('platform_id')
     if platform_id:
-        try:
-            diameters_qs = Diameter.objects.filter(platform_id=platform_id)
-            diameters = [{'id': d.id, 'value': d.value} for d in diameters_qs]
-        except (ValueError, Platform.DoesNotExist):
-            diameters = []
-        try:
-            platform = Platform.objects.get(id=platform_id)
-            tech_qs = platform.technicalprocess_set.all()
-            technical_processes = [{'id': tp.id, 'name_process': tp.name_process} for tp in tech_qs]
-        except Platform.DoesNotExist:
-            technical_processes = []
+        catalog = get_catalog()
         return JsonResponse({
-            'diameters': diameters,
-            'technical_processes': technical_processes
+            'diameters': catalog.diameters(platform_id),
+            'technical_processes': catalog.technical_processes(platform_id),
         })
-        
-    #TODO В будущем разобраться с двойным вызовом
 
     substrate_type = request.GET.get('substrate_type')
     if substrate_type:
@@ -1412,6 +1409,25 @@ def load_data(request):
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
+def reference_catalog(request, version):
+    """
+    Справочник формы заказа одним документом. Адрес содержит версию, поэтому ответ
+    кешируется браузером навсегда; запрос устаревшей версии перенаправляется на текущую.
+    """
+    catalog = get_catalog()
+    if version != catalog.version:
+        response = redirect('reference_catalog', version=catalog.version)
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    response = get_conditional_response(request, etag=catalog.etag)
+    if response is None:
+        response = HttpResponse(catalog.content, content_type='application/json')
+    response['ETag'] = catalog.etag
+    response['Cache-Control'] = f'public, max-age={CATALOG_MAX_AGE}, immutable'
+    return response
+
+
 
 def new_order_success_view(request):
     return render(request, 'new_order_success.html')
@@ -1439,6 +1455,41 @@ def download_excel_file_from_order_id(request, order_id):
         return HttpResponse('Ошибка при создании файла.', status=400)
 
 
+@login_required
+def export_orders_excel(request):
+    """Выгрузка отфильтрованных заказов в один xlsx; файл отдаётся потоком с диска"""
+    orders = Order.objects.filter(view_permission_q(get_profile_scope(request)))
+
+    orders = search_orders(orders, request.GET.get('q', ''))
+    statuses = [s for s in request.GET.getlist('status') if s in Order.OrderStatus.values]
+    if statuses:
+        orders = orders.filter(order_status__in=statuses)
+    date_from = parse_date(request.GET.get('date_from', '') or '')
+    if date_from:
+        orders = orders.filter(created_at__date__gte=date_from)
+    date_to = parse_date(request.GET.get('date_to', '') or '')
+    if date_to:
+        orders = orders.filter(created_at__date__lte=date_to)
+    orders = filter_orders(orders, request.GET.get('filter_by', ''))
+
+    try:
+        output = export_orders_to_tempfile(
+            orders,
+            filled_by=request.user.email,
+            per_order_sheets=request.GET.get('layout') == 'sheets',
+        )
+    except ValueError as e:
+        return HttpResponse(f'Ошибка: {e}', status=400)
+
+    filename = f'Заказы_{timezone.localdate():%Y%m%d}.xlsx'
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
 def help_files(request):
     files = TopicFileModel.objects.all()
     return render(request, 'account/help_files.html', {
@@ -1457,20 +1508,11 @@ def feedback(request):
     ).annotate(
         last_message_time=Max('messages__created_at')
     ).order_by('-last_message_time')
-    
-    for topic in private_topics:    
-        last_read_message = UserTopic.objects.filter(user=profile, topic=topic).first()
-        if last_read_message and last_read_message.last_read_message:
-            topic.unread_count = Message.objects.filter(
-                topic=topic,
-                id__gt=last_read_message.last_read_message.id
-            ).count()
-        else:
-            topic.unread_count = 0 
-        
-        last_message = Message.objects.filter(topic=topic).order_by('-created_at').first()
-        topic.last_message_time = last_message.created_at if last_message else None
-    
+
+    unread_counts = get_unread_counts(profile)
+    for topic in private_topics:
+        topic.unread_count = unread_counts.get(topic.id, 0)
+
     tab = request.GET.get('tab', 'general')
 
     return render(request, 'account/feedback.html', {
@@ -1492,6 +1534,7 @@ def topic_detail(request, topic_id):
     if last_message:
         user_topic.last_read_message = last_message
         user_topic.save()
+    mark_topic_read(profile, topic, last_message)
 
     if request.method == 'POST':
         message_form = MessageForm(request.POST)
@@ -1543,7 +1586,7 @@ def delete_message(request, message_id):
     
 
 def create_or_open_chat(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
 
     topic, created = Topic.objects.get_or_create(
         related_order=order,
@@ -1589,7 +1632,8 @@ def upload_files(request):
 
         for file in files:
             file_instance = File.objects.create(file=file)
-            file_urls.append(file_instance.file.url)
+            # Через view скачивания: сжатые в media_store файлы отдаются с Content-Encoding
+            file_urls.append(signed_download_url(request, file_instance.file.name))
 
         return JsonResponse({'message': 'Файлы успешно загружены!', 'file_urls': file_urls})
 
@@ -1597,7 +1641,7 @@ def upload_files(request):
 
 
 def check_the_order(request, order_id):
-    order = Order.objects.get(id=order_id)
+    order = get_order_or_404(request, order_id)
     creator_name = order.creator.user.username
     order_dict = {key: value for key, value in order.__dict__.items() if not key.startswith('_')}
         
@@ -1633,9 +1677,107 @@ def login_log_view(request):
 
 @login_required
 def protected_download(request, file_path):
-    full_path = os.path.join(settings.MEDIA_ROOT, file_path)
-    
-    if not os.path.exists(full_path):
-        raise Http404("Файл не найден")
-    
-    return FileResponse(open(full_path, 'rb'), as_attachment=True)
\ No newline at end of file
+    # Права проверяет Django, сами байты передаёт DOWNLOAD_BACKEND (nginx/Apache в продакшене)
+    return serve_media_file(request, file_path)
+
+
+def signed_download(request, user_id, expires, signature, file_path):
+    """
+    Скачивание по подписанной ссылке из signed_download_url: права проверены при отрисовке
+    страницы, здесь проверяется только подпись — без сессии, пользователя и профиля.
+    """
+    if not verify_download(request, file_path, user_id, expires, signature):
+        raise Http404('Ссылка недействительна или устарела')
+    response = serve_media_file(request, file_path)
+    response['Cache-Control'] = 'private'
+    return response
+
+
+@login_required
+def gds_preview_tile(request, order_id, key, level, x, y):
+    """
+    Плитка превью GDS. Содержимое плитки по ключу неизменно (ключ — SHA-256 файла),
+    поэтому браузер кеширует её без повторных запросов; права проверяются как для заказа.
+    """
+    order = get_order_or_404(request, order_id)
+    if not check_view_permission(get_profile_scope(request), order):
+        return render(request, 'account/forbidden.html', {
+            'reason': 'Вы не можете просматривать этот заказ.'
+        }, status=403)
+
+    info = GDSLayoutInfo.objects.filter(order=order, preview_key=key).first()
+    if info is None or level >= info.preview_levels or x >= 2 ** level or y >= 2 ** level:
+        raise Http404('Плитка не найдена')
+
+    response = serve_media_file(request, preview_tile_name(key, level, x, y), as_attachment=False)
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+def upload_state(session):
+    return {
+        'upload_id': str(session.pk),
+        'field': session.field_name,
+        'size': session.size,
+        'offset': session.offset,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+        'status': session.status,
+    }
+
+
+def upload_error_response(error):
+    data = {'error': str(error)}
+    if isinstance(error, UploadOffsetMismatch):
+        data['offset'] = error.offset
+    return JsonResponse(data, status=error.status)
+
+
+@login_required
+@require_POST
+def upload_start(request):
+    """Начало загрузки файла заказа частями: order_id, field, filename, size, sha256 (необязательно)"""
+    order = get_order_or_404(request, request.POST.get('order_id'))
+    try:
+        session = start_upload(
+            request.user.profile, order,
+            request.POST.get('field'), request.POST.get('filename'),
+            request.POST.get('size'), request.POST.get('sha256'),
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    return JsonResponse(upload_state(session), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk(request, upload_id):
+    """
+    GET — сколько байт уже принято (для возобновления после обрыва).
+    PUT — очередная часть: тело запроса — байты файла, заголовок Upload-Offset — их смещение.
+    """
+    try:
+        session = get_upload(request.user.profile, upload_id)
+        if request.method == 'PUT':
+            try:
+                offset = int(request.headers.get('Upload-Offset', ''))
+                length = int(request.headers.get('Content-Length', ''))
+            except ValueError:
+                raise UploadError('Нужны заголовки Upload-Offset и Content-Length')
+            write_chunk(session, offset, request, length)
+    except UploadError as e:
+        return upload_error_response(e)
+    return JsonResponse(upload_state(session))
+
+
+@login_required
+@require_POST
+def upload_finish(request, upload_id):
+    try:
+        session = finish_upload(get_upload(request.user.profile, upload_id))
+    except UploadError as e:
+        return upload_error_response(e)
+    return JsonResponse({
+        **upload_state(session),
+        'sha256': session.sha256,
+        'file': getattr(session.order, session.field_name).name,
+    })
\ No newline at end of file
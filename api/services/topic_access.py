@@ -1,5 +1,5 @@
 from rest_framework.exceptions import PermissionDenied, NotFound
-from account.models import Profile, Order, Topic, Platform
+from account.models import Topic
 
 class RoleConstants:
     CUSTOMER = 'Заказчик'
@@ -16,22 +16,17 @@ def get_accessible_topics(profile):
     role_name = profile.role.name
 
     if role_name == RoleConstants.CUSTOMER:
-        users_in_company = Profile.objects.filter(
-            company_name=profile.company_name
-        ).values_list('user', flat=True)
-        orders = Order.objects.filter(creator__user__in=users_in_company)
-        return Topic.objects.filter(related_order__in=orders)
+        if profile.company_id is None:
+            return Topic.objects.filter(related_order__creator=profile)
+        return Topic.objects.filter(related_order__creator__company_id=profile.company_id)
 
     elif role_name == RoleConstants.CURATOR:
         return Topic.objects.all()
 
     elif role_name == RoleConstants.EXECUTOR:
-        try:
-            code_company = Platform.objects.get(platform_code=profile.company_name)
-            orders = Order.objects.filter(platform_code_id=code_company)
-            return Topic.objects.filter(related_order__in=orders)
-        except Platform.DoesNotExist:
+        if profile.platform_id is None:
             raise NotFound(ErrorMessages.PLATFORM_NOT_FOUND)
+        return Topic.objects.filter(related_order__platform_code_id=profile.platform_id)
 
     else:
         raise PermissionDenied(ErrorMessages.ACCESS_DENIED)
@@ -157,11 +157,37 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 SERVER_EMAIL = EMAIL_HOST_USER
 EMAIL_ADMIN = EMAIL_HOST_USER
 
+# Очередь писем EmailOutbox, отправляет команда send_outbox_emails
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+# Бэкенд воркера очереди; письма из запросов (сброс пароля и т. п.) идут через EMAIL_BACKEND без лимита
+EMAIL_OUTBOX_BACKEND = 'account.utils.mail_transport.PooledSMTPBackend'
+# Лимит провайдера: писем в секунду в среднем и допустимый всплеск (0 — без ограничения)
+EMAIL_SEND_RATE = float(os.getenv('EMAIL_SEND_RATE', 1))
+EMAIL_SEND_BURST = int(os.getenv('EMAIL_SEND_BURST', 5))
+
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кто передаёт защищённые файлы после проверки прав в Django:
+#   account.utils.file_delivery.DjangoDownloadBackend  — сам Django (разработка)
+#   account.utils.file_delivery.NginxAccelBackend      — nginx, X-Accel-Redirect
+#   account.utils.file_delivery.ApacheSendfileBackend  — Apache mod_xsendfile, X-Sendfile
+# Для nginx нужен internal-location:
+#   location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+DOWNLOAD_BACKEND = os.getenv('DOWNLOAD_BACKEND', 'account.utils.file_delivery.DjangoDownloadBackend')
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+# Срок действия подписанных ссылок на файлы в списках и дашбордах, секунды
+SIGNED_DOWNLOAD_MAX_AGE = int(os.getenv('SIGNED_DOWNLOAD_MAX_AGE', 60 * 60))
+
+# Загрузка файлов заказа частями (account.utils.chunked_upload). Каталог лучше держать
+# на том же разделе, что MEDIA_ROOT, — тогда готовый файл переносится переименованием.
+UPLOAD_STAGING_DIR = os.getenv('UPLOAD_STAGING_DIR', os.path.join(BASE_DIR, 'upload_staging'))
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 20 * 1024 ** 3))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 ** 2))
+
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'account.authentication.ProfileModelBackend',
     'account.authentication.EmailAuthBackend',
 ]
 
@@ -172,4 +198,6 @@ CAPTCHA_TIMEOUT = 5
 
 IPINFO_TOKEN = os.getenv('IPINFO_TOKEN', '')
 
+ORDERS_PAGE_SIZE = int(os.getenv('ORDERS_PAGE_SIZE', 50))
+
 
@@ -126,7 +126,7 @@ MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'test_media')  # Отдельная папка для тестов
 
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'account.authentication.ProfileModelBackend',
     'account.authentication.EmailAuthBackend',
 ]
 